@@ -0,0 +1,140 @@
+"""Compare the per-frame cost of the polling and event-driven controller input backends.
+
+Stand-in joysticks are used so no controllers need to be plugged in. Each frame, a few axes of each controller move and
+now and then a button or the hat is tapped. The polling backend reads every input of every controller, while the event
+backend only handles the events for the inputs that changed. The stand-in joysticks are pure Python, so polling them
+costs a little more than polling real ones, but the number of calls is the same.
+
+Run from the topside directory with the ROV's folder on the path, for example:
+    PYTHONPATH=rovs/spike python -m benchmarks.controller_input_benchmark
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import controller as ctrl
+from controller_input import InputHandler
+from enums import ControllerNames, ControllerHatNames
+from tests.controller_helpers import FakeJoystick
+
+AXIS_COUNT = 6
+BUTTON_COUNT = 11
+
+
+def make_controller() -> ctrl.Controller:
+    """Make a controller with a typical gamepad's inputs."""
+    axes = {f"axis_{i}": ctrl.Axis(index=i, deadzone=0.15) for i in range(AXIS_COUNT)}
+    buttons = {f"button_{i}": ctrl.Button(index=i) for i in range(BUTTON_COUNT)}
+    hats = {ControllerHatNames.DPAD: ctrl.Hat(index=0)}
+    return ctrl.Controller(0, buttons, axes, hats)
+
+
+def make_handler(backend: str, controller_count: int) -> InputHandler:
+    """Make an input handler with stand-in joysticks."""
+    names = list(ControllerNames)
+    names += [f"controller_{i}" for i in range(len(names), controller_count)]
+    names = names[:controller_count]
+
+    return InputHandler(
+        {name: make_controller() for name in names}, backend=backend,
+        joysticks={name: FakeJoystick(i, AXIS_COUNT, BUTTON_COUNT) for i, name in enumerate(names)},
+    )
+
+
+def make_frames(rng: random.Random, controller_count: int, frames: int, axis_events: int) -> list[list]:
+    """Make each frame's changes as a list of (instance id, kind, index, value) tuples. Buttons and the hat are tapped
+    and let go a few frames later, like a driver does."""
+    releases: dict[int, list] = {}
+    result = []
+    for frame in range(frames):
+        changes = releases.pop(frame, [])
+        for instance_id in range(controller_count):
+            for index in rng.sample(range(AXIS_COUNT), axis_events):
+                changes.append((instance_id, "axis", index, rng.uniform(-1, 1)))
+            if rng.random() < 0.05:
+                index = rng.randrange(BUTTON_COUNT)
+                changes.append((instance_id, "button", index, True))
+                releases.setdefault(frame + rng.randint(3, 20), []).append((instance_id, "button", index, False))
+            if rng.random() < 0.01:
+                changes.append((instance_id, "hat", 0, (rng.choice((-1, 1)), 0)))
+                releases.setdefault(frame + rng.randint(3, 20), []).append((instance_id, "hat", 0, (0, 0)))
+        result.append(changes)
+    return result
+
+
+def to_events(changes: list) -> list[pygame.event.Event]:
+    """Turn a frame's changes into the events pygame would send for them."""
+    events = []
+    for instance_id, kind, index, value in changes:
+        if kind == "axis":
+            events.append(pygame.event.Event(pygame.JOYAXISMOTION, instance_id=instance_id, axis=index, value=value))
+        elif kind == "button":
+            event_type = pygame.JOYBUTTONDOWN if value else pygame.JOYBUTTONUP
+            events.append(pygame.event.Event(event_type, instance_id=instance_id, button=index))
+        else:
+            events.append(pygame.event.Event(pygame.JOYHATMOTION, instance_id=instance_id, hat=index, value=value))
+    return events
+
+
+def apply_to_joysticks(handler: InputHandler, changes: list) -> None:
+    """Set a frame's changes on the stand-in joysticks, for the polling backend to read."""
+    joysticks = {controller.instance_id: controller.joystick for controller in handler.controllers.values()}
+    for instance_id, kind, index, value in changes:
+        joystick = joysticks[instance_id]
+        if kind == "axis":
+            joystick.axes[index] = value
+        elif kind == "button":
+            joystick.buttons[index] = value
+        else:
+            joystick.hat = value
+
+
+def time_polling(controller_count: int, frames: list[list]) -> float:
+    """Get the mean time per frame of the polling backend, in microseconds."""
+    handler = make_handler("polling", controller_count)
+    total = 0
+    for changes in frames:
+        apply_to_joysticks(handler, changes)
+        start = time.perf_counter_ns()
+        handler.update()
+        total += time.perf_counter_ns() - start
+    return total / len(frames) / 1000
+
+
+def time_events(controller_count: int, frames: list[list]) -> float:
+    """Get the mean time per frame of the event backend, in microseconds. Includes draining pygame's queue."""
+    handler = make_handler("events", controller_count)
+    event_frames = [to_events(changes) for changes in frames]
+    total = 0
+    for events in event_frames:
+        start = time.perf_counter_ns()
+        events = pygame.event.get() + events
+        handler.process_events(events)
+        total += time.perf_counter_ns() - start
+    return total / len(frames) / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=5000, help="Number of frames per run.")
+    parser.add_argument("--axis-events", type=int, default=2, help="Axis motion events per controller per frame.")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames, {args.axis_events} axis events per controller per frame")
+    print(f"  {'controllers':>11} {'polling us':>11} {'events us':>10} {'speedup':>8}")
+    for controller_count in (1, 2, 4):
+        frames = make_frames(random.Random(controller_count), controller_count, args.frames, args.axis_events)
+        polling = time_polling(controller_count, frames)
+        events = time_events(controller_count, frames)
+        print(f"  {controller_count:>11} {polling:11.1f} {events:10.1f} {polling / events:7.1f}x")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Compare the per-topic and pin frame modes of ROVConnection.publish_pins.
+
+Run from the topside directory with the ROV's folder on the path, for example:
+    PYTHONPATH=rovs/spike python -m benchmarks.pin_frame_benchmark
+    PYTHONPATH=rovs/spike python -m benchmarks.pin_frame_benchmark --broker localhost --broker-pid 1234
+
+Without --broker, publishes go to a counting stand-in for the paho client so only the topside cost is measured. With
+--broker, the messages are sent to a real MQTT broker, and if psutil is installed and --broker-pid is given, the
+broker's CPU usage is sampled while each mode runs.
+"""
+import argparse
+import time
+
+from config.pin import PinConfig
+from hardware.pin import Pin
+from io_systems.mqtt_handler import ROVConnection
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class CountingClient:
+    """Stand-in for the paho client that only counts publishes and payload bytes."""
+
+    def __init__(self) -> None:
+        self.publishes = 0
+        self.payload_bytes = 0
+
+    def publish(self, topic: str, payload=None, *args, **kwargs) -> None:
+        self.publishes += 1
+        self.payload_bytes += len(topic) + len(payload if isinstance(payload, bytes) else str(payload))
+
+
+def make_pins(count: int) -> dict[str, Pin]:
+    """Make a set of thruster pins to publish.
+
+    Args:
+        count (int):
+            The number of pins.
+
+    Returns:
+        dict[str, Pin]: The pins keyed by name.
+    """
+    return {f"THRUSTER_{i}": Pin(PinConfig(id=i, mode="PWMus", val=1500, freq=50)) for i in range(count)}
+
+
+def run_mode(mode: str, pins: dict[str, Pin], frames: int, rate: float, broker: str | None, port: int,
+             broker_pid: int | None) -> None:
+    """Publish a number of frames where every pin changes and print the results.
+
+    Args:
+        mode (str):
+            The pin publish mode to test.
+        pins (dict[str, Pin]):
+            The pins to publish.
+        frames (int):
+            The number of frames to publish.
+        rate (float):
+            The number of frames per second to publish at, or 0 to publish as fast as possible.
+        broker (str | None):
+            The address of the MQTT broker, or None to use a counting stand-in.
+        port (int):
+            The port of the MQTT broker.
+        broker_pid (int | None):
+            The process ID of the broker to measure CPU usage for.
+    """
+    connection = ROVConnection(port=port, pin_publish_mode=mode)
+
+    counter = CountingClient()
+    if broker is None:
+        connection._client = counter
+    else:
+        # Skip ROVConnection.connect so that no broker gets launched, and count publishes as they are sent.
+        connection._client.connect(host=broker, port=port)
+        connection._client.loop_start()
+        real_publish = connection._client.publish
+
+        def counting_publish(topic, payload=None, *args, **kwargs):
+            counter.publish(topic, payload)
+            return real_publish(topic, payload, *args, **kwargs)
+
+        connection._client.publish = counting_publish
+
+    process = psutil.Process(broker_pid) if psutil is not None and broker_pid is not None else None
+    if process is not None:
+        process.cpu_percent()
+
+    period = 1 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    for frame in range(frames):
+        for i, pin in enumerate(pins.values()):
+            pin.val = 1100 + (frame + i) % 800
+
+        connection.publish_pins(pins)
+
+        if period:
+            remaining = start + (frame + 1) * period - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+    elapsed = time.perf_counter() - start
+
+    broker_cpu = process.cpu_percent() if process is not None else None
+
+    if broker is not None:
+        connection.shutdown()
+
+    print(f"{mode:>6}: {counter.publishes:>7} publishes in {elapsed:.3f} s "
+          f"({counter.publishes / elapsed:,.0f} publishes/s, {frames / elapsed:,.0f} frames/s, "
+          f"{counter.payload_bytes / frames:.0f} bytes/frame)"
+          + (f", broker CPU {broker_cpu:.1f}%" if broker_cpu is not None else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pins", type=int, default=8, help="Number of thruster pins.")
+    parser.add_argument("--frames", type=int, default=6000, help="Number of frames to publish per mode.")
+    parser.add_argument("--rate", type=float, default=0, help="Frames per second, 0 for as fast as possible.")
+    parser.add_argument("--broker", default=None, help="MQTT broker address. Omit to measure the topside only.")
+    parser.add_argument("--port", type=int, default=1883, help="MQTT broker port.")
+    parser.add_argument("--broker-pid", type=int, default=None, help="Broker process ID for CPU measurement.")
+    args = parser.parse_args()
+
+    if args.broker_pid is not None and psutil is None:
+        print("psutil is not installed, broker CPU usage will not be measured.")
+
+    for mode in ("topics", "frame"):
+        run_mode(mode, make_pins(args.pins), args.frames, args.rate, args.broker, args.port, args.broker_pid)
+
+
+if __name__ == "__main__":
+    main()
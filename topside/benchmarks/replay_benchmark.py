@@ -0,0 +1,134 @@
+"""Play a recorded session back through the IO and a control mode as fast as it will go, without controllers, a broker,
+or the dashboard.
+
+Record a session by setting session_log_dir in the ROV's config and flying as usual. Without a log, a synthetic session
+with moving sticks, button taps, and depth readings is made to play instead. The pure manual control mode is played,
+drawing on a dashboard snapshot that nothing displays.
+
+Run from the topside directory with the ROV's folder on the path, for example:
+    PYTHONPATH=rovs/spike python -m benchmarks.replay_benchmark path/to/session --repeat 5
+"""
+import argparse
+import math
+import tempfile
+import time
+
+import rov_config
+from kinematics import Kinematics
+from control_modes.pure_manual import PureManual
+
+from hardware.thruster_pwm import ThrusterPWM, FrameThrusters
+from io_systems import gpio_handler, i2c_handler, mavlink_handler
+from io_systems.io_handler import IO
+from io_systems.session_log import SessionRecorder, SessionReplay
+from rovs.generic_objects.dashboard_host import DashboardSnapshot
+
+
+class ScriptedJoystick:
+    """Stands in for a pygame joystick, sweeping the sticks and tapping the buttons as the frames go by."""
+
+    def __init__(self) -> None:
+        self.frame = 0
+
+    def get_instance_id(self) -> int:
+        return 0
+
+    def get_axis(self, index: int) -> float:
+        return math.sin(self.frame / (50 + 13 * index))
+
+    def get_button(self, index: int) -> bool:
+        return (self.frame + 37 * index) % 200 < 10
+
+    def get_hat(self, index: int) -> tuple[int, int]:
+        return (1, 0) if self.frame % 500 < 20 else (0, 0)
+
+    def quit(self) -> None:
+        pass
+
+
+def synthesize(directory: str, frames: int) -> None:
+    """Record a synthetic session.
+
+    Args:
+        directory (str):
+            The directory to write the log to.
+        frames (int):
+            How many frames to record.
+    """
+    controllers = rov_config.ROVConfig().controllers
+    joystick = ScriptedJoystick()
+    for controller in controllers.values():
+        controller.initialize(joystick)
+
+    recorder = SessionRecorder(directory, controllers)
+    for frame in range(frames):
+        joystick.frame = frame
+        for controller in controllers.values():
+            controller.update()
+
+        # Sensor data arrives more slowly than the loop runs.
+        changes = {}
+        if frame % 10 == 0:
+            changes["ROV/custom/depth_sensor/depth"] = 2 + math.sin(frame / 300)
+        recorder.record(changes)
+    recorder.close()
+
+
+def run(directory: str, repeat: int) -> None:
+    """Play a session back and print how long it took.
+
+    Args:
+        directory (str):
+            The directory of the log.
+        repeat (int):
+            How many times to play the session.
+    """
+    config = rov_config.ROVConfig()
+    replay = SessionReplay(directory)
+
+    io = IO(
+        gpio_handler.GPIOHandler(config.pins), i2c_handler.I2CHandler(config.i2cs), mavlink_handler.MavlinkHandler(),
+        replay.input_handler(config.controllers), replay.connection,
+    )
+    thrusters = {position: ThrusterPWM(thruster_cfg) for position, thruster_cfg in config.thruster_configs.items()}
+    frame = FrameThrusters(thrusters, config.thrust_allocation, io.profiler)
+    control_mode = PureManual(
+        frame, io, Kinematics(config.kinematics_config), lambda mode: None, DashboardSnapshot(config.dash_config)
+    )
+    control_mode_span = io.profiler.span("control_mode.loop")
+
+    played = 0
+    elapsed_ns = 0
+    for _ in range(repeat):
+        replay.rewind()
+        start = time.perf_counter_ns()
+        while not replay.finished:
+            io.update()
+            with control_mode_span:
+                control_mode.loop()
+        elapsed_ns += time.perf_counter_ns() - start
+        played += replay.frame_count
+
+    print(f"{played} frames in {elapsed_ns / 1e9:.2f} s, {played / (elapsed_ns / 1e9):.0f} frames/s, "
+          f"{elapsed_ns / played / 1000:.1f} us per frame")
+    print(io.profiler.report())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", help="The directory of a session log. Leave out to play a synthetic one.")
+    parser.add_argument("--frames", type=int, default=10_000, help="Frames in the synthetic session.")
+    parser.add_argument("--repeat", type=int, default=3, help="How many times to play the session.")
+    args = parser.parse_args()
+
+    if args.log is not None:
+        run(args.log, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthesize(directory, args.frames)
+        run(directory, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
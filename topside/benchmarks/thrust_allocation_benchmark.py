@@ -0,0 +1,139 @@
+"""Compare the direct and optimal thrust allocation modes of FrameThrusters over random motion requests.
+
+For each mode this reports the time per update_thruster_output call and how far the wrench the thrusters actually
+produce is from the requested one. The requested wrench is each motion scaled by the authority of its axis (the most
+the thrusters can produce along that axis alone), which is what the optimal allocator solves for. The direction error
+is the angle between the produced and requested wrench, which is what the pilot notices when thrusters saturate.
+
+Two sets of requests are used: independent random requests, which is the worst case for the optimal allocator's warm
+start, and a smooth random walk, which is closer to a pilot moving the sticks.
+
+Run from the topside directory with the ROV's folder on the path, for example:
+    PYTHONPATH=rovs/spike python -m benchmarks.thrust_allocation_benchmark
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from config.thrust_allocation import ThrustAllocationConfig
+from hardware.thruster_pwm import ThrusterPWM, FrameThrusters, DIRECTION_ORDER
+import rov_config
+
+
+def build_frame(config: rov_config.ROVConfig, allocation_config: ThrustAllocationConfig) -> FrameThrusters:
+    """Build a frame from the ROV's thruster configs.
+
+    Args:
+        config (rov_config.ROVConfig):
+            The ROV config to get the thrusters from.
+        allocation_config (ThrustAllocationConfig):
+            The allocation mode to use.
+
+    Returns:
+        FrameThrusters: The frame.
+    """
+    # The thrusters print their forces and torques when they are created.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FrameThrusters({
+            position: ThrusterPWM(thruster_config) for position, thruster_config in config.thruster_configs.items()
+        }, allocation_config)
+
+
+def random_requests(rng: np.random.Generator, count: int, smooth: bool) -> np.ndarray:
+    """Make a set of motion requests.
+
+    Args:
+        rng (np.random.Generator):
+            The random number generator to use.
+        count (int):
+            The number of requests.
+        smooth (bool):
+            Whether each request should be a small step from the last one rather than independent.
+
+    Returns:
+        np.ndarray: A count x 6 array of motions from -1 to 1, in DIRECTION_ORDER.
+    """
+    if not smooth:
+        return rng.uniform(-1, 1, (count, len(DIRECTION_ORDER)))
+
+    steps = rng.normal(0, 0.05, (count, len(DIRECTION_ORDER)))
+    requests = np.zeros_like(steps)
+    current = np.zeros(len(DIRECTION_ORDER))
+    for i, step in enumerate(steps):
+        current = np.clip(current + step, -1, 1)
+        requests[i] = current
+    return requests
+
+
+def run(frame: FrameThrusters, requests: np.ndarray) -> dict[str, float]:
+    """Time a frame's allocation over a set of requests and measure its tracking error.
+
+    Args:
+        frame (FrameThrusters):
+            The frame to allocate with.
+        requests (np.ndarray):
+            The motion requests, one per row.
+
+    Returns:
+        dict[str, float]: Timing and error statistics.
+    """
+    allocation = frame.motor_matrix.T
+    authority = np.abs(allocation).sum(axis=1)
+
+    times = np.zeros(len(requests))
+    relative_errors = []
+    angle_errors = []
+
+    for i, request in enumerate(requests):
+        motions = {direction: float(request[j]) for j, direction in enumerate(DIRECTION_ORDER)}
+
+        start = time.perf_counter_ns()
+        frame.update_thruster_output(motions)
+        times[i] = time.perf_counter_ns() - start
+
+        wrench = request * authority
+        produced = allocation @ frame.power_array
+        requested_norm = np.linalg.norm(wrench)
+        if requested_norm < 1e-9:
+            continue
+
+        relative_errors.append(np.linalg.norm(produced - wrench) / requested_norm)
+        produced_norm = np.linalg.norm(produced)
+        if produced_norm > 1e-9:
+            cosine = np.clip(produced @ wrench / (produced_norm * requested_norm), -1, 1)
+            angle_errors.append(np.degrees(np.arccos(cosine)))
+
+    return {
+        "mean_us": times.mean() / 1000,
+        "p99_us": np.percentile(times, 99) / 1000,
+        "max_us": times.max() / 1000,
+        "relative_error": float(np.mean(relative_errors)),
+        "angle_error": float(np.mean(angle_errors)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Number of motion requests per run.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    config = rov_config.ROVConfig()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{len(config.thruster_configs)} thrusters, {args.requests} requests per run")
+    print(f"  {'requests':<8} {'mode':<8} {'mean us':>9} {'p99 us':>9} {'max us':>9} {'wrench err':>11} {'angle err':>10}")
+    for smooth in (False, True):
+        requests = random_requests(rng, args.requests, smooth)
+        for mode in ("direct", "optimal"):
+            frame = build_frame(config, ThrustAllocationConfig(mode=mode))
+            stats = run(frame, requests)
+            print(f"  {'smooth' if smooth else 'random':<8} {mode:<8} {stats['mean_us']:9.1f} {stats['p99_us']:9.1f} "
+                  f"{stats['max_us']:9.1f} {stats['relative_error']:10.1%} {stats['angle_error']:9.2f}°")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare the cached allocation matrix in FrameThrusters against rebuilding it on every call.
+
+Run from the topside directory with the ROV's folder on the path, for example:
+    PYTHONPATH=rovs/spike python -m benchmarks.thruster_allocation_benchmark
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from enums import Directions
+from hardware.thruster_pwm import ThrusterPWM, FrameThrusters, DIRECTION_ORDER
+import rov_config
+
+
+def rebuilt_allocation(frame: FrameThrusters, motions: dict[Directions, float]) -> np.ndarray:
+    """The allocation as it used to be done, rebuilding the motor matrix from each thruster with list appends.
+
+    Args:
+        frame (FrameThrusters):
+            The frame to get the thrusters from.
+        motions (dict[Directions, float]):
+            The requested motions.
+
+    Returns:
+        np.ndarray: The unscaled thrust of each thruster.
+    """
+    key_order = []
+    key_forces = []
+    for key, t in frame.thrusters.items():
+        key_order.append(key)
+        key_forces.append([t.forces.x, t.forces.y, t.forces.z, t.torques.yaw, t.torques.pitch, t.torques.roll])
+
+    motor_matrix = np.array(key_forces)
+    desired_direction_matrix = np.array([[motions[direction]] for direction in DIRECTION_ORDER])
+
+    return np.array(list((motor_matrix @ desired_direction_matrix).flatten()))
+
+
+def cached_allocation(frame: FrameThrusters, motions: dict[Directions, float]) -> np.ndarray:
+    """The allocation using the cached motor matrix and preallocated buffers.
+
+    Args:
+        frame (FrameThrusters):
+            The frame to allocate with.
+        motions (dict[Directions, float]):
+            The requested motions.
+
+    Returns:
+        np.ndarray: The unscaled thrust of each thruster.
+    """
+    motion_vector = frame._motion_vector
+    for i, direction in enumerate(DIRECTION_ORDER):
+        motion_vector[i] = motions[direction]
+
+    return np.matmul(frame.motor_matrix, motion_vector, out=frame._thrust_vector)
+
+
+def time_calls(func, frame: FrameThrusters, requests: list[dict[Directions, float]]) -> float:
+    """Time a function over every request.
+
+    Returns:
+        float: The mean time per call in microseconds.
+    """
+    start = time.perf_counter_ns()
+    for motions in requests:
+        func(frame, motions)
+    return (time.perf_counter_ns() - start) / len(requests) / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="Number of allocations to time.")
+    args = parser.parse_args()
+
+    # The thrusters print their forces and torques when they are created.
+    with contextlib.redirect_stdout(io.StringIO()):
+        config = rov_config.ROVConfig()
+        frame = FrameThrusters({
+            position: ThrusterPWM(thruster_config) for position, thruster_config in config.thruster_configs.items()
+        })
+
+    random.seed(0)
+    requests = [{direction: random.uniform(-1, 1) for direction in Directions} for _ in range(args.calls)]
+
+    for motions in requests[:100]:
+        assert np.allclose(rebuilt_allocation(frame, motions), cached_allocation(frame, motions))
+
+    rebuilt = time_calls(rebuilt_allocation, frame, requests)
+    cached = time_calls(cached_allocation, frame, requests)
+    full = time_calls(FrameThrusters.update_thruster_output, frame, requests)
+
+    print(f"{len(frame.thrusters)} thrusters, {args.calls} calls")
+    print(f"  rebuilt matrix:        {rebuilt:7.2f} us/call")
+    print(f"  cached matrix:         {cached:7.2f} us/call ({rebuilt / cached:.1f}x faster)")
+    print(f"  update_thruster_output {full:7.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
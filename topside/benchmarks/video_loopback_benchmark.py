@@ -0,0 +1,184 @@
+"""Measure how old the video is by the time it's shown, with the whole pipeline running on one machine.
+
+A loopback sender stands in for the ROV. It draws frames, stamps them with the time on its own clock, which is set a
+long way off from the surface's, and encodes and sends them over UDP on localhost just as the ROV does. It also answers
+the clock sync pings after a short delay, as the MQTT link would. The surface side is the real VideoHandler: it puts the
+frames back together, decodes them, and works out the offset between the clocks. A stand-in dashboard shows the latest
+frame of each stream at the dashboard rate and records how old each one was.
+
+Run from the topside directory, for example:
+    python -m benchmarks.video_loopback_benchmark --streams 2 --fps 30 --loss 0.01
+"""
+import argparse
+import random
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config.video import VideoConfig
+from io_systems.clock_sync import ClockSync, PING_COMMAND
+from io_systems.video_handler import VideoHandler
+from io_systems.video_packets import packetize_frame
+
+# How far the stand-in ROV's clock is ahead of the surface's. Nothing on the surface side knows this.
+ROV_CLOCK_OFFSET_NS = 123_456_789_000
+
+
+def rov_clock() -> int:
+    """Get the time on the stand-in ROV's clock, in nanoseconds."""
+    return time.monotonic_ns() + ROV_CLOCK_OFFSET_NS
+
+
+class LoopbackSender:
+    """Sends a stream of frames to localhost the way the ROV does, from a thread of its own."""
+
+    def __init__(self, port: int, width: int, height: int, fps: float, quality: int, chunk_size: int,
+                 loss: float, seed: int) -> None:
+        self._address = ("127.0.0.1", port)
+        self._width = width
+        self._height = height
+        self._period = 1 / fps
+        self._quality = quality
+        self._chunk_size = chunk_size
+        self._loss = loss
+        self._rng = random.Random(seed)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"LoopbackSender:{port}", daemon=True)
+
+        self.frames_sent = 0
+        self.encode_ns = 0
+
+        # A gradient with a bar sweeping across it, so the frames change and compress like a real picture does.
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        self._background = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                                      np.full((height, width), 96, np.float32)]).astype(np.uint8)
+        self._image = self._background.copy()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self._socket.close()
+
+    def _draw(self, frame_id: int) -> np.ndarray:
+        """Draw a frame, the stand-in for reading the camera."""
+        np.copyto(self._image, self._background)
+        bar = (frame_id * 8) % self._width
+        self._image[:, bar:bar + 16] = 255
+        return self._image
+
+    def _run(self) -> None:
+        deadline = time.monotonic()
+        frame_id = 0
+        while not self._stop_event.is_set():
+            image = self._draw(frame_id)
+            capture_ns = rov_clock()
+
+            start = time.perf_counter_ns()
+            _, encoded = cv2.imencode(".jpg", image, (cv2.IMWRITE_JPEG_QUALITY, self._quality))
+            self.encode_ns += time.perf_counter_ns() - start
+
+            for datagram in packetize_frame(frame_id, encoded, self._chunk_size, capture_ns):
+                if self._rng.random() >= self._loss:
+                    self._socket.sendto(datagram, self._address)
+            self.frames_sent += 1
+            frame_id += 1
+
+            deadline += self._period
+            now = time.monotonic()
+            if now > deadline:
+                deadline = now
+            self._stop_event.wait(deadline - now)
+
+
+class LoopbackLink:
+    """Stands in for the MQTT link to the ROV, answering each clock sync ping after a delay each way."""
+
+    def __init__(self, delay: float) -> None:
+        self._delay = delay
+        self.clock_sync: ClockSync | None = None
+
+    def publish(self, commands: dict[str, str | float]) -> None:
+        if PING_COMMAND in commands:
+            threading.Timer(self._delay, self._pong, (commands[PING_COMMAND],)).start()
+
+    def _pong(self, sent: int) -> None:
+        reply = [sent, rov_clock()]
+        threading.Timer(self._delay, self.clock_sync.handle_pong, (reply,)).start()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=2, help="Number of video streams.")
+    parser.add_argument("--seconds", type=float, default=10, help="How long to run for.")
+    parser.add_argument("--fps", type=float, default=30, help="Frame rate of each stream.")
+    parser.add_argument("--width", type=int, default=1280, help="Width of the frames sent.")
+    parser.add_argument("--height", type=int, default=720, help="Height of the frames sent.")
+    parser.add_argument("--quality", type=int, default=75, help="JPEG quality of the frames sent.")
+    parser.add_argument("--chunk-size", type=int, default=VideoConfig("").chunk_size, help="Datagram size.")
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of datagrams to drop.")
+    parser.add_argument("--link-delay-ms", type=float, default=2, help="One way delay of the clock sync pings.")
+    parser.add_argument("--display-rate", type=float, default=30, help="Rate the stand-in dashboard shows frames at.")
+    parser.add_argument("--port", type=int, default=5600, help="First port to send on.")
+    args = parser.parse_args()
+
+    link = LoopbackLink(args.link_delay_ms / 1000)
+    clock_sync = ClockSync(link.publish, interval=0.25)
+    link.clock_sync = clock_sync
+
+    configs = {
+        f"frame{i}": VideoConfig("127.0.0.1", args.port + i, chunk_size=args.chunk_size, buffer_size=1 << 22)
+        for i in range(args.streams)
+    }
+    handler = VideoHandler(configs, clock_sync=clock_sync)
+    senders = [
+        LoopbackSender(config.port, args.width, args.height, args.fps, args.quality, args.chunk_size, args.loss, i)
+        for i, config in enumerate(configs.values())
+    ]
+
+    handler.start()
+    for sender in senders:
+        sender.start()
+
+    # The stand-in dashboard, which shows each stream's newest frame at the dashboard rate.
+    shown: dict[str, int] = {}
+    period = 1 / args.display_rate
+    end = time.monotonic() + args.seconds
+    while time.monotonic() < end:
+        handler.update()
+        for name, stream in handler.streams.items():
+            frame = stream.latest()
+            if frame is not None and shown.get(name) != frame.frame_id:
+                handler.frame_shown(name, frame)
+                shown[name] = frame.frame_id
+        time.sleep(period)
+
+    # The stats cover the last second, so read them before anything stops.
+    summary = handler.summary()
+    for sender in senders:
+        sender.stop()
+    handler.stop()
+
+    print(f"{args.streams} streams of {args.width}x{args.height} at {args.fps:g} fps, quality {args.quality}, "
+          f"{args.loss:.1%} datagram loss")
+    for name, sender in zip(configs, senders):
+        print(f"  {name}: {sender.frames_sent} frames sent, encode {sender.encode_ns / sender.frames_sent / 1e6:.1f} ms")
+    if clock_sync.synced:
+        error = clock_sync.offset_ns - ROV_CLOCK_OFFSET_NS
+        print(f"  clock offset error {error / 1e6:+.3f} ms over a {clock_sync.rtt_ns / 1e6:.1f} ms round trip")
+    print()
+    print(summary)
+    print()
+    print(handler.report())
+
+
+if __name__ == "__main__":
+    main()
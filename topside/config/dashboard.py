@@ -1,5 +1,8 @@
 from typing import NamedTuple
 
+# The display that shows whichever video stream is selected. Every other display shows the stream of the same name.
+MAIN_DISPLAY = "main"
+
 
 class LabelConfig(NamedTuple):
     """A configuration for a label on the dashboard.
@@ -66,6 +69,27 @@ class ImageConfig(NamedTuple):
     cspan: int = 1
 
 
+class DisplayConfig(NamedTuple):
+    """A configuration for a video display on the dashboard.
+
+    Attributes:
+        name (str): The name of the display, which is the name of the video stream it shows, or MAIN_DISPLAY.
+        row (int): The row of the display.
+        column (int): The column of the display.
+        width (int): The width the video is shown at.
+        height (int): The height the video is shown at.
+        rspan (int): The number of rows spanned by the display.
+        cspan (int): The number of columns spanned by the display.
+    """
+    name: str
+    row: int
+    column: int
+    width: int
+    height: int
+    rspan: int = 1
+    cspan: int = 1
+
+
 class DashboardConfig(NamedTuple):
     """A configuration for a dashboard.
 
@@ -73,6 +97,11 @@ class DashboardConfig(NamedTuple):
         labels (tuple[LabelConfig, ...]): The labels on the dashboard.
         scales (tuple[ScaleConfig, ...]): The slider bars on the dashboard.
         images (tuple[ImageConfig, ...]): The orientation markers on the dashboard.
+        displays (tuple[DisplayConfig, ...]): The video displays on the dashboard.
+        rotation_resolution (float): The angle between the pre-rendered turns of each orientation marker, in degrees.
+        rotation_cache_size (int | None): The most turns of each orientation marker to keep, or None to keep them all.
+        prerender_rotations (bool): Whether to render every turn of the orientation markers when the dashboard opens
+            rather than the first time each is shown. Every turn is then kept, whatever rotation_cache_size is.
     """
 
     # Labels
@@ -85,5 +114,9 @@ class DashboardConfig(NamedTuple):
     images: tuple[ImageConfig, ...]
 
     # Cameras
-    # put_display("frame0", 1, 0, rspan=5)
-    # put_display("frame1", 6, 0, rspan=5)
+    displays: tuple[DisplayConfig, ...] = ()
+
+    # Orientation marker rotation
+    rotation_resolution: float = 1
+    rotation_cache_size: int | None = 90
+    prerender_rotations: bool = False
@@ -0,0 +1,20 @@
+from typing import Literal, NamedTuple
+
+
+class InputSamplerConfig(NamedTuple):
+    """Describe how the input sampler reads the controllers when the input backend is "sampled".
+
+    Attributes:
+        rate (float):
+            How many times a second to read the controllers, in Hz. Presses shorter than one reading can still be
+            missed, so this should be a few times faster than the control loop.
+        capacity (int):
+            How many readings of each controller to keep. Readings the main loop hasn't got to before they are
+            overwritten are lost, so this should cover the longest stall of the main loop.
+        axis_filter (Literal["mean", "latest"]):
+            How the readings of an axis during a frame are combined. "mean" averages them, which smooths out noise
+            at the cost of half a frame of lag. "latest" takes the most recent one.
+    """
+    rate: float = 250
+    capacity: int = 256
+    axis_filter: Literal["mean", "latest"] = "mean"
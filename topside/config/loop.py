@@ -0,0 +1,24 @@
+from typing import NamedTuple
+
+
+class LoopConfig(NamedTuple):
+    """Describe the rates the main loop runs each of its stages at.
+
+    Attributes:
+        control_rate (float):
+            How many times a second to update the IO and run the control mode, in Hz.
+        dashboard_rate (float):
+            How many times a second to redraw the dashboard, in Hz.
+        telemetry_rate (float):
+            How many times a second to run the ROV's slower telemetry work, in Hz.
+        spin_threshold_ns (int):
+            How long before a deadline to stop sleeping and busy wait instead, in nanoseconds. Sleeping can overshoot
+            by a fair fraction of a millisecond, so the last part of the wait is spun to hit the deadline precisely.
+        jitter_buckets_us (tuple[int, ...]):
+            The upper edges of the histogram buckets that each stage's lateness is counted in, in microseconds.
+    """
+    control_rate: float = 100
+    dashboard_rate: float = 30
+    telemetry_rate: float = 10
+    spin_threshold_ns: int = 500_000
+    jitter_buckets_us: tuple[int, ...] = (50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000)
@@ -0,0 +1,59 @@
+from typing import Literal, NamedTuple
+
+
+class MavlinkConfig(NamedTuple):
+    """Describe how MAVLink messages from the flight controller reach the surface.
+
+    Attributes:
+        transport (Literal["json", "mqtt", "udp"]):
+            How the messages are carried. "json" has the ROV send each message as JSON on ROV/mavlink/<message type>.
+            "mqtt" has it pass the raw MAVLink v2 frames through on a single MQTT topic, and "udp" in UDP datagrams.
+            The raw frames are parsed on a background thread, which saves encoding and decoding JSON at both ends.
+        topic (str):
+            The topic the raw frames arrive on when the transport is "mqtt".
+        ip_address (str):
+            The address to listen for the raw frames on when the transport is "udp".
+        port (int):
+            The port to listen for the raw frames on when the transport is "udp".
+        buffer_size (int):
+            The size of the socket's receive buffer when the transport is "udp", in bytes.
+        timeout (float):
+            How long the UDP receiver waits for a datagram before checking whether it should stop, in seconds.
+        history_size (int):
+            How many of the latest samples of each subscribed message type to keep. At a 10 ms interval, 256 samples
+            cover a little over 2.5 seconds.
+        command_timeout (float):
+            How long to wait for a command to be acknowledged before sending it again, in seconds.
+        command_retries (int):
+            How many times to send a command again before giving up on it.
+        command_backoff (float):
+            The factor the wait for an acknowledgement grows by after each attempt.
+    """
+    transport: Literal["json", "mqtt", "udp"] = "json"
+    topic: str = "ROV/mavlink_raw"
+    ip_address: str = "0.0.0.0"
+    port: int = 14550
+    buffer_size: int = 65535
+    timeout: float = .25
+    history_size: int = 256
+    command_timeout: float = 1.0
+    command_retries: int = 3
+    command_backoff: float = 2.0
+
+
+class StreamRateConfig(NamedTuple):
+    """Describe how often the flight controller is asked to send each message type, and how closely that's checked.
+
+    Attributes:
+        idle_rate (float):
+            How many times a second to ask for the subscribed message types no active control mode reads, in Hz. 0
+            asks the flight controller to stop sending them.
+        check_interval (float):
+            How long to count each message type's arrivals for before comparing the rate to the one asked for, in
+            seconds.
+        under_delivery (float):
+            The fraction of the rate asked for below which a message type is asked for again.
+    """
+    idle_rate: float = 1.0
+    check_interval: float = 2.0
+    under_delivery: float = 0.8
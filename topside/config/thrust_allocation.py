@@ -0,0 +1,29 @@
+from typing import Literal, NamedTuple
+
+
+class ThrustAllocationConfig(NamedTuple):
+    """Describe how requested motions are turned into thruster powers.
+
+    Attributes:
+        mode (Literal["direct", "optimal"]):
+            "direct" multiplies the motions by the motor matrix and scales the lateral and vertical thrusters so the
+            largest of each matches the requested magnitude. "optimal" solves a bounded least squares problem for the
+            thruster powers that get as close as possible to the requested wrench without any thruster going past its
+            limits.
+        axis_weights (tuple[float, float, float, float, float, float]):
+            How much an error in each axis matters to the optimal allocator, in the order forwards, right, up, yaw,
+            pitch, roll. Raise an axis' weight to protect it when the thrusters saturate.
+        regularization (float):
+            Penalty on the total thruster power. Keeps the solution unique when thrusters are redundant and stops
+            thrusters fighting each other for no gain.
+        max_iterations (int):
+            The most solver iterations to run in a frame. Each iteration moves at most one thruster on or off its
+            limit, so this only needs to be a few times the number of thrusters.
+        tolerance (float):
+            How far from optimal a solution can be and still be accepted.
+    """
+    mode: Literal["direct", "optimal"] = "direct"
+    axis_weights: tuple[float, float, float, float, float, float] = (1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+    regularization: float = 1e-4
+    max_iterations: int = 50
+    tolerance: float = 1e-9
@@ -6,6 +6,20 @@ import config.typed_range as typed_range
 from utilities.vector import Vector3
 
 
+class PWMCurveConfig(NamedTuple):
+    """A thruster's power to PWM curve, for thrusters whose thrust is not proportional to their PWM pulse.
+
+    Attributes:
+        power (tuple[float, ...]):
+            Increasing power values from -1 to 1. Power here is the fraction of the thruster's full thrust in that
+            direction, after the thrust scale has been applied but before the output is reversed.
+        pwm (tuple[float, ...]):
+            The PWM pulse that gives each power.
+    """
+    power: tuple[float, ...]
+    pwm: tuple[float, ...]
+
+
 class ThrusterConfig(NamedTuple):
     """Configuration for a PWM thruster.
 
@@ -33,6 +47,8 @@ class ThrusterConfig(NamedTuple):
         reverse_thrust (bool): Set to true if the thruster is reversed, this will invert the pwm output only.
         reverse_polarity (bool):
             Whether the thruster has reverse polarity.
+        pwm_curve (PWMCurveConfig | None):
+            The thruster's power to PWM curve. If None, the PWM pulse is linear in power across pwm_pulse_range.
     """
     name: ThrusterPositions
     pwm_pulse_range: typed_range.IntRange
@@ -41,3 +57,4 @@ class ThrusterConfig(NamedTuple):
     reversed_thrust: bool = False
     thrust: float = 1.0
     reverse_polarity: bool = False
+    pwm_curve: PWMCurveConfig | None = None
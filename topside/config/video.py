@@ -8,6 +8,66 @@ class VideoConfig(NamedTuple):
     timeout: float = .25
     max_attempts: int = 40
     buffer_size: int = 65535
+    # The size of each datagram, including its header. The ROV must send with the same size.
     chunk_size: int = 16384
+    # The size the frames are decoded to. Frames that arrive bigger are decoded at a reduced size where they can be.
     width: int = 640
     height: int = 480
+    # Whether to flip the frames left to right before they're shown.
+    mirror: bool = True
+    # The largest encoded frame that can be received, in bytes.
+    max_frame_size: int = 1 << 20
+    # How many frames can be put back together at once, so datagrams arriving out of order still count.
+    max_pending_frames: int = 4
+    # How long a frame can wait for its missing datagrams before it's dropped, in seconds.
+    reassembly_timeout: float = 0.1
+
+
+class VideoQualityConfig(NamedTuple):
+    """Describe how the video quality backs off when the link to the ROV is congested and recovers when it clears.
+
+    The quality of each stream is set by a level between min_level and 1. Each update, the level drops by the backoff
+    factor if the link is congested and otherwise climbs by the increase, so it settles just under what the link can
+    carry. The JPEG quality follows the level, and the frame rate only starts to drop once the level is below the fps
+    knee. The resolution backs off in the same way, but only when frames take too long to decode.
+
+    Attributes:
+        increase (float):
+            How much the level climbs each update while the link is clear.
+        backoff (float):
+            The factor the level is multiplied by when the link is congested.
+        hold (float):
+            How long to wait after backing off before backing off again, in seconds. The stats cover the last second,
+            so backing off again any sooner would react to the same congestion twice.
+        min_level (float):
+            The lowest the level can go.
+        fps_knee (float):
+            The level below which the frame rate is lowered along with the quality.
+        loss_threshold (float):
+            The fraction of frames lost since the last update above which the link counts as congested.
+        reassembly_limit_ms (float):
+            The 95th percentile time for a frame's datagrams to arrive above which the link counts as congested, in
+            milliseconds. It rises as the datagrams queue up on the way.
+        max_kbps (float | None):
+            The most video the link should carry, in kilobits a second, or None for no limit.
+        decode_budget_ms (float):
+            The 95th percentile decode time above which the resolution is lowered, in milliseconds.
+        min_height (int):
+            The lowest resolution to ask for, as a height in pixels.
+        min_fps (int):
+            The lowest frame rate to ask for.
+        min_quality (int):
+            The lowest JPEG quality to ask for.
+    """
+    increase: float = 0.05
+    backoff: float = 0.7
+    hold: float = 1.0
+    min_level: float = 0.1
+    fps_knee: float = 0.5
+    loss_threshold: float = 0.02
+    reassembly_limit_ms: float = 50
+    max_kbps: float | None = None
+    decode_budget_ms: float = 20
+    min_height: int = 50
+    min_fps: int = 1
+    min_quality: int = 10
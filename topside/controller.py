@@ -9,13 +9,19 @@ Classes:
         Handles a hat for the controller.
     Controller:
         Mapping of axes and button numbers to specific configurations.
+    InputFrame:
+        The readings of a controller's inputs gathered over a frame by a sampler.
 
 Functions:
     combine_triggers(trigger_1: float, trigger_2: float) -> float:
         Combines the values of the two triggers into a single value.
+    hat_directions(value: tuple[int, int]) -> tuple[bool, bool, bool, bool]:
+        Gets which directions a hat is pushed in.
 """
 import time
+from typing import NamedTuple
 
+import numpy as np
 import pygame
 
 import enums
@@ -36,10 +42,14 @@ class Axis:
             The expected range of the input.
         output_range (range_util.Range):
             The output range to map the input to.
+        raw_value (float):
+            The latest raw reading of the axis.
 
     Methods:
         update(joystick: type(pygame.joystick.Joystick)) -> None:
             Update the value of the axis from the controller.
+        set_raw(value: float) -> None:
+            Update the value of the axis from a raw reading.
     """
 
     _index: int
@@ -69,14 +79,23 @@ class Axis:
         self._inverted: bool = inverted
 
         self._value: float = 0.0
+        self._raw_value: float = 0.0
 
         self._input_range = input_range
         self._output_range = output_range
 
+        # The range above the deadzone only changes with the deadzone or input range, so it is built once here rather
+        # than on every reading.
+        self._deadzone_range = range_util.Range(deadzone, input_range.max_value)
+
     @property
     def value(self) -> float:
         return self._value
 
+    @property
+    def raw_value(self) -> float:
+        return self._raw_value
+
     @property
     def index(self) -> int:
         return self._index
@@ -100,6 +119,7 @@ class Axis:
     @deadzone.setter
     def deadzone(self, deadzone: float) -> None:
         self._deadzone = deadzone
+        self._deadzone_range = range_util.Range(deadzone, self._input_range.max_value)
 
     @inverted.setter
     def inverted(self, inverted: bool) -> None:
@@ -108,6 +128,7 @@ class Axis:
     @input_range.setter
     def input_range(self, input_range: range_util.Range) -> None:
         self._input_range = input_range
+        self._deadzone_range = range_util.Range(self._deadzone, input_range.max_value)
 
     @output_range.setter
     def output_range(self, output_range: range_util.Range) -> None:
@@ -121,39 +142,41 @@ class Axis:
             joystick (type(pygame.joystick.Joystick)):
                 The joystick to get the axis value from.
         """
-        # Get the raw value of the axis.
-        value = joystick.get_axis(self._index)
+        self.set_raw(joystick.get_axis(self._index))
+
+    def set_raw(self, value: float) -> None:
+        """Update the value of the axis from a raw reading, such as the value of a joystick axis motion event.
+
+        Args:
+            value (float):
+                The raw value of the axis.
+        """
+        self._raw_value = value
 
         # Invert the value if necessary.
         if self._inverted:
             value = -value
 
         # Apply the deadzone to the value.
-        deadzoned_value = self._apply_deadzone(value, deadzone=self._deadzone, input_range=self._input_range)
+        deadzoned_value = self._apply_deadzone(value)
 
         # Scale the value to the output range.
         scaled_value = self._output_range.map(deadzoned_value, self._input_range)
 
         self._value = scaled_value
 
-    @classmethod
-    def _apply_deadzone(cls, value: float, deadzone: float, input_range: range_util.Range) -> float:
-        """Applies a deadzone to the input value.
+    def _apply_deadzone(self, value: float) -> float:
+        """Applies the deadzone to the input value.
 
         Args:
             value (float):
                 The input value to apply the deadzone to.
-            deadzone (float):
-                The deadzone to apply to the value.
-            input_range (range.Range):
-                The range of the input value.
 
         Returns:
             float: The input value with the deadzone applied.
         """
         # Normalize the abs val of the input value. If the value is negative, that means it's below the deadzone cutoff.
-        input_range = range_util.Range(deadzone, input_range.max_value)
-        input_norm = input_range.normalize(abs(value))
+        input_norm = self._deadzone_range.normalize(abs(value))
 
         # Check if the input is above the deadzone cutoff.
         if input_norm > 0:
@@ -186,10 +209,22 @@ class Button:
             Whether the button had begun to be pressed during this frame.
         just_released (bool):
             Whether the button had begun to be released during this frame.
+        raw_state (bool):
+            The latest raw reading of the button, before negation.
+        press_count (int):
+            How many times the button was pressed during this frame.
+        release_count (int):
+            How many times the button was released during this frame.
+        needs_tick (bool):
+            Whether the button's state can still change without a new reading.
 
     Methods:
         update(joystick: type(pygame.joystick.Joystick)) -> None:
             Update the value of the button from the controller.
+        apply_samples(state: bool, rises: int, falls: int, rise_time: float, fall_time: float) -> None:
+            Update the button from several readings taken during a frame.
+        tick() -> None:
+            Advance the button by a frame without a new reading.
         toggle() -> None:
             Alternate the toggled value of the button.
     """
@@ -215,9 +250,15 @@ class Button:
         self._released: bool = False
         self._just_pressed: bool = False
         self._just_released: bool = False
+        self._press_count: int = 0
+        self._release_count: int = 0
 
+        # Seconds on the monotonic clock, so that changes to the wall clock can't make the button look held.
         self._last_pressed_time: float = 0.0
 
+        # The last reading, before negation, so the button can be advanced a frame without a new one.
+        self._raw_state: bool = False
+
     @property
     def index(self) -> int:
         """The index of the button on the controller."""
@@ -319,6 +360,33 @@ class Button:
         """
         return self._just_released
 
+    @property
+    def raw_state(self) -> bool:
+        """Return the latest raw reading of the button, before negation.
+
+        Returns:
+            bool: True if the button was down in the latest reading, False otherwise.
+        """
+        return self._raw_state
+
+    @property
+    def press_count(self) -> int:
+        """Return how many times the button was pressed during this frame. Only a sampler can see more than one.
+
+        Returns:
+            int: The number of presses.
+        """
+        return self._press_count
+
+    @property
+    def release_count(self) -> int:
+        """Return how many times the button was released during this frame. Only a sampler can see more than one.
+
+        Returns:
+            int: The number of releases.
+        """
+        return self._release_count
+
     def update(self, val_source: type(pygame.joystick.Joystick) | bool) -> None:
         """Update the value of the button from the controller. Used internally, Do not call this method directly outside
         the Controller or Hat classes.
@@ -336,32 +404,90 @@ class Button:
         #     raise TypeError(f"val_source must be a bool or a {type(pygame.joystick.JoystickType)}, " +
         #     "not {type(val_source)}.")
         else:
-            state = val_source.get_button(self._index)
+            state = bool(val_source.get_button(self._index))
+
+        self._raw_state = state
 
         # If the button is negated, invert the state.
         if self._negated:
             state = not state
 
-        # Update the button states.
-
         # The button is considered just pressed if it was not pressed in the previous loop but is pressed now. The
         # opposite is true for just released.
-        self._just_pressed = state and not self._pressed
-        self._just_released = not state and self._pressed
+        self._apply(state, int(state and not self._pressed), int(not state and self._pressed), time.monotonic())
+
+    def apply_samples(self, state: bool, rises: int, falls: int, rise_time: float, fall_time: float) -> None:
+        """Update the button from several readings taken during a frame, so that presses shorter than a frame still
+        count. Used internally by the Controller and Hat classes.
+
+        Args:
+            state (bool):
+                The latest raw value of the button, before negation.
+            rises (int):
+                How many times the raw value went from False to True during the frame.
+            falls (int):
+                How many times the raw value went from True to False during the frame.
+            rise_time (float):
+                When the raw value last went from False to True, in seconds on the monotonic clock.
+            fall_time (float):
+                When the raw value last went from True to False, in seconds on the monotonic clock.
+        """
+        self._raw_state = state
+
+        if self._negated:
+            self._apply(not state, falls, rises, fall_time)
+        else:
+            self._apply(state, rises, falls, rise_time)
+
+    def _apply(self, state: bool, presses: int, releases: int, press_time: float) -> None:
+        """Update the button states.
+
+        Args:
+            state (bool):
+                Whether the button is pressed now, after negation.
+            presses (int):
+                How many times the button was pressed since the last frame.
+            releases (int):
+                How many times the button was released since the last frame.
+            press_time (float):
+                When the button was last pressed, in seconds on the monotonic clock.
+        """
+        # The readings that held an edge may have been lost, in which case the edge is counted now.
+        if state != self._pressed and presses == releases:
+            if state:
+                presses += 1
+                press_time = time.monotonic()
+            else:
+                releases += 1
+
+        self._just_pressed = presses > 0
+        self._just_released = releases > 0
+        self._press_count = presses
+        self._release_count = releases
 
         # Now, update whether the button is pressed, held, or released.
         self._pressed = state
         self._released = not self._pressed
 
+        # Update the last press time first so that the hold delay is measured from this press.
+        if presses:
+            if presses % 2:
+                self.toggle()
+            self._last_pressed_time = press_time
+
         # The button is considered held if it is pressed and the time since the last press is greater than the hold
         # delay. This is similar to pressing a key on a keyboard and holding it down to get the key repeat.
-        self._held = self._pressed and (time.time() - self._last_pressed_time) > self._hold_delay
+        self._held = self._pressed and (time.monotonic() - self._last_pressed_time) > self._hold_delay
 
-        # Finally, update the last press time if the button was just pressed so that the hold delay can be calculated
-        # correctly.
-        if self._just_pressed:
-            self.toggle()
-            self._last_pressed_time = time.time()
+    @property
+    def needs_tick(self) -> bool:
+        """Whether the button's state can still change without a new reading. Just pressed and just released only
+        last a frame, and a pressed button becomes held after the hold delay."""
+        return self._just_pressed or self._just_released or (self._pressed and not self._held)
+
+    def tick(self) -> None:
+        """Advance the button by a frame without a new reading, as if the last reading had been read again."""
+        self.update(self._raw_state)
 
     def toggle(self) -> None:
         """Alternate the toggled value of the button."""
@@ -371,6 +497,28 @@ class Button:
         return self._pressed
 
 
+# The order of the directions of a hat wherever they are listed together.
+HAT_DIRECTIONS = (
+    enums.ControllerHatButtonNames.DPAD_LEFT,
+    enums.ControllerHatButtonNames.DPAD_RIGHT,
+    enums.ControllerHatButtonNames.DPAD_UP,
+    enums.ControllerHatButtonNames.DPAD_DOWN,
+)
+
+
+def hat_directions(value: tuple[int, int]) -> tuple[bool, bool, bool, bool]:
+    """Gets which directions a hat is pushed in, in the order of HAT_DIRECTIONS.
+
+    Args:
+        value (tuple[int, int]):
+            The x and y value of the hat, each -1, 0, or 1.
+
+    Returns:
+        tuple[bool, bool, bool, bool]: Whether the hat is pushed left, right, up, and down.
+    """
+    return value[0] == -1, value[0] == 1, value[1] == 1, value[1] == -1
+
+
 class Hat:
     """Handles a hat for the controller.
 
@@ -381,10 +529,18 @@ class Hat:
             Whether to invert the x value of the hat.
         invert_y (bool):
             Whether to invert the y value of the hat.
+        value (tuple[int, int]):
+            The latest raw x and y value of the hat.
 
     Methods:
         update(joystick: type(pygame.joystick.Joystick)) -> None:
             Update the value of the hat.
+        set_value(value: tuple[int, int]) -> None:
+            Update the value of the hat from a raw reading.
+        apply_samples(value: tuple[int, int], rises, falls, rise_times, fall_times) -> None:
+            Update the hat's buttons from several readings taken during a frame.
+        tick() -> None:
+            Advance the hat's buttons by a frame without a new reading.
     """
 
     def __init__(self, index: int, invert_x: bool = False, invert_y: bool = False) -> None:
@@ -401,6 +557,7 @@ class Hat:
         self._index: int = index
         self._invert_x: bool = invert_x
         self._invert_y: bool = invert_y
+        self._value: tuple[int, int] = (0, 0)
 
         self.buttons = {
             enums.ControllerHatButtonNames.DPAD_LEFT: Button(-1, negated=invert_x),
@@ -414,6 +571,11 @@ class Hat:
         """The index of the hat on the controller."""
         return self._index
 
+    @property
+    def value(self) -> tuple[int, int]:
+        """The latest raw x and y value of the hat."""
+        return self._value
+
     @property
     def invert_x(self) -> bool:
         """Whether to invert the x value of the hat."""
@@ -447,14 +609,90 @@ class Hat:
             joystick (type(pygame.joystick.Joystick)):
                 The joystick to get the hat value from.
         """
-        # Get the raw value of the hat.
-        value = joystick.get_hat(self._index)
+        self.set_value(joystick.get_hat(self._index))
+
+    @property
+    def needs_tick(self) -> bool:
+        """Whether any of the hat's buttons can still change without a new reading."""
+        return any(button.needs_tick for button in self.buttons.values())
+
+    def set_value(self, value: tuple[int, int]) -> None:
+        """Update the value of the hat from a raw reading, such as the value of a joystick hat motion event.
+
+        Args:
+            value (tuple[int, int]):
+                The x and y value of the hat, each -1, 0, or 1.
+        """
+        self._value = value
 
         self.buttons[enums.ControllerHatButtonNames.DPAD_LEFT].pressed = value[0] == -1
         self.buttons[enums.ControllerHatButtonNames.DPAD_RIGHT].pressed = value[0] == 1
         self.buttons[enums.ControllerHatButtonNames.DPAD_UP].pressed = value[1] == 1
         self.buttons[enums.ControllerHatButtonNames.DPAD_DOWN].pressed = value[1] == -1
 
+    def apply_samples(self, value: tuple[int, int], rises: np.ndarray, falls: np.ndarray, rise_times: np.ndarray,
+                      fall_times: np.ndarray) -> None:
+        """Update the hat's buttons from several readings taken during a frame. Each array has an entry for each of
+        the directions in HAT_DIRECTIONS.
+
+        Args:
+            value (tuple[int, int]):
+                The latest x and y value of the hat, each -1, 0, or 1.
+            rises (np.ndarray):
+                How many times each direction was pushed during the frame.
+            falls (np.ndarray):
+                How many times each direction was let go during the frame.
+            rise_times (np.ndarray):
+                When each direction was last pushed, in seconds on the monotonic clock.
+            fall_times (np.ndarray):
+                When each direction was last let go, in seconds on the monotonic clock.
+        """
+        self._value = value
+
+        states = hat_directions(value)
+        for i, direction in enumerate(HAT_DIRECTIONS):
+            self.buttons[direction].apply_samples(
+                states[i], int(rises[i]), int(falls[i]), float(rise_times[i]), float(fall_times[i])
+            )
+
+    def tick(self) -> None:
+        """Advance the hat's buttons by a frame without a new reading."""
+        self.set_value(self._value)
+
+
+class InputFrame(NamedTuple):
+    """The readings of a controller's inputs gathered over a frame by a sampler. Indices follow the controller's
+    axis_indices, button_indices, and hat_indices.
+
+    Attributes:
+        samples (int):
+            How many readings were taken during the frame. When there were none, the rest holds the latest values
+            with no changes.
+        axes (np.ndarray):
+            The filtered raw value of each axis.
+        buttons (np.ndarray):
+            The latest raw value of each button, followed by each direction of each hat in the order of
+            HAT_DIRECTIONS.
+        rises (np.ndarray):
+            How many times each entry of buttons went from False to True.
+        falls (np.ndarray):
+            How many times each entry of buttons went from True to False.
+        rise_times (np.ndarray):
+            When each entry of buttons last went from False to True, in seconds on the monotonic clock.
+        fall_times (np.ndarray):
+            When each entry of buttons last went from True to False, in seconds on the monotonic clock.
+        hats (np.ndarray):
+            The latest x and y value of each hat.
+    """
+    samples: int
+    axes: np.ndarray
+    buttons: np.ndarray
+    rises: np.ndarray
+    falls: np.ndarray
+    rise_times: np.ndarray
+    fall_times: np.ndarray
+    hats: np.ndarray
+
 
 class Controller:
     """Mapping of axes and button numbers to specific configurations.
@@ -473,7 +711,15 @@ class Controller:
 
     Methods:
         update() -> None:
-            Update the controller state.
+            Update the controller state by reading every input.
+        handle_event(event: pygame.event.Event) -> None:
+            Apply a joystick event to the controller's inputs.
+        tick() -> None:
+            Advance the controller's inputs by a frame after handling that frame's events.
+        apply_frame(frame: InputFrame) -> None:
+            Update the controller's inputs from the readings a sampler gathered over a frame.
+        read_raw() -> tuple[list[float], list[bool], list[tuple[int, int]]]:
+            Get the latest raw readings of the controller's inputs.
     """
 
     def __init__(self, index: int, buttons: dict[enums.ControllerButtonNames, Button],
@@ -497,6 +743,27 @@ class Controller:
 
         self._joystick = None
 
+        # The inputs read from each index of the joystick, for looking them up by the index in an event.
+        self._buttons_by_index: dict[int, list[Button]] = {}
+        for button in buttons.values():
+            self._buttons_by_index.setdefault(button.index, []).append(button)
+        self._axes_by_index: dict[int, list[Axis]] = {}
+        for axis in axes.values():
+            self._axes_by_index.setdefault(axis.index, []).append(axis)
+        self._hats_by_index: dict[int, list[Hat]] = {}
+        for hat in hats.values():
+            self._hats_by_index.setdefault(hat.index, []).append(hat)
+        self._axis_indices = tuple(sorted(self._axes_by_index))
+        self._button_indices = tuple(sorted(self._buttons_by_index))
+        self._hat_indices = tuple(sorted(self._hats_by_index))
+
+        # Readings from this frame's events waiting to be applied by tick(), and the inputs that still need ticking
+        # without a new reading.
+        self._pending_buttons: dict[Button, bool] = {}
+        self._pending_hats: dict[Hat, tuple[int, int]] = {}
+        self._active_buttons: set[Button] = set()
+        self._active_hats: set[Hat] = set()
+
     @property
     def index(self) -> int:
         """The index of the controller to use."""
@@ -507,13 +774,42 @@ class Controller:
         """The joystick object to use."""
         return self._joystick
 
-    def initialize(self) -> None:
-        """Initialize the controller."""
-        self._joystick = pygame.joystick.Joystick(self._index)
-        self._joystick.init()
+    @property
+    def axis_indices(self) -> tuple[int, ...]:
+        """The joystick indices of the controller's axes, in ascending order."""
+        return self._axis_indices
+
+    @property
+    def button_indices(self) -> tuple[int, ...]:
+        """The joystick indices of the controller's buttons, in ascending order."""
+        return self._button_indices
+
+    @property
+    def hat_indices(self) -> tuple[int, ...]:
+        """The joystick indices of the controller's hats, in ascending order."""
+        return self._hat_indices
+
+    @property
+    def instance_id(self) -> int:
+        """The instance id of the joystick, which is how joystick events say which joystick they came from."""
+        return self._joystick.get_instance_id()
+
+    def initialize(self, joystick: type(pygame.joystick.Joystick) | None = None) -> None:
+        """Initialize the controller.
+
+        Args:
+            joystick (type(pygame.joystick.Joystick) | None, optional):
+                The joystick to read from.
+                Defaults to None, which opens the joystick at the controller's index.
+        """
+        if joystick is None:
+            joystick = pygame.joystick.Joystick(self._index)
+            joystick.init()
+        self._joystick = joystick
 
     def update(self) -> None:
-        """Update the values for the various inputs attached to the controller"""
+        """Update the values for the various inputs attached to the controller. The buttons and hats that can still
+        change on their own, such as ones held down, are noted so that tick() carries on from this reading."""
         for btn in self.buttons:
             self.buttons[btn].update(self._joystick)
 
@@ -523,6 +819,87 @@ class Controller:
         for hat in self.hats:
             self.hats[hat].update(self._joystick)
 
+        self._active_buttons = {button for button in self.buttons.values() if button.needs_tick}
+        self._active_hats = {hat for hat in self.hats.values() if hat.needs_tick}
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """Apply a joystick event to the controller's inputs. Axes take the new value straight away. Buttons and hats
+        keep the latest value until tick() so that they change at most once a frame, the same as when polling.
+
+        Args:
+            event (pygame.event.Event):
+                A JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP, or JOYHATMOTION event from this controller's joystick.
+        """
+        if event.type == pygame.JOYAXISMOTION:
+            for axis in self._axes_by_index.get(event.axis, ()):
+                axis.set_raw(event.value)
+        elif event.type == pygame.JOYBUTTONDOWN or event.type == pygame.JOYBUTTONUP:
+            for button in self._buttons_by_index.get(event.button, ()):
+                self._pending_buttons[button] = event.type == pygame.JOYBUTTONDOWN
+        elif event.type == pygame.JOYHATMOTION:
+            for hat in self._hats_by_index.get(event.hat, ()):
+                self._pending_hats[hat] = event.value
+
+    def tick(self) -> None:
+        """Advance the controller's inputs by a frame after handling that frame's events. Only the buttons and hats
+        that changed, or that can still change on their own, are touched."""
+        for button, state in self._pending_buttons.items():
+            button.update(state)
+            self._active_buttons.add(button)
+        for button in self._active_buttons.difference(self._pending_buttons):
+            button.tick()
+        self._active_buttons = {button for button in self._active_buttons if button.needs_tick}
+        self._pending_buttons.clear()
+
+        for hat, value in self._pending_hats.items():
+            hat.set_value(value)
+            self._active_hats.add(hat)
+        for hat in self._active_hats.difference(self._pending_hats):
+            hat.tick()
+        self._active_hats = {hat for hat in self._active_hats if hat.needs_tick}
+        self._pending_hats.clear()
+
+    def apply_frame(self, frame: InputFrame) -> None:
+        """Update the controller's inputs from the readings a sampler gathered over a frame.
+
+        Args:
+            frame (InputFrame):
+                The readings, laid out by the controller's axis_indices, button_indices, and hat_indices.
+        """
+        for i, index in enumerate(self._axis_indices):
+            for axis in self._axes_by_index[index]:
+                axis.set_raw(float(frame.axes[i]))
+
+        button_indices = self._button_indices
+        for i, index in enumerate(button_indices):
+            for button in self._buttons_by_index[index]:
+                button.apply_samples(
+                    bool(frame.buttons[i]), int(frame.rises[i]), int(frame.falls[i]),
+                    float(frame.rise_times[i]), float(frame.fall_times[i]),
+                )
+
+        for i, index in enumerate(self._hat_indices):
+            directions = slice(len(button_indices) + 4 * i, len(button_indices) + 4 * (i + 1))
+            value = (int(frame.hats[i][0]), int(frame.hats[i][1]))
+            for hat in self._hats_by_index[index]:
+                hat.apply_samples(
+                    value, frame.rises[directions], frame.falls[directions],
+                    frame.rise_times[directions], frame.fall_times[directions],
+                )
+
+    def read_raw(self) -> tuple[list[float], list[bool], list[tuple[int, int]]]:
+        """Get the latest raw readings of the controller's inputs, as they would be read from the joystick.
+
+        Returns:
+            tuple[list[float], list[bool], list[tuple[int, int]]]: The readings of the axes, buttons, and hats, in the
+                order of axis_indices, button_indices, and hat_indices.
+        """
+        return (
+            [self._axes_by_index[index][0].raw_value for index in self._axis_indices],
+            [self._buttons_by_index[index][0].raw_state for index in self._button_indices],
+            [self._hats_by_index[index][0].value for index in self._hat_indices],
+        )
+
     def shutdown(self) -> None:
         """Shutdown the controller."""
         self.joystick.quit()
@@ -1,7 +1,14 @@
+from typing import Iterable, Literal
+
 import pygame
 
 import enums
 import controller as ctrl
+from config.input_sampler import InputSamplerConfig
+from input_sampler import InputSampler
+
+# The events that carry controller input.
+JOYSTICK_EVENTS = frozenset((pygame.JOYAXISMOTION, pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYHATMOTION))
 
 
 class InputHandler:
@@ -10,38 +17,120 @@ class InputHandler:
     Properties:
         controllers (dict[enums.ControllerNames, ctrl.Controller]):
             The controllers to use.
+        backend (Literal["events", "polling", "sampled"]):
+            How the controllers are read.
+        sampler (InputSampler | None):
+            The sampler reading the controllers when the backend is "sampled".
 
     Methods:
         update() -> None:
             Update the Controller input objects.
+        process_events(events: Iterable[pygame.event.Event]) -> None:
+            Apply joystick events to the controllers they came from and advance every controller a frame.
         shutdown() -> None:
             Shutdown the InputHandler.
     """
 
-    def __init__(self, controllers: dict[enums.ControllerNames, ctrl.Controller]) -> None:
+    def __init__(self, controllers: dict[enums.ControllerNames, ctrl.Controller],
+                 backend: Literal["events", "polling", "sampled"] = "polling",
+                 joysticks: dict[enums.ControllerNames, type(pygame.joystick.Joystick)] | None = None,
+                 sampler_config: InputSamplerConfig | None = None) -> None:
         """Initialize the InputHandler object.
 
         Args:
             controllers (dict[enums.ControllerNames, ctrl.Controller]):
                 The controllers to use.
+            backend (Literal["events", "polling", "sampled"], optional):
+                "events" only updates the inputs that pygame reports a change for. "polling" reads every button,
+                axis, and hat of every controller each frame. "sampled" reads the controllers on a thread of its own,
+                faster than the main loop, so that presses shorter than a frame are still seen.
+                Defaults to "polling".
+            joysticks (dict[enums.ControllerNames, type(pygame.joystick.Joystick)] | None, optional):
+                Joysticks to use instead of opening them by index, such as stand-ins for benchmarks.
+                Defaults to None.
+            sampler_config (InputSamplerConfig | None, optional):
+                How the sampler thread reads the controllers when the backend is "sampled".
+                Defaults to None, which uses the defaults of InputSamplerConfig.
         """
+        if backend not in ("events", "polling", "sampled"):
+            raise ValueError(f"Unknown input backend: {backend}")
+
         self.controllers = controllers
+        self._backend = backend
 
         pygame.init()
         pygame.joystick.init()
 
         # Initialize the controllers.
         for controller in controllers:
-            controllers[controller].initialize()
+            controllers[controller].initialize(joysticks.get(controller) if joysticks is not None else None)
+
+        # Events say which joystick they came from by its instance id.
+        self._controllers_by_instance: dict[int, ctrl.Controller] = {
+            controller.instance_id: controller for controller in controllers.values()
+        }
+
+        # Events only report changes, so read everything once to start from the controllers' current state.
+        if self._backend == "events":
+            pygame.event.pump()
+            for controller in self.controllers.values():
+                controller.update()
+
+        self._sampler: InputSampler | None = None
+        if self._backend == "sampled":
+            if sampler_config is None:
+                sampler_config = InputSamplerConfig()
+            self._sampler = InputSampler(
+                controllers, sampler_config.rate, sampler_config.capacity, sampler_config.axis_filter
+            )
+            self._sampler.start()
+
+    @property
+    def backend(self) -> str:
+        """How the controllers are read, "events", "polling", or "sampled"."""
+        return self._backend
+
+    @property
+    def sampler(self) -> InputSampler | None:
+        """The sampler reading the controllers when the backend is "sampled", otherwise None."""
+        return self._sampler
 
     def update(self) -> None:
         """Update the Controller input objects."""
+        if self._backend == "events":
+            self.process_events(pygame.event.get())
+            return
+        if self._backend == "sampled":
+            self._sampler.update()
+            return
+
         pygame.event.pump()
 
         for controller in self.controllers:
             self.controllers[controller].update()
 
+    def process_events(self, events: Iterable[pygame.event.Event]) -> None:
+        """Apply joystick events to the controllers they came from and advance every controller a frame.
+
+        Args:
+            events (Iterable[pygame.event.Event]):
+                The events since the last frame. Anything that isn't joystick input is ignored.
+        """
+        for event in events:
+            if event.type not in JOYSTICK_EVENTS:
+                continue
+
+            controller = self._controllers_by_instance.get(event.instance_id)
+            if controller is not None:
+                controller.handle_event(event)
+
+        for controller in self.controllers.values():
+            controller.tick()
+
     def shutdown(self) -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+
         for controller in self.controllers:
             self.controllers[controller].shutdown()
 
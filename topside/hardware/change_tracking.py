@@ -0,0 +1,45 @@
+"""Change tracking for hardware objects whose values get sent to the ROV.
+
+Rather than snapshotting every object each frame and diffing it against the last snapshot, tracked objects add their
+name to a shared "dirty" set whenever one of their setters actually changes a value. Whoever publishes them only has
+to drain that set. Adding a name that is already in the set does not allocate, so an unchanged frame costs nothing.
+"""
+
+
+class ChangeTracked:
+    """Base class for objects that report their own changes to a dirty set.
+
+    Methods:
+        track(name: object, dirty_set: set) -> None:
+            Start reporting changes to a dirty set under a name.
+        mark_dirty() -> None:
+            Report that the object has changed.
+    """
+
+    _tracked_name: object = None
+    _dirty_set: set | None = None
+
+    @property
+    def tracked(self) -> bool:
+        """Whether the object is reporting its changes to a dirty set."""
+        return self._dirty_set is not None
+
+    def track(self, name: object, dirty_set: set) -> None:
+        """Start reporting changes to a dirty set under a name. The object is marked dirty straight away so that its
+        current state gets sent at least once.
+
+        Args:
+            name (object):
+                The name to add to the dirty set when the object changes.
+            dirty_set (set):
+                The set to add the name to.
+        """
+        self._tracked_name = name
+        self._dirty_set = dirty_set
+        dirty_set.add(name)
+
+    def mark_dirty(self) -> None:
+        """Report that the object has changed. Call this after mutating a value in place (such as a dict) where no
+        setter is involved."""
+        if self._dirty_set is not None:
+            self._dirty_set.add(self._tracked_name)
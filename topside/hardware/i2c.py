@@ -1,7 +1,8 @@
 from config.i2c import I2CConfig
+from hardware.change_tracking import ChangeTracked
 
 
-class I2C:
+class I2C(ChangeTracked):
 
     def __init__(self, config: I2CConfig):
         self._config = config
@@ -19,7 +20,9 @@ class I2C:
 
     @addr.setter
     def addr(self, value):
-        self._addr = value
+        if value != self._addr:
+            self._addr = value
+            self.mark_dirty()
 
     @property
     def poll_val(self):
@@ -27,7 +30,9 @@ class I2C:
 
     @poll_val.setter
     def poll_val(self, value):
-        self._poll_val = value
+        if value is self._poll_val or value != self._poll_val:
+            self._poll_val = value
+            self.mark_dirty()
 
     @property
     def received_vals(self):
@@ -43,7 +48,10 @@ class I2C:
 
     @sending_vals.setter
     def sending_vals(self, sending_value):
-        self._sending_vals = sending_value
+        # Assigning the same object again is treated as a change, since its contents may have been edited in place.
+        if sending_value is self._sending_vals or sending_value != self._sending_vals:
+            self._sending_vals = sending_value
+            self.mark_dirty()
 
     @property
     def reading_registers(self):
@@ -51,12 +59,14 @@ class I2C:
 
     @reading_registers.setter
     def reading_registers(self, reading_registers):
-        self._reading_registers = reading_registers
+        if reading_registers is self._reading_registers or reading_registers != self._reading_registers:
+            self._reading_registers = reading_registers
+            self.mark_dirty()
 
     def __eq__(self, other):
         return (
             self._addr == other.addr and self._poll_val == other.poll_val and
-            self._sending_vals == other.sending_vals, self._received_vals == other.received_vals,
+            self._sending_vals == other.sending_vals and self._received_vals == other.received_vals and
             self._reading_registers == other.reading_registers
         )
 
@@ -1,7 +1,8 @@
 from config.pin import PinConfig
+from hardware.change_tracking import ChangeTracked
 
 
-class Pin:
+class Pin(ChangeTracked):
 
     def __init__(self, config: PinConfig):
 
@@ -18,7 +19,9 @@ class Pin:
 
     @id.setter
     def id(self, value):
-        self._id = value
+        if value != self._id:
+            self._id = value
+            self.mark_dirty()
 
     @property
     def mode(self):
@@ -26,7 +29,9 @@ class Pin:
 
     @mode.setter
     def mode(self, value):
-        self._mode = value
+        if value != self._mode:
+            self._mode = value
+            self.mark_dirty()
 
     @property
     def val(self):
@@ -34,7 +39,9 @@ class Pin:
 
     @val.setter
     def val(self, value):
-        self._val = value
+        if value != self._val:
+            self._val = value
+            self.mark_dirty()
 
     @property
     def freq(self):
@@ -42,14 +49,16 @@ class Pin:
 
     @freq.setter
     def freq(self, value):
-        self._freq = value
+        if value != self._freq:
+            self._freq = value
+            self.mark_dirty()
 
     def __eq__(self, other):
         return self._id == other._id and self._mode == other._mode and self._val == other._val and self._freq == other._freq
 
     def __ne__(self, other):
         return not self.__eq__(other)
-    
+
     def __deepcopy__(self, meta):
         return Pin(PinConfig(
             id=self._id,
@@ -0,0 +1,155 @@
+"""Array-backed power to PWM conversion for a whole frame of thrusters at once.
+
+Thrusters without a PWM curve use the same linear formula ThrusterPWM always has, so their pulses are unchanged.
+Thrusters with a curve have it resampled onto a fine, evenly spaced power grid when the calibration is built, so
+looking a power up is an index calculation and a single linear interpolation, done for every thruster in one go.
+"""
+from typing import Sequence
+
+import numpy as np
+
+from config.thruster import ThrusterConfig, PWMCurveConfig
+from config.typed_range import IntRange
+
+
+def t200_curve(pwm_range: IntRange = IntRange(min=1100, max=1900), neutral: int = 1500, deadband: int = 25,
+               forward_exponent: float = 1.5, reverse_exponent: float = 1.5, points: int = 41) -> PWMCurveConfig:
+    """Build a PWM curve for a Blue Robotics T200 style thruster.
+
+    These thrusters do nothing within a deadband around the neutral pulse, and outside it their thrust grows faster
+    than linearly with the distance from the deadband, differently forwards and in reverse. The curve inverts that so
+    that power is proportional to thrust on each side, and jumps straight over the deadband. The exponents roughly
+    fit the published T200 data, but measure your own thrusters if low speed control matters.
+
+    Args:
+        pwm_range (IntRange):
+            The full range of PWM pulses the ESC accepts.
+            Defaults to 1100 to 1900.
+        neutral (int):
+            The pulse that stops the thruster.
+            Defaults to 1500.
+        deadband (int):
+            How far either side of neutral the pulse has to go before the thruster starts to spin.
+            Defaults to 25.
+        forward_exponent (float):
+            Thrust is taken to be proportional to the distance from the deadband raised to this power going forwards.
+            Defaults to 1.5.
+        reverse_exponent (float):
+            The same as forward_exponent, in reverse.
+            Defaults to 1.5.
+        points (int):
+            The number of points on each side of neutral.
+            Defaults to 41.
+
+    Returns:
+        PWMCurveConfig: The curve.
+    """
+    fractions = np.linspace(0, 1, points)[1:]
+
+    forward_start = neutral + deadband
+    reverse_start = neutral - deadband
+    forward = forward_start + (pwm_range.max - forward_start) * fractions ** (1 / forward_exponent)
+    reverse = reverse_start - (reverse_start - pwm_range.min) * fractions ** (1 / reverse_exponent)
+
+    # The points just either side of zero make the pulse jump straight over the deadband.
+    edge = 1e-6
+    power = (*(-fractions[::-1]), -edge, 0.0, edge, *fractions)
+    pwm = (*reverse[::-1], reverse_start, neutral, forward_start, *forward)
+
+    return PWMCurveConfig(power=tuple(float(p) for p in power), pwm=tuple(float(p) for p in pwm))
+
+
+class PWMCalibration:
+    """Converts the power of each thruster in a frame to a PWM pulse.
+
+    Methods:
+        evaluate(thrust_power: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+            Get the PWM pulse of each thruster.
+    """
+
+    def __init__(self, configs: Sequence[ThrusterConfig], resolution: int = 2001) -> None:
+        """Initialize the PWMCalibration object.
+
+        Args:
+            configs (Sequence[ThrusterConfig]):
+                The config of each thruster, in the order their powers will be given in.
+            resolution (int):
+                The number of evenly spaced power values from -1 to 1 to sample PWM curves at.
+                Defaults to 2001, a step of 0.001.
+        """
+        count = len(configs)
+        self._resolution = resolution
+
+        self._sign = np.array([-1.0 if config.reversed_thrust else 1.0 for config in configs])
+        self._min = np.array([float(config.pwm_pulse_range.min) for config in configs])
+        self._half_span = np.array(
+            [0.5 * (config.pwm_pulse_range.max - config.pwm_pulse_range.min) for config in configs]
+        )
+
+        self._curved = np.array([config.pwm_curve is not None for config in configs], dtype=bool)
+        self._has_curves = bool(self._curved.any())
+
+        grid = np.linspace(-1, 1, resolution)
+        self._table = np.zeros((count, resolution))
+        for i, config in enumerate(configs):
+            if config.pwm_curve is not None:
+                self._table[i] = np.interp(grid, config.pwm_curve.power, config.pwm_curve.pwm)
+        # Offset of each thruster's row in the flattened table.
+        self._row_offsets = np.arange(count) * resolution
+        self._flat_table = self._table.ravel()
+
+        # Buffers reused every frame so that no arrays are allocated while converting.
+        self._actual = np.zeros(count)
+        self._pulses = np.zeros(count)
+        self._position = np.zeros(count)
+        self._index = np.zeros(count, dtype=np.intp)
+        self._low = np.zeros(count)
+        self._high = np.zeros(count)
+
+    def evaluate(self, thrust_power: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Get the PWM pulse of each thruster.
+
+        Args:
+            thrust_power (np.ndarray):
+                The power of each thruster multiplied by its thrust, before the output is reversed.
+            out (np.ndarray | None):
+                An integer array to write the pulses into.
+                Defaults to None, in which case a new array is returned.
+
+        Returns:
+            np.ndarray: The PWM pulse of each thruster.
+        """
+        actual = np.multiply(thrust_power, self._sign, out=self._actual)
+
+        # Linear pulses, in the same order of operations as ThrusterPWM._calculate_pwm so they come out identical.
+        pulses = np.add(actual, 1, out=self._pulses)
+        pulses *= self._half_span
+        pulses += self._min
+
+        if self._has_curves:
+            # Position of each power on the evenly spaced grid, then interpolate between the samples either side.
+            position = np.add(actual, 1, out=self._position)
+            position *= (self._resolution - 1) / 2
+            np.clip(position, 0, self._resolution - 1, out=position)
+
+            index = self._index
+            np.floor(position, out=self._low)
+            np.minimum(self._low, self._resolution - 2, out=self._low)
+            np.copyto(index, self._low, casting="unsafe")
+            position -= self._low
+            index += self._row_offsets
+
+            np.take(self._flat_table, index, out=self._low)
+            np.take(self._flat_table, index + 1, out=self._high)
+            self._high -= self._low
+            self._high *= position
+            self._high += self._low
+
+            np.copyto(pulses, self._high, where=self._curved)
+
+        if out is None:
+            return pulses.astype(int)
+
+        # Casting truncates towards zero, the same as int().
+        np.copyto(out, pulses, casting="unsafe")
+        return out
@@ -0,0 +1,203 @@
+"""Optimal thrust allocation for frames with more thrusters than they strictly need.
+
+The allocator finds the thruster powers u that minimize
+
+    (A u - w)^T W (A u - w) + r u^T u    subject to    -1 <= u <= 1
+
+where A is the 6 x thruster count matrix of each thruster's forces and torques, w is the requested wrench, W is a
+diagonal matrix of axis weights, and r is a small regularization term. Unlike clipping or scaling the unconstrained
+answer, this keeps the achieved wrench as close as possible to the requested one when thrusters saturate, and uses the
+spare thrust of the thrusters that are not saturated.
+
+The problem is a small, strictly convex quadratic program with box constraints, so it is solved exactly with a primal
+active set method: the thrusters held at a limit are fixed, the rest are solved for with a linear solve, and thrusters
+are moved on or off their limits one at a time until the optimality conditions hold. Only the wrench changes between
+frames, so the Hessian is worked out once per geometry, and each solve starts from the previous frame's answer and set
+of saturated thrusters, which is usually within an iteration or two of the new one.
+"""
+import numpy as np
+
+from config.thrust_allocation import ThrustAllocationConfig
+
+
+class ThrustAllocator:
+    """Bounded weighted least squares thrust allocator.
+
+    Methods:
+        set_motor_matrix(motor_matrix: np.ndarray) -> None:
+            Set the thruster geometry to allocate for.
+        allocate(motions: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+            Get the thruster powers that best produce a set of motions.
+        solve(wrench: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+            Get the thruster powers that best produce a wrench.
+    """
+
+    def __init__(self, config: ThrustAllocationConfig) -> None:
+        """Initialize the ThrustAllocator object.
+
+        Args:
+            config (ThrustAllocationConfig):
+                The weights, regularization, and iteration limits to use.
+        """
+        self._config = config
+        self._weights = np.asarray(config.axis_weights, dtype=float)
+
+        if self._weights.shape != (6,):
+            raise ValueError(f"Expected 6 axis weights, got {len(config.axis_weights)}")
+
+        self._motor_matrix = np.zeros((0, 6))
+        self._hessian = np.zeros((0, 0))
+        self._authority = np.zeros(6)
+
+        self._wrench = np.zeros(6)
+        self._wrench_weighted = np.zeros(6)
+        self._linear = np.zeros(0)
+        self._solution = np.zeros(0)
+        self._iterations = 0
+        self._gradient = np.zeros(0)
+        self._step = np.zeros(0)
+
+    @property
+    def authority(self) -> np.ndarray:
+        """The largest wrench the thrusters can produce along each axis on its own. A motion of 1 asks for this."""
+        return self._authority
+
+    @property
+    def wrench(self) -> np.ndarray:
+        """The wrench requested by the last solve."""
+        return self._wrench
+
+    @property
+    def iterations(self) -> int:
+        """How many iterations the last solve took."""
+        return self._iterations
+
+    def set_motor_matrix(self, motor_matrix: np.ndarray) -> None:
+        """Set the thruster geometry to allocate for. Call this again whenever a thruster's geometry changes.
+
+        Args:
+            motor_matrix (np.ndarray):
+                The thruster count x 6 matrix of each thruster's forces and torques, as built by FrameThrusters.
+        """
+        count = motor_matrix.shape[0]
+        allocation = motor_matrix.T
+
+        self._motor_matrix = motor_matrix.copy()
+        self._hessian = motor_matrix @ (self._weights[:, None] * allocation) + self._config.regularization * np.eye(count)
+
+        # Each axis gets the most out of the thrusters when every thruster pushes as hard as it can in that axis'
+        # direction.
+        self._authority = np.abs(allocation).sum(axis=1)
+
+        self._linear = np.zeros(count)
+        if self._solution.shape != (count,):
+            self._solution = np.zeros(count)
+        self._gradient = np.zeros(count)
+        self._step = np.zeros(count)
+
+    def allocate(self, motions: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Get the thruster powers that best produce a set of motions.
+
+        Args:
+            motions (np.ndarray):
+                The requested motion along each axis from -1 to 1, in DIRECTION_ORDER. Each is scaled by the
+                authority of its axis to get the wrench to solve for.
+            out (np.ndarray | None):
+                An array to write the thruster powers into.
+                Defaults to None, in which case a new array is returned.
+
+        Returns:
+            np.ndarray: The power of each thruster from -1 to 1.
+        """
+        np.multiply(motions, self._authority, out=self._wrench)
+        return self._output(out)
+
+    def solve(self, wrench: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Get the thruster powers that best produce a wrench.
+
+        Args:
+            wrench (np.ndarray):
+                The requested forces and torques, in DIRECTION_ORDER and in the units of the motor matrix.
+            out (np.ndarray | None):
+                An array to write the thruster powers into.
+                Defaults to None, in which case a new array is returned.
+
+        Returns:
+            np.ndarray: The power of each thruster from -1 to 1.
+        """
+        np.copyto(self._wrench, wrench)
+        return self._output(out)
+
+    def _output(self, out: np.ndarray | None) -> np.ndarray:
+        """Solve for the current wrench and copy the solution out.
+
+        Args:
+            out (np.ndarray | None):
+                An array to write the thruster powers into, or None for a new array.
+
+        Returns:
+            np.ndarray: The power of each thruster from -1 to 1.
+        """
+        solution = self._solve()
+        if out is None:
+            return solution.copy()
+
+        np.copyto(out, solution)
+        return out
+
+    def _solve(self) -> np.ndarray:
+        """Run the solver for the current wrench, starting from the last solution.
+
+        Returns:
+            np.ndarray: The solution buffer. It is overwritten by the next solve.
+        """
+        # The cost is 1/2 u^T H u - u^T c, where c = A^T W w.
+        np.multiply(self._weights, self._wrench, out=self._wrench_weighted)
+        np.matmul(self._motor_matrix, self._wrench_weighted, out=self._linear)
+
+        solution = self._solution
+        gradient = self._gradient
+        hessian = self._hessian
+        tolerance = self._config.tolerance
+
+        # Start with the thrusters that were saturated last frame held at their limits.
+        at_limit = np.abs(solution) >= 1.0
+
+        self._iterations = 0
+        for self._iterations in range(1, self._config.max_iterations + 1):
+            free = ~at_limit
+
+            # Best powers for the free thrusters with the saturated ones held where they are.
+            np.matmul(hessian[:, at_limit], solution[at_limit], out=gradient)
+            np.subtract(self._linear, gradient, out=gradient)
+            step = self._step
+            step.fill(0.0)
+            if free.any():
+                step[free] = np.linalg.solve(hessian[np.ix_(free, free)], gradient[free]) - solution[free]
+
+            if np.abs(step).max(initial=0.0) <= tolerance:
+                # The free thrusters are optimal. Check whether any saturated thruster would rather come off its
+                # limit, which it does when the cost falls by moving it back inside its range.
+                np.matmul(hessian, solution, out=gradient)
+                gradient -= self._linear
+                multipliers = np.where(at_limit, -gradient * np.sign(solution), np.inf)
+                worst = int(np.argmin(multipliers))
+                if multipliers[worst] >= -tolerance:
+                    break
+
+                at_limit[worst] = False
+                continue
+
+            # Move towards the best powers, stopping at the first thruster to hit a limit.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratios = np.where(step > 0, (1.0 - solution) / step, np.where(step < 0, (-1.0 - solution) / step, np.inf))
+            blocking = int(np.argmin(ratios))
+            fraction = min(1.0, ratios[blocking])
+
+            solution += fraction * step
+            if fraction < 1.0:
+                solution[blocking] = np.sign(step[blocking])
+                at_limit[blocking] = True
+
+        np.clip(solution, -1.0, 1.0, out=solution)
+        return solution
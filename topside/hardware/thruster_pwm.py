@@ -1,22 +1,33 @@
 """Module providing a basic wrapper for ROV thrusters and PWM calculations.
 Input is given through lateral_thruster_calc_circular and returned as a FrameThrusters object."""
 
+import contextlib
 import math
-from typing import Sequence
 
 import numpy as np
 
+from config.thrust_allocation import ThrustAllocationConfig
 from config.thruster import ThrusterConfig
 # noinspection PyUnresolvedReferences
 from enums import ThrusterPositions, Directions
+from hardware.change_tracking import ChangeTracked
+from hardware.pwm_calibration import PWMCalibration
+from hardware.thrust_allocation import ThrustAllocator
+from utilities.profiler import LoopProfiler
 from utilities.vector import Vector3
 
 # Imma be honest, this feels needlessly precise. Why do we need it down to the 10 Quadrillionth place?
 INV_SQRT2 = 0.7071067811865476
 
+# The order of the columns of the allocation matrix.
+DIRECTION_ORDER: tuple[Directions, ...] = (
+    Directions.FORWARDS, Directions.RIGHT, Directions.UP, Directions.YAW, Directions.PITCH, Directions.ROLL,
+)
 
-class ThrusterPWM:
-    """Basic wrapper for a servo-based PWM thruster."""
+
+class ThrusterPWM(ChangeTracked):
+    """Basic wrapper for a servo-based PWM thruster. Changes to the position, orientation, or thrust of the thruster
+    are reported through ChangeTracked so that FrameThrusters knows to rebuild its allocation matrix."""
 
     _thrust: float  # Requested power output, assuming thruster is oriented as the frame expects
     _config: ThrusterConfig
@@ -38,6 +49,19 @@ class ThrusterPWM:
         # self._calculate_pwm()
         self._pwm = self._calculate_pwm()
 
+    def set_output(self, power: float, pwm: int) -> None:
+        """Set the requested power along with a PWM value that has already been calculated for it, as FrameThrusters
+        does for all of its thrusters at once.
+
+        Args:
+            power (float):
+                The requested power.
+            pwm (int):
+                The PWM value for that power.
+        """
+        self._power = power
+        self._pwm = pwm
+
     @property
     def pwm_output(self) -> int:
         """PWM output corresponding to current power setting"""
@@ -81,6 +105,7 @@ class ThrusterPWM:
         """Set the position of the thruster in the ROV."""
         self._position = value
         self.calculate_torques()
+        self.mark_dirty()
 
     @orientation.setter
     def orientation(self, value: Vector3):
@@ -88,6 +113,7 @@ class ThrusterPWM:
         self._orientation = value
         self.calculate_forces()
         self.calculate_torques()
+        self.mark_dirty()
 
     @thrust.setter
     def thrust(self, value: float):
@@ -96,6 +122,7 @@ class ThrusterPWM:
         self.calculate_forces()
         self.calculate_torques()
         self._calculate_pwm()
+        self.mark_dirty()
 
     @property
     def reverse_polarity(self) -> bool:
@@ -114,6 +141,9 @@ class ThrusterPWM:
         """
         self._config = thruster_config
         self._name = thruster_config.name
+        self._calibration: PWMCalibration | None = (
+            PWMCalibration([thruster_config]) if thruster_config.pwm_curve is not None else None
+        )
         self._pwm = self.min_pwm_output
         self._power = power
         self._position = thruster_config.thruster_position
@@ -222,6 +252,9 @@ class ThrusterPWM:
 
     def _calculate_pwm(self) -> int:
         """Calculate a PWM value for the thruster at its current power."""
+        if self._calibration is not None:
+            return int(self._calibration.evaluate(np.array([self._power * self._thrust]))[0])
+
         actual_power = self.requested_power * self.thrust
         if self.config.reversed_thrust:
             actual_power = -actual_power
@@ -240,25 +273,100 @@ class FrameThrusters:
        The front and back motors are mirrored. To go forward the front motors have a value of 1 and the rear motors a value of -1.
     """
  
-    _current_power: dict[ThrusterPositions, float] = {}
+    @property
+    def normalized_output(self) -> dict[ThrusterPositions, float]:
+        """The power of each thruster from -1 to 1, lateral thrusters first. Built from power_array when asked for."""
+        if self._power_dict is None:
+            self._power_dict = {self._key_order[i]: float(self._power[i]) for i in self._output_order}
+        return self._power_dict
 
     @property
-    def normalized_output(self):
-        return self._current_power
+    def power_array(self) -> np.ndarray:
+        """The power of each thruster from -1 to 1, in the order of the thrusters dict. Do not modify it."""
+        return self._power
 
     @property
     def pwm(self) -> dict[ThrusterPositions, int]:
-        """Get a PWM value for each thruster at its current power."""
-        return {position: thruster.pwm_output for position, thruster in self.thrusters.items()}
+        """Get a PWM value for each thruster at its current power. Built from pwm_array when asked for, and the same
+        dict is returned until the next update. Do not modify it."""
+        if self._pwm_dict is None:
+            self._pwm_dict = dict(zip(self._key_order, self._pwm.tolist()))
+        return self._pwm_dict
+
+    @property
+    def pwm_array(self) -> np.ndarray:
+        """The PWM value of each thruster at its current power, in the order of the thrusters dict. Do not modify
+        it."""
+        return self._pwm
+
+    @property
+    def motor_matrix(self) -> np.ndarray:
+        """The thruster count x 6 matrix of each thruster's forces and torques, in DIRECTION_ORDER."""
+        self._update_allocation()
+        return self._motor_matrix
 
-    def __init__(self, thrusters: dict[ThrusterPositions, ThrusterPWM]) -> None:
+    @property
+    def allocation_pinv(self) -> np.ndarray:
+        """The Moore-Penrose pseudo-inverse of the transposed motor matrix. Multiplying it by a wrench (in
+        DIRECTION_ORDER) gives the least-norm thrusts that produce that wrench."""
+        self._update_allocation()
+        return self._allocation_pinv
+
+    def __init__(self, thrusters: dict[ThrusterPositions, ThrusterPWM],
+                 allocation_config: ThrustAllocationConfig = ThrustAllocationConfig(),
+                 profiler: LoopProfiler | None = None) -> None:
         """Initialize a new set of thruster values.
 
         Args:
             thrusters (dict[ThrusterPositions, ThrusterPWM]):
                 A dictionary of thrusters.
+            allocation_config (ThrustAllocationConfig):
+                How requested motions are turned into thruster powers.
+                Defaults to the direct allocation.
+            profiler (LoopProfiler | None):
+                A profiler to time update_thruster_output with.
+                Defaults to None.
         """
+        if allocation_config.mode not in ("direct", "optimal"):
+            raise ValueError(f"Unknown thrust allocation mode: {allocation_config.mode}")
+
         self.thrusters = thrusters
+        self._update_span = profiler.span("thrusters.update") if profiler is not None else contextlib.nullcontext()
+        self._allocator: ThrustAllocator | None = (
+            ThrustAllocator(allocation_config) if allocation_config.mode == "optimal" else None
+        )
+        self._key_order: list[ThrusterPositions] = list(thrusters)
+
+        # The allocation matrix only depends on the geometry of the thrusters, so it is cached and only rebuilt when
+        # a thruster reports a change to its position, orientation, or thrust.
+        self._geometry_changes: set[ThrusterPositions] = set()
+        self._motor_matrix: np.ndarray = np.zeros((len(thrusters), len(DIRECTION_ORDER)))
+        self._allocation_pinv: np.ndarray = np.zeros((len(thrusters), len(DIRECTION_ORDER)))
+
+        # Buffers reused every frame so that no arrays are allocated while calculating thrusts.
+        self._motion_vector: np.ndarray = np.zeros(len(DIRECTION_ORDER))
+        self._thrust_vector: np.ndarray = np.zeros(len(thrusters))
+        self._abs_power: np.ndarray = np.zeros(len(thrusters))
+        self._power_scalars: np.ndarray = np.zeros(len(thrusters))
+        self._power: np.ndarray = np.zeros(len(thrusters))
+        self._pwm: np.ndarray = np.array([thruster.pwm_output for thruster in thrusters.values()], dtype=int)
+        self._power_dict: dict[ThrusterPositions, float] | None = None
+        self._pwm_dict: dict[ThrusterPositions, int] | None = None
+
+        # Every thruster's PWM value is calculated at once from its power scaled by its thrust.
+        self._calibration: PWMCalibration = PWMCalibration([thruster.config for thruster in thrusters.values()])
+        self._thrusts: np.ndarray = np.array([thruster.thrust for thruster in thrusters.values()], dtype=float)
+        self._thrust_power: np.ndarray = np.zeros(len(thrusters))
+
+        # Lateral and vertical thrusters are normalized separately. Which group a thruster is in never changes, so
+        # the groups are worked out once here as masks over the thruster order.
+        self._vertical_mask: np.ndarray = np.array(["_VERTICAL" in str(position) for position in self._key_order],
+                                                   dtype=bool)
+        self._lateral_mask: np.ndarray = ~self._vertical_mask
+        self._output_order: list[int] = [*np.flatnonzero(self._lateral_mask), *np.flatnonzero(self._vertical_mask)]
+
+        for position, thruster in thrusters.items():
+            thruster.track(position, self._geometry_changes)
 
     def update_thruster_output(self, motions: dict[Directions, float]) -> dict[ThrusterPositions, int]:
         """Get PWM values for a given set of inputs. USE THIS FUNCTION, NOT THE OTHERS, FROM OUTSIDE THE THRUSTER_PWM
@@ -269,14 +377,24 @@ class FrameThrusters:
                 A dictionary of thruster orientations and their values.
 
         Returns:
-            list[int]: PWM values for each thruster.
+            dict[ThrusterPositions, int]: PWM values for each thruster. This is the same dict as pwm.
         """
-        self._current_power = self._thruster_calc(motions)
+        with self._update_span:
+            power = self._thruster_calc(motions)
+
+            np.multiply(power, self._thrusts, out=self._thrust_power)
+            self._calibration.evaluate(self._thrust_power, out=self._pwm)
+            self._power_dict = None
+            self._pwm_dict = None
+
+            for thruster, thruster_power, thruster_pwm in zip(
+                    self.thrusters.values(), power.tolist(), self._pwm.tolist()
+            ):
+                thruster.set_output(thruster_power, thruster_pwm)
 
-        for position in self.thrusters:
-            self.thrusters[position].requested_power = self._current_power[position]
+        return self.pwm
 
-    def _thruster_calc(self, motions: dict[Directions, float]) -> dict[ThrusterPositions, float]:
+    def _thruster_calc(self, motions: dict[Directions, float]) -> np.ndarray:
         """Calculate thruster values from -1 to 1 for a given set of inputs. Function assumes all 
         thrusters are oriented correctly and not reversed. Specified orientation changes and different PWM ranges
         should be handled in ThrusterPWM configuration.
@@ -286,34 +404,21 @@ class FrameThrusters:
                 A dictionary of thruster orientations and their values.
 
         Returns:
-            FrameThrusters: A collection of Thrusters at the correct power levels.
+            np.ndarray: The power of each thruster, in the order of the thrusters dict.
         """
-        key_order = []
-        key_forces = []
         # Matrix multiplication using the forces and torques of each thruster to calculate the values needed to achieve
         # the desired direction of motion.
+        self._update_allocation()
 
-        for key, t in self.thrusters.items():
-            key_order.append(key)
-            key_forces.append( [t.forces.x, t.forces.y, t.forces.z, t.torques.yaw, t.torques.pitch, t.torques.roll] )
+        for i, direction in enumerate(DIRECTION_ORDER):
+            self._motion_vector[i] = motions[direction]
 
-        motor_matrix: np.array = np.array(key_forces)
+        if self._allocator is not None:
+            return self._allocator.allocate(self._motion_vector, out=self._power)
 
-        desired_direction_matrix: np.array = np.array([
-            [motions[Directions.FORWARDS]],
-            [motions[Directions.RIGHT]],
-            [motions[Directions.UP]],
-            [motions[Directions.YAW]],
-            [motions[Directions.PITCH]],
-            [motions[Directions.ROLL]],
-        ])
+        np.matmul(self._motor_matrix, self._motion_vector, out=self._thrust_vector)
 
-        motor_thrust_matrix: np.array = motor_matrix @ desired_direction_matrix
-
-        # The result of the matrix multiplication is a 8x1 matrix.
-        motor_thrust_array: list[float] = list(motor_thrust_matrix.flatten())
-
-        required_thruster_power = self._scale_output(motor_thrust_array, key_order=key_order, requested_motions=motions)
+        required_thruster_power = self._scale_output(self._thrust_vector, requested_motions=motions)
 
 
 
@@ -327,77 +432,62 @@ class FrameThrusters:
         
         return required_thruster_power
 
-    def _scale_output(self, input_power: Sequence[float], key_order: list[ThrusterPositions],
-                      requested_motions: dict[Directions, float]) -> dict[ThrusterPositions, float]:
+    def _update_allocation(self) -> None:
+        """Rebuild the motor matrix and its pseudo-inverse if any thruster's geometry has changed."""
+        if not self._geometry_changes:
+            return
+
+        for i, thruster in enumerate(self.thrusters.values()):
+            forces, torques = thruster.forces, thruster.torques
+            self._motor_matrix[i] = (forces.x, forces.y, forces.z, torques.yaw, torques.pitch, torques.roll)
+            self._thrusts[i] = thruster.thrust
+
+        self._allocation_pinv = np.linalg.pinv(self._motor_matrix.T)
+        if self._allocator is not None:
+            self._allocator.set_motor_matrix(self._motor_matrix)
+
+        self._geometry_changes.clear()
+
+    def _scale_output(self, input_power: np.ndarray, requested_motions: dict[Directions, float]) -> np.ndarray:
         """Normalized the input thruster values to ensure the motors deliver output within the requested range.
 
         Args:
-            input_power (Sequence[float]):
-                Starting power values for each motor.
-            key_order (list[ThrusterPositions]):
-                The order that each thruster position appears in the motor_thrust_matrix.
-            motions (dict[Directions, float]):
+            input_power (np.ndarray):
+                Starting power values for each motor, in the order of the thrusters dict.
+            requested_motions (dict[Directions, float]):
                 Magnitude of each motion type.
 
         Returns:
-            dict[ThrusterPositions, float]: Thruster power values proportional to the requested input range.
+            np.ndarray: Thruster power values proportional to the requested input range. This is the frame's power
+                buffer, so it is overwritten by the next call.
         """
-        # Separate lateral and vertical thrusters for independent normalization
-
-        lateral_indices = []
-        vertical_indices = []
-        lateral_thrusters = []
-        vertical_thrusters = []
+        # Calculate the magnitude of the lateral and vertical thruster inputs
 
-        for i, position in enumerate(key_order):
-            if "_VERTICAL" in str(position):
-                vertical_indices.append(i)
-                vertical_thrusters.append(input_power[i])
-            else:
-                lateral_indices.append(i)
-                lateral_thrusters.append(input_power[i])
-
-        #Calculate the magnitude of the lateral and vertical thruster inputs
-
-        #To be correct we should take the cube root, but I felt the square root was a smoother response curve.  Needs testing in real life
+        # To be correct we should take the cube root, but I felt the square root was a smoother response curve.  Needs testing in real life
         horz_magnitude = math.sqrt(requested_motions[Directions.FORWARDS] ** 2 +
-                         requested_motions[Directions.RIGHT] ** 2 +
-                         requested_motions[Directions.YAW] ** 2)
+                                   requested_motions[Directions.RIGHT] ** 2 +
+                                   requested_motions[Directions.YAW] ** 2)
 
         vert_magnitude = math.sqrt(requested_motions[Directions.UP] ** 2 +
                                    requested_motions[Directions.ROLL] ** 2 +
                                    requested_motions[Directions.PITCH] ** 2)
 
-        #Ensure values are in the range of 0, 1 - Not needed if cube root is used to calculate magnitude
-        horz_magnitude = np.clip(horz_magnitude, 0, 1)
-        vert_magnitude = np.clip(vert_magnitude, 0, 1)
-
-        # Normalize lateral thrusters
-        norm_motor_thrust_array = input_power.copy()
-        lateral_norm_max = max([abs(val) for val in lateral_thrusters]) if lateral_thrusters else 1
-        lateral_norm_scalar = horz_magnitude / lateral_norm_max if lateral_norm_max != 0 else 0
-        for i in lateral_indices:
-            norm_motor_thrust_array[i] = input_power[i] * lateral_norm_scalar
-
-        # Normalize vertical thrusters
-        vertical_norm_max = max([abs(val) for val in vertical_thrusters]) if vertical_thrusters else 1
-        vertical_norm_scalar = vert_magnitude / vertical_norm_max if vertical_norm_max != 0 else 0
-        for i in vertical_indices:
-            norm_motor_thrust_array[i] = input_power[i] * vertical_norm_scalar
+        # Ensure values are in the range of 0, 1 - Not needed if cube root is used to calculate magnitude
+        horz_magnitude = min(horz_magnitude, 1.0)
+        vert_magnitude = min(vert_magnitude, 1.0)
 
-        thruster_outputs = {}
-        for i in lateral_indices:
-            key = key_order[i]
-            value = norm_motor_thrust_array[i]
-            thruster_outputs[key] = value
+        # Lateral and vertical thrusters are normalized independently, each group by its largest thrust.
+        np.abs(input_power, out=self._abs_power)
+        lateral_norm_max = self._abs_power.max(where=self._lateral_mask, initial=0.0)
+        vertical_norm_max = self._abs_power.max(where=self._vertical_mask, initial=0.0)
 
-        for i in vertical_indices:
-            key = key_order[i]
-            value = norm_motor_thrust_array[i]
-            thruster_outputs[key] = value
+        lateral_norm_scalar = horz_magnitude / lateral_norm_max if lateral_norm_max != 0 else 0.0
+        vertical_norm_scalar = vert_magnitude / vertical_norm_max if vertical_norm_max != 0 else 0.0
 
-        return thruster_outputs
+        np.copyto(self._power_scalars, lateral_norm_scalar, where=self._lateral_mask)
+        np.copyto(self._power_scalars, vertical_norm_scalar, where=self._vertical_mask)
 
+        return np.multiply(input_power, self._power_scalars, out=self._power)
 
     # TODO: This function should probably be moved into the ROV-specific files
     @classmethod
@@ -0,0 +1,262 @@
+"""Reads the controllers on a thread of its own, faster than the main loop runs.
+
+Reading the controllers once a frame misses any press that starts and ends between two frames, and when the main loop
+overruns every input is read late. The sampler thread reads every controller at a fixed rate and stores each reading,
+with the time it was taken, in a ring buffer per controller. Once a frame the main loop takes the readings since the
+last frame and turns them into the number of presses and releases of each button, along with when they happened, and
+a filtered value for each axis.
+
+The sampler thread is the only writer of the ring buffers and the main loop the only reader, so they share them
+without a lock. The sampler thread also pumps pygame's events, as that is what refreshes the joysticks, so nothing
+else should while it runs.
+"""
+import threading
+import time
+from typing import Callable, Literal
+
+import numpy as np
+import pygame
+
+import enums
+import controller as ctrl
+from utilities.ring_buffer import RingBuffer
+
+
+class _ControllerSamples:
+    """The readings of one controller and how far the main loop has got through them."""
+
+    def __init__(self, controller: ctrl.Controller, capacity: int) -> None:
+        self.controller = controller
+        self.axis_indices = controller.axis_indices
+        self.button_indices = controller.button_indices
+        self.hat_indices = controller.hat_indices
+
+        # The directions of each hat are stored after the buttons so that they are counted the same way.
+        self.dtype = np.dtype([
+            ("time_ns", np.int64),
+            ("axes", np.float64, (len(self.axis_indices),)),
+            ("buttons", np.bool_, (len(self.button_indices) + 4 * len(self.hat_indices),)),
+            ("hats", np.int8, (len(self.hat_indices), 2)),
+        ])
+        self.buffer = RingBuffer(capacity, dtype=self.dtype)
+        self.row = np.zeros((), dtype=self.dtype)
+
+        # How many readings the main loop has taken, and what it saw last.
+        self.read = 0
+        self.axes = np.zeros(len(self.axis_indices))
+        self.buttons = np.zeros(len(self.button_indices) + 4 * len(self.hat_indices), dtype=np.bool_)
+        self.hats = np.zeros((len(self.hat_indices), 2), dtype=np.int8)
+
+        # Handed out for frames in which nothing changed.
+        self.no_changes = np.zeros(len(self.buttons), dtype=np.int64)
+        self.no_times = np.zeros(len(self.buttons))
+
+
+class InputSampler:
+    """Reads the controllers on a thread of its own and hands the readings to the main loop a frame at a time.
+
+    Properties:
+        rate (float):
+            How many times a second the controllers are read, in Hz.
+        running (bool):
+            Whether the sampler thread is running.
+        overruns (int):
+            How many readings were skipped because the previous one was late.
+
+    Methods:
+        start() -> None:
+            Start the sampler thread.
+        stop() -> None:
+            Stop the sampler thread and wait for it to finish.
+        sample() -> None:
+            Read every controller once.
+        update() -> None:
+            Update the controllers from the readings taken since the last update.
+    """
+
+    def __init__(self, controllers: dict[enums.ControllerNames, ctrl.Controller], rate: float = 250,
+                 capacity: int = 256, axis_filter: Literal["mean", "latest"] = "mean",
+                 clock: Callable[[], int] = time.monotonic_ns, pump: Callable[[], None] = pygame.event.pump) -> None:
+        """Initialize the InputSampler object. The controllers must already be initialized.
+
+        Args:
+            controllers (dict[enums.ControllerNames, ctrl.Controller]):
+                The controllers to read.
+            rate (float, optional):
+                How many times a second to read the controllers, in Hz.
+                Defaults to 250.
+            capacity (int, optional):
+                How many readings of each controller to keep.
+                Defaults to 256.
+            axis_filter (Literal["mean", "latest"], optional):
+                How the readings of an axis during a frame are combined.
+                Defaults to "mean".
+            clock (Callable[[], int], optional):
+                The monotonic clock the readings are timed with, in nanoseconds.
+                Defaults to time.monotonic_ns.
+            pump (Callable[[], None], optional):
+                Refreshes the joysticks before each reading.
+                Defaults to pygame.event.pump.
+        """
+        if rate <= 0:
+            raise ValueError(f"Sample rate must be positive, got {rate}")
+        if axis_filter not in ("mean", "latest"):
+            raise ValueError(f"Unknown axis filter: {axis_filter}")
+
+        self._rate = rate
+        self._period_ns = round(1_000_000_000 / rate)
+        self._axis_filter = axis_filter
+        self._clock = clock
+        self._pump = pump
+
+        self._controllers = [_ControllerSamples(controller, capacity) for controller in controllers.values()]
+
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._error: BaseException | None = None
+        self._overruns = 0
+
+    @property
+    def rate(self) -> float:
+        """How many times a second the controllers are read, in Hz."""
+        return self._rate
+
+    @property
+    def running(self) -> bool:
+        """Whether the sampler thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overruns(self) -> int:
+        """How many readings were skipped because the previous one was late."""
+        return self._overruns
+
+    def start(self) -> None:
+        """Start the sampler thread."""
+        if self.running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="InputSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sampler thread and wait for it to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Read the controllers against fixed deadlines until stopped."""
+        deadline = self._clock()
+        try:
+            while not self._stop_event.is_set():
+                self.sample()
+
+                deadline += self._period_ns
+                now = self._clock()
+                if now >= deadline:
+                    # Skip the readings that are already late rather than taking them back to back.
+                    missed = (now - deadline) // self._period_ns + 1
+                    self._overruns += missed
+                    deadline += missed * self._period_ns
+
+                self._stop_event.wait((deadline - now) / 1_000_000_000)
+        except BaseException as error:
+            # Hand the error to the main loop, which would otherwise carry on with the last readings.
+            self._error = error
+
+    def sample(self) -> None:
+        """Read every controller once. The sampler thread calls this at its rate, but it can be called directly
+        instead of starting the thread."""
+        self._pump()
+        now = self._clock()
+
+        for samples in self._controllers:
+            joystick = samples.controller.joystick
+            row = samples.row
+
+            row["time_ns"] = now
+            row["axes"] = [joystick.get_axis(index) for index in samples.axis_indices]
+            buttons = [joystick.get_button(index) for index in samples.button_indices]
+            if samples.hat_indices:
+                hats = [joystick.get_hat(index) for index in samples.hat_indices]
+                row["hats"] = hats
+                for hat in hats:
+                    buttons.extend(ctrl.hat_directions(hat))
+            row["buttons"] = buttons
+
+            samples.buffer.append(row)
+
+    def update(self) -> None:
+        """Update the controllers from the readings taken since the last update."""
+        if self._error is not None:
+            raise RuntimeError("The input sampler thread stopped") from self._error
+
+        for samples in self._controllers:
+            samples.controller.apply_frame(self._frame(samples))
+
+    def _frame(self, samples: _ControllerSamples) -> ctrl.InputFrame:
+        """Gather the readings of a controller since the last update into a frame.
+
+        Args:
+            samples (_ControllerSamples):
+                The readings of the controller.
+
+        Returns:
+            ctrl.InputFrame: The filtered axes and the changes of each button and hat direction.
+        """
+        # The sampler thread may be writing over the oldest reading, so never read that far back.
+        end = samples.buffer.count
+        rows = samples.buffer.since(max(samples.read, end - samples.buffer.capacity + 1), end)
+        samples.read = end
+
+        if len(rows) == 0:
+            return self._unchanged(samples)
+
+        if self._axis_filter == "mean":
+            samples.axes = rows["axes"].mean(axis=0)
+        else:
+            samples.axes = rows["axes"][-1]
+        samples.hats = rows["hats"][-1]
+
+        states = rows["buttons"]
+        previous = np.concatenate((samples.buttons[np.newaxis], states[:-1]))
+        changed = states != previous
+        if not changed.any():
+            return self._unchanged(samples, len(rows))
+
+        rising = changed & states
+        falling = changed & previous
+        samples.buttons = states[-1]
+
+        # The last reading each edge happened in. Only meaningful where there was an edge.
+        times = rows["time_ns"] / 1_000_000_000
+        last = len(rows) - 1
+        rise_times = times[last - np.argmax(rising[::-1], axis=0)]
+        fall_times = times[last - np.argmax(falling[::-1], axis=0)]
+
+        return ctrl.InputFrame(
+            len(rows), samples.axes, samples.buttons, rising.sum(axis=0), falling.sum(axis=0), rise_times,
+            fall_times, samples.hats,
+        )
+
+    @staticmethod
+    def _unchanged(samples: _ControllerSamples, count: int = 0) -> ctrl.InputFrame:
+        """Make a frame in which no button or hat direction changed.
+
+        Args:
+            samples (_ControllerSamples):
+                The readings of the controller.
+            count (int, optional):
+                How many readings were taken during the frame.
+                Defaults to 0.
+
+        Returns:
+            ctrl.InputFrame: The latest values of the controller with no changes.
+        """
+        return ctrl.InputFrame(
+            count, samples.axes, samples.buttons, samples.no_changes, samples.no_changes, samples.no_times,
+            samples.no_times, samples.hats,
+        )
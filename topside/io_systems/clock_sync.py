@@ -0,0 +1,140 @@
+"""Estimates how far the ROV's clock is from the surface's, over the MQTT link.
+
+The surface sends a ping on PC/commands/ping holding the time it was sent, and the ROV answers on ROV/pong with a JSON
+list of that time and its own, read from the clock it timestamps video frames with. If the messages took as long each
+way, the ROV read its clock halfway through the round trip, which gives the offset between the clocks. A slow round trip
+can be lopsided by up to its whole length, so the offset is taken from the quickest of the recent round trips.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+PING_COMMAND = "ping"
+PONG_TOPIC = "ROV/pong"
+
+
+class ClockSync:
+    """Keeps an estimate of the offset between the ROV's clock and the surface's, so times the ROV stamps can be turned
+    into the surface's time.
+
+    Properties:
+        synced (bool):
+            Whether a pong has come back yet, so the offset is known.
+        offset_ns (int | None):
+            How far the ROV's clock is ahead of the surface's, in nanoseconds.
+        rtt_ns (int | None):
+            The round trip the offset was worked out from, in nanoseconds.
+
+    Methods:
+        update() -> None:
+            Send a ping if one is due.
+        handle_pong(value: Any) -> None:
+            Take in the ROV's answer to a ping.
+        to_local(rov_ns: int) -> int | None:
+            Turn a time on the ROV's clock into the surface's.
+    """
+
+    def __init__(self, publish: Callable[[dict[str, str | float]], None], interval: float = 1.0, window: int = 16,
+                 timeout: float = 2.0, clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the ClockSync object.
+
+        Args:
+            publish (Callable[[dict[str, str | float]], None]):
+                Sends commands to the ROV, such as ROVConnection.publish_commands.
+            interval (float, optional):
+                How often to ping, in seconds.
+                Defaults to 1.0.
+            window (int, optional):
+                How many of the latest round trips to pick the quickest from. A larger window rides out busier links,
+                but follows the clocks drifting apart more slowly.
+                Defaults to 16.
+            timeout (float, optional):
+                How long to wait for a pong before giving up on its ping, in seconds.
+                Defaults to 2.0.
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds. The times turned into the surface's time are on this clock.
+                Defaults to time.monotonic_ns.
+        """
+        if window <= 0:
+            raise ValueError(f"Window must be positive, got {window}")
+
+        self._publish = publish
+        self._interval_ns = int(interval * 1_000_000_000)
+        self._timeout_ns = int(timeout * 1_000_000_000)
+        self._clock = clock
+
+        # The pongs arrive on the network thread, while the pings go out on the main loop.
+        self._lock = threading.Lock()
+        self._outstanding: set[int] = set()
+        self._samples: deque[tuple[int, int]] = deque(maxlen=window)
+        self._next_ping = 0
+
+        self._offset_ns: int | None = None
+        self._rtt_ns: int | None = None
+
+    @property
+    def synced(self) -> bool:
+        """Whether a pong has come back yet, so the offset is known."""
+        return self._offset_ns is not None
+
+    @property
+    def offset_ns(self) -> int | None:
+        """How far the ROV's clock is ahead of the surface's, in nanoseconds, or None if no pong has come back yet."""
+        return self._offset_ns
+
+    @property
+    def rtt_ns(self) -> int | None:
+        """The round trip the offset was worked out from, in nanoseconds, or None if no pong has come back yet."""
+        return self._rtt_ns
+
+    def update(self) -> None:
+        """Send a ping if one is due, and give up on the pings that have gone unanswered for too long."""
+        now = self._clock()
+        if now < self._next_ping:
+            return
+        self._next_ping = now + self._interval_ns
+
+        with self._lock:
+            self._outstanding = {sent for sent in self._outstanding if now - sent <= self._timeout_ns}
+            self._outstanding.add(now)
+        self._publish({PING_COMMAND: now})
+
+    def handle_pong(self, value: Any) -> None:
+        """Take in the ROV's answer to a ping. Called on the network thread as soon as the pong arrives, so waiting on
+        the main loop doesn't count towards the round trip.
+
+        Args:
+            value (Any):
+                The decoded pong, a list of the ping's time and the ROV's time. Pongs to pings that weren't sent, have
+                been answered already, or were given up on are ignored, such as pongs to pings the command keepalive
+                sent again.
+        """
+        received = self._clock()
+        try:
+            sent, rov_ns = (int(part) for part in value)
+        except (TypeError, ValueError):
+            return
+
+        with self._lock:
+            if sent not in self._outstanding:
+                return
+            self._outstanding.discard(sent)
+
+            self._samples.append((received - sent, rov_ns - (sent + received) // 2))
+            self._rtt_ns, self._offset_ns = min(self._samples)
+
+    def to_local(self, rov_ns: int) -> int | None:
+        """Turn a time on the ROV's clock into the surface's.
+
+        Args:
+            rov_ns (int):
+                The time on the ROV's clock, in nanoseconds.
+
+        Returns:
+            int | None: The time on the surface's clock, in nanoseconds, or None if the offset isn't known yet.
+        """
+        offset = self._offset_ns
+        if offset is None:
+            return None
+        return rov_ns - offset
@@ -0,0 +1,176 @@
+"""Decodes JPEG video frames straight to the size and colour order they're shown in.
+
+libjpeg can decode a frame at a half, a quarter, or an eighth of its size for much less work than decoding it in full,
+so a frame bigger than it's shown at is decoded at the smallest of those that is still at least as big as the display,
+and only the remainder is resized. The result is mirrored and converted to RGB in a preallocated output array, which
+the dashboard can show as it is.
+
+Each stage is timed:
+    parse:
+        Reading the frame's size from its header.
+    decode:
+        Decoding the JPEG, reduced if it can be.
+    resize:
+        Resizing what's left to the output size, if anything is.
+    convert:
+        Converting to RGB and mirroring, into the output array.
+"""
+import struct
+
+import cv2
+import numpy as np
+
+from utilities.profiler import LoopProfiler
+
+# The reductions libjpeg can decode at, largest first, with the flag that asks for each.
+REDUCTIONS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# The start of frame markers, which hold the frame's size. 0xC4, 0xC8, and 0xCC fall in the same range but aren't.
+_START_OF_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers that stand alone, without a length after them.
+_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+_SEGMENT_LENGTH = struct.Struct(">H")
+_FRAME_SIZE = struct.Struct(">BHH")
+
+
+def jpeg_size(data: bytes | memoryview) -> tuple[int, int] | None:
+    """Read the size of a JPEG from its header, without decoding it.
+
+    Args:
+        data (bytes | memoryview):
+            The JPEG.
+
+    Returns:
+        tuple[int, int] | None: The width and height, or None if the header can't be read.
+    """
+    data = memoryview(data)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Markers can be padded with any number of 0xFF bytes.
+            position += 1
+            continue
+        if marker in _STANDALONE_MARKERS:
+            position += 2
+            continue
+
+        if marker in _START_OF_FRAME_MARKERS:
+            if position + 4 + _FRAME_SIZE.size > len(data):
+                return None
+            _, height, width = _FRAME_SIZE.unpack_from(data, position + 4)
+            return width, height
+
+        position += 2 + _SEGMENT_LENGTH.unpack_from(data, position + 2)[0]
+    return None
+
+
+class FrameDecoder:
+    """Decodes JPEG frames to RGB at a set size, doing as little work and as few copies as it can.
+
+    The output arrays are reused. Each frame is decoded into the next of a few of them in turn, so a frame stays
+    intact until that many more have been decoded after it. Show it or copy it before then.
+
+    Properties:
+        width (int):
+            The width of the decoded frames.
+        height (int):
+            The height of the decoded frames.
+        profiler (LoopProfiler):
+            The time each stage of decoding takes.
+
+    Methods:
+        decode(data: bytes | memoryview) -> np.ndarray | None:
+            Decode a JPEG frame.
+    """
+
+    def __init__(self, width: int, height: int, mirror: bool = False, buffers: int = 3) -> None:
+        """Initialize the FrameDecoder object.
+
+        Args:
+            width (int):
+                The width to decode the frames to.
+            height (int):
+                The height to decode the frames to.
+            mirror (bool, optional):
+                Whether to flip the frames left to right.
+                Defaults to False.
+            buffers (int, optional):
+                How many output arrays to take turns decoding into.
+                Defaults to 3.
+        """
+        self._width = width
+        self._height = height
+        self._mirror = mirror
+
+        self._outputs = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(buffers)]
+        self._next_output = 0
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+
+        self._profiler = LoopProfiler()
+        self._parse_span = self._profiler.span("parse")
+        self._decode_span = self._profiler.span("decode")
+        self._resize_span = self._profiler.span("resize")
+        self._convert_span = self._profiler.span("convert")
+
+    @property
+    def width(self) -> int:
+        """The width of the decoded frames."""
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """The height of the decoded frames."""
+        return self._height
+
+    @property
+    def profiler(self) -> LoopProfiler:
+        """The time each stage of decoding takes."""
+        return self._profiler
+
+    def decode(self, data: bytes | memoryview) -> np.ndarray | None:
+        """Decode a JPEG frame to RGB at the decoder's size.
+
+        Args:
+            data (bytes | memoryview):
+                The JPEG.
+
+        Returns:
+            np.ndarray | None: The frame, as a (height, width, 3) array of RGB, or None if it can't be decoded.
+        """
+        with self._parse_span:
+            flag = self._flag(jpeg_size(data))
+
+        with self._decode_span:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+        if image is None:
+            return None
+
+        if image.shape[0] != self._height or image.shape[1] != self._width:
+            with self._resize_span:
+                image = cv2.resize(image, (self._width, self._height), dst=self._resized, interpolation=cv2.INTER_AREA)
+
+        output = self._outputs[self._next_output]
+        self._next_output = (self._next_output + 1) % len(self._outputs)
+        with self._convert_span:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=output)
+            if self._mirror:
+                cv2.flip(output, 1, dst=output)
+        return output
+
+    def _flag(self, size: tuple[int, int] | None) -> int:
+        """Get the flag that decodes a frame of a size at the largest reduction that's still big enough."""
+        if size is None:
+            return cv2.IMREAD_COLOR
+
+        width, height = size
+        for factor, flag in REDUCTIONS:
+            # libjpeg rounds the reduced size up.
+            if -(-width // factor) >= self._width and -(-height // factor) >= self._height:
+                return flag
+        return cv2.IMREAD_COLOR
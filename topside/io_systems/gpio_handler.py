@@ -18,10 +18,16 @@ class GPIOHandler:
             self.pins[thruster].val = val
 
     #TODO add the pin if it does not exist
-    def update(self, subs: dict[str, str]) -> None:
-        for i in subs.keys():
-            if i.startswith("ROV/pins/"):
-                self.pins[i.split("/")[2]].val = int(subs[i])
+    def handle_message(self, path: tuple[str, ...], value: str | int) -> None:
+        """Handle a message routed from a ROV/pins/<pin> topic.
+
+        Args:
+            path (tuple[str, ...]):
+                The topic levels after ROV/pins, starting with the pin name.
+            value (str | int):
+                The value of the pin reported by the ROV.
+        """
+        self.pins[path[0]].val = int(value)
 
     @property
     def pins(self) -> dict[str, Pin]:
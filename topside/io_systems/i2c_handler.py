@@ -12,13 +12,18 @@ class I2CHandler:
         self._i2cs = i2cs
 
     # TODO add the i2c if it does not exist
-    def update(self, subs: dict[str, str]) -> None:
-        for i in subs.keys():
-            if i.startswith("ROV/i2c/"):
-                name = i.split("/")[2]
-                register = i.split("/")[3]
+    def handle_message(self, path: tuple[str, ...], value: str | int) -> None:
+        """Handle a message routed from a ROV/i2c/<device>/<register> topic.
+
+        Args:
+            path (tuple[str, ...]):
+                The topic levels after ROV/i2c, the device name followed by the register name.
+            value (str | int):
+                The value read from the register.
+        """
+        name, register = path[0], path[1]
 
-                self._i2cs[name].received_vals[register] = subs[i]
+        self._i2cs[name].received_vals[register] = value
 
 
     @property
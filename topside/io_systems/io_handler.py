@@ -1,8 +1,12 @@
+from typing import Any, Mapping
+
 import controller
 import controller_input
-from io_systems import gpio_handler, i2c_handler, mqtt_handler, terminal_listener, socket_handler, udp_socket, mavlink_handler
+from io_systems import gpio_handler, i2c_handler, mqtt_handler, terminal_listener, video_handler, mavlink_handler
+from io_systems.topic_router import TopicRouter
+from io_systems.session_log import SessionRecorder
 from enums import ControllerNames
-import utilities.class_tools as class_tools
+from utilities.profiler import LoopProfiler
 
 class IO:
     """Handles the input and output of the custom control classes."""
@@ -14,9 +18,11 @@ class IO:
             input_handler: controller_input.InputHandler | None = None,
             rov_comms: mqtt_handler.ROVConnection | None = None,
             terminal: terminal_listener.TerminalListener | None = None,
-            rov_video: udp_socket.UDPSocket | None = None
+            rov_video: video_handler.VideoHandler | None = None,
+            recorder: SessionRecorder | None = None,
             ) -> None:
-        """Initialize an instance of the class."""
+        """Initialize an instance of the class. If a recorder is given, the controller readings and the changed
+        sensor data of every frame are recorded to it."""
         self._input_handler = input_handler
         self._rov_comms = rov_comms
         self._terminal = terminal
@@ -24,13 +30,31 @@ class IO:
         self._i2c_handler = i2c
         self._mavlink = mavlink
         self._gpio_handler = gpio
+        self._recorder = recorder
+
+        # Incoming messages are routed by topic to the handler that owns them, and only the topics that have changed
+        # since the last frame are routed.
+        self._router = TopicRouter()
+        self._router.register("ROV/pins", self._gpio_handler.handle_message)
+        self._router.register("ROV/i2c", self._i2c_handler.handle_message)
+        self._router.register("ROV/mavlink", self._mavlink.handle_message)
+        self._subscription_generation = 0
 
         self._controller_inputs = self._input_handler.controllers
         self._subscriptions = self._rov_comms.get_subscriptions()
         self._input_handler.update()
-        # TODO: Hook up the UDP stuff
-        # self._video = self._rov_video.get_frame()
-        self._timer = class_tools.Stopwatch()
+        if self._recorder is not None:
+            self._recorder.record({})
+
+        # Times each stage of the loop. The spans are looked up once here to keep the overhead down in update().
+        self._profiler = LoopProfiler()
+        self._update_span = self._profiler.span("io.update")
+        self._input_span = self._profiler.span("io.input")
+        self._subscriptions_span = self._profiler.span("io.get_subscriptions")
+        self._routing_span = self._profiler.span("io.routing")
+        self._publish_i2c_span = self._profiler.span("io.publish_i2c")
+        self._publish_pins_span = self._profiler.span("io.publish_pins")
+        self._publish_mavlink_span = self._profiler.span("io.publish_mavlink")
 
     @property
     def controllers(self) -> dict[ControllerNames, controller.Controller]:
@@ -38,8 +62,8 @@ class IO:
         return self._input_handler.controllers
 
     @property
-    def subscriptions(self) -> dict[str, any]:
-        """Get the subscriptions."""
+    def subscriptions(self) -> Mapping[str, Any]:
+        """Get a read-only snapshot of the subscriptions."""
         return self._subscriptions
 
     @property
@@ -50,6 +74,14 @@ class IO:
     def i2c_handler(self) -> i2c_handler.I2CHandler:
         return self._i2c_handler
 
+    @property
+    def mavlink_handler(self) -> mavlink_handler.MavlinkHandler:
+        return self._mavlink
+
+    @property
+    def router(self) -> TopicRouter:
+        return self._router
+
     @property
     def input_handler(self) -> controller_input.InputHandler:
         return self._input_handler
@@ -63,41 +95,63 @@ class IO:
         return self._terminal
 
     @property
-    def rov_video(self) -> socket_handler.SocketHandler | None:
-        # return self._rov_video
-        return
+    def rov_video(self) -> video_handler.VideoHandler | None:
+        """The video streams from the ROV, if any. Their frames go straight to the dashboard, not through update()."""
+        return self._rov_video
 
     @property
-    def timer(self) -> class_tools.Stopwatch:
-        return self._timer
+    def recorder(self) -> SessionRecorder | None:
+        """The recorder the session is being recorded to, if any."""
+        return self._recorder
 
-    # def get_video(self) -> any:
-    #     """Get the video stream from the Raspberry Pi."""
-    #     return self._rov_video.get_video()
+    @property
+    def profiler(self) -> LoopProfiler:
+        """The profiler that times each stage of the loop."""
+        return self._profiler
 
     def start_listening(self) -> None:
         """Start listening for terminal input."""
         self._rov_comms.connect()
         self._terminal.start_listening()
-        # self._rov_video.start_listening()
+        if self._rov_video is not None:
+            self._rov_video.start()
 
     def update(self) -> None:
         """This should be called only from rov.py. Do not call more than once per frame."""
-        self._input_handler.update()
-        self._subscriptions = self.rov_comms.get_subscriptions()
-        self._gpio_handler.update(self._subscriptions)
-        self._i2c_handler.update(self._subscriptions)
-        self._mavlink.update(self._subscriptions)
-        self._rov_comms.publish_i2c(self.i2c_handler.i2cs)
-        self._rov_comms.publish_pins(self._gpio_handler.pins)
-        self._rov_comms.publish_mavlink_commands(self._mavlink.mavlink_commands)
+        with self._update_span:
+            with self._input_span:
+                self._input_handler.update()
+
+            with self._subscriptions_span:
+                self._subscriptions = self.rov_comms.get_subscriptions()
+
+            with self._routing_span:
+                self._subscription_generation, changes = self._rov_comms.get_subscription_changes(
+                    self._subscription_generation
+                )
+                for topic, value in changes.items():
+                    self._router.route(topic, value)
+
+            if self._recorder is not None:
+                self._recorder.record(changes)
+
+            with self._publish_i2c_span:
+                self._rov_comms.publish_i2c(self.i2c_handler.i2cs)
+            with self._publish_pins_span:
+                self._rov_comms.publish_pins(self._gpio_handler.pins)
+            with self._publish_mavlink_span:
+                self._mavlink.update()
+                self._rov_comms.publish_mavlink_commands(self._mavlink.mavlink_commands)
 
     def shutdown(self) -> None:
         """Shut down the IO system gracefully."""
         self._terminal.stop_listening()
-        # self._rov_video.shutdown()
+        if self._rov_video is not None:
+            self._rov_video.stop()
         self._rov_comms.shutdown()
         self._input_handler.shutdown()
+        if self._recorder is not None:
+            self._recorder.close()
 
     # def add_mavlink_subscription(self, msg_id: int, interval: int = 1_000_000) -> None:
     #     """Add a mavlink subscription."""
@@ -0,0 +1,233 @@
+"""Sends MAVLink commands to the flight controller in order, and makes sure each one is acknowledged.
+
+COMMAND_ACK only says which command it answers, not which time it was sent, so only one command with a given id is
+in flight at a time. The rest wait in the queue, in the order they were submitted. A command that isn't acknowledged
+before its timeout is sent again, waiting longer after each attempt, until it runs out of retries. The flight
+controller's answers are read from the COMMAND_ACK history, so none are missed between two frames of the main loop.
+"""
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable
+
+from io_systems.mavlink_history import MessageHistory
+
+# The MAV_RESULT values the queue treats specially. The others settle the command with that result.
+MAV_RESULT_ACCEPTED = 0
+MAV_RESULT_TEMPORARILY_REJECTED = 1
+MAV_RESULT_IN_PROGRESS = 5
+
+
+class CommandFuture(Future):
+    """A command's outcome. It resolves to the MAV_RESULT the flight controller acknowledged the command with, such
+    as MAV_RESULT_ACCEPTED, or to a TimeoutError once every attempt has gone unacknowledged. Cancelling it before it
+    resolves stops it being sent again.
+
+    Properties:
+        sequence (int):
+            The order the command was submitted in, unique to the queue.
+        command (int):
+            The MAV_CMD id.
+        params (tuple[float, ...]):
+            The command's 7 parameters.
+        attempts (int):
+            How many times the command has been sent.
+        accepted (bool):
+            Whether the command was acknowledged as accepted.
+    """
+
+    def __init__(self, sequence: int, command: int, params: tuple[float, ...]) -> None:
+        super().__init__()
+        self._sequence = sequence
+        self._command = command
+        self._params = params
+        self._attempts = 0
+
+    @property
+    def sequence(self) -> int:
+        """The order the command was submitted in, unique to the queue."""
+        return self._sequence
+
+    @property
+    def command(self) -> int:
+        """The MAV_CMD id."""
+        return self._command
+
+    @property
+    def params(self) -> tuple[float, ...]:
+        """The command's 7 parameters."""
+        return self._params
+
+    @property
+    def attempts(self) -> int:
+        """How many times the command has been sent."""
+        return self._attempts
+
+    @property
+    def accepted(self) -> bool:
+        """Whether the command was acknowledged as accepted."""
+        return self.done() and not self.cancelled() and self.exception() is None \
+            and self.result() == MAV_RESULT_ACCEPTED
+
+
+class _InFlight:
+    """A command that has been sent and is waiting for its acknowledgement."""
+
+    __slots__ = ("future", "timeout_ns", "retries", "deadline")
+
+    def __init__(self, future: CommandFuture, timeout_ns: int, retries: int) -> None:
+        self.future = future
+        self.timeout_ns = timeout_ns
+        self.retries = retries
+        self.deadline = 0
+
+
+class MavlinkCommandQueue:
+    """Sends MAVLink commands in order, one of each id at a time, and retries them until they're acknowledged. Used
+    from the main loop only.
+
+    Properties:
+        queued (int):
+            How many commands are waiting to be sent.
+        in_flight (int):
+            How many commands have been sent and are waiting for their acknowledgement.
+
+    Methods:
+        submit(command: int, params: tuple[float, ...], timeout: float | None = None, retries: int | None = None)
+                -> CommandFuture:
+            Queue a command.
+        update() -> None:
+            Settle the acknowledged commands, resend the timed out ones, and send the queued ones that can go.
+    """
+
+    def __init__(self, send: Callable[[int, tuple[float, ...]], None], acks: MessageHistory, timeout: float = 1.0,
+                 retries: int = 3, backoff: float = 2.0, clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the MavlinkCommandQueue object.
+
+        Args:
+            send (Callable[[int, tuple[float, ...]], None]):
+                Sends a command with its parameters to the flight controller.
+            acks (MessageHistory):
+                The history of COMMAND_ACK messages.
+            timeout (float, optional):
+                How long to wait for a command's first acknowledgement before sending it again, in seconds.
+                Defaults to 1.0.
+            retries (int, optional):
+                How many times to send a command again before giving up on it.
+                Defaults to 3.
+            backoff (float, optional):
+                The factor the wait grows by after each attempt.
+                Defaults to 2.0.
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        self._send = send
+        self._acks = acks
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._clock = clock
+
+        self._queue: deque[tuple[CommandFuture, int, int]] = deque()
+        self._in_flight: dict[int, _InFlight] = {}
+        self._next_sequence = 0
+        # Only the acknowledgements that arrive from now on can be for these commands.
+        self._ack_count = acks.count
+
+    @property
+    def queued(self) -> int:
+        """How many commands are waiting to be sent."""
+        return len(self._queue)
+
+    @property
+    def in_flight(self) -> int:
+        """How many commands have been sent and are waiting for their acknowledgement."""
+        return len(self._in_flight)
+
+    def submit(self, command: int, params: tuple[float, ...], timeout: float | None = None,
+               retries: int | None = None) -> CommandFuture:
+        """Queue a command. It's sent on the next update, unless a command with the same id is still in flight.
+
+        Args:
+            command (int):
+                The MAV_CMD id.
+            params (tuple[float, ...]):
+                The command's 7 parameters.
+            timeout (float | None, optional):
+                How long to wait for the first acknowledgement, in seconds. Commands that take a while to finish, such
+                as calibrations, are only acknowledged once they do.
+                Defaults to None, the queue's timeout.
+            retries (int | None, optional):
+                How many times to send the command again before giving up on it.
+                Defaults to None, the queue's retries.
+
+        Returns:
+            CommandFuture: The command's outcome.
+        """
+        future = CommandFuture(self._next_sequence, command, tuple(params))
+        self._next_sequence += 1
+
+        timeout_ns = int((self._timeout if timeout is None else timeout) * 1_000_000_000)
+        self._queue.append((future, timeout_ns, self._retries if retries is None else retries))
+        return future
+
+    def update(self) -> None:
+        """Settle the acknowledged commands, resend the ones whose acknowledgement is overdue, and send the queued ones
+        whose id is free. Futures are resolved, and their callbacks run, here."""
+        now = self._clock()
+
+        self._ack_count, acks = self._acks.new_samples(self._ack_count)
+        if len(acks):
+            for command, result in zip(acks["command"].astype(int).tolist(), acks["result"].astype(int).tolist()):
+                self._acknowledge(command, result, now)
+
+        for command, entry in list(self._in_flight.items()):
+            if entry.future.cancelled():
+                del self._in_flight[command]
+            elif now >= entry.deadline:
+                if entry.future.attempts > entry.retries:
+                    del self._in_flight[command]
+                    entry.future.set_exception(TimeoutError(
+                        f"Command {command} wasn't acknowledged after {entry.future.attempts} attempts"
+                    ))
+                else:
+                    self._transmit(entry, now)
+
+        waiting = deque()
+        while self._queue:
+            future, timeout_ns, retries = self._queue.popleft()
+            if future.cancelled():
+                continue
+            if future.command in self._in_flight:
+                waiting.append((future, timeout_ns, retries))
+                continue
+
+            entry = _InFlight(future, timeout_ns, retries)
+            self._in_flight[future.command] = entry
+            self._transmit(entry, now)
+        self._queue = waiting
+
+    def _acknowledge(self, command: int, result: int, now: int) -> None:
+        """Settle a command from its acknowledgement, or give it longer if it's still going."""
+        entry = self._in_flight.get(command)
+        # Acknowledgements for commands sent some other way, or already given up on, aren't ours to settle.
+        if entry is None:
+            return
+
+        if result == MAV_RESULT_IN_PROGRESS:
+            entry.deadline = now + entry.timeout_ns
+        elif result == MAV_RESULT_TEMPORARILY_REJECTED and entry.future.attempts <= entry.retries:
+            # Left to be sent again once its current wait is up.
+            pass
+        else:
+            del self._in_flight[command]
+            if not entry.future.cancelled():
+                entry.future.set_result(result)
+
+    def _transmit(self, entry: _InFlight, now: int) -> None:
+        """Send a command and work out how long to wait for its acknowledgement this time."""
+        future = entry.future
+        future._attempts += 1
+        entry.deadline = now + int(entry.timeout_ns * self._backoff ** (future.attempts - 1))
+        self._send(future.command, future.params)
@@ -1,36 +1,384 @@
-import enum
+"""Keeps the newest MAVLink message of each type from the ROV's flight controller, and the commands to send to it.
+
+The messages reach the surface in one of two ways (see MavlinkConfig). As JSON, each one arrives on its
+ROV/mavlink/<message type> topic and is wrapped so its fields can be read as attributes. The types with a history are
+taken as they arrive, on the MQTT network thread, so none are missed between two frames of the main loop, and the rest
+are routed here by the IO. As raw MAVLink v2 frames, they
+are parsed by pymavlink on a background thread into its own message objects, whose fields are attributes as well. Either
+way, a message's fields are read as attributes, such as attitude.roll.
+
+The subscribed message types also keep a history of their recent samples (see mavlink_history), as the newest message
+alone drops every sample that arrives between two frames of the control loop.
+
+Commands for the flight controller go through a queue that sends them in order and retries them until they're
+acknowledged (see mavlink_commands). The ROV must forward the flight controller's COMMAND_ACK messages for that.
+"""
+import socket
+import threading
 import time
+from functools import partial
+from typing import Any, Callable, Iterable
 
+from config.mavlink import MavlinkConfig
 from enums import MavlinkMessageTypes
+from io_systems.mavlink_commands import CommandFuture, MavlinkCommandQueue
+from io_systems.mavlink_history import MessageHistory
+
+# The topic the JSON messages arrive under, followed by their type.
+JSON_TOPIC = "ROV/mavlink"
+
+
+class JsonMessage:
+    """A MAVLink message that arrived as JSON, with its fields readable as attributes like a pymavlink message's.
+
+    Methods:
+        get_type() -> str:
+            Get the name of the message's type.
+        to_dict() -> dict[str, Any]:
+            Get the message's fields.
+    """
+
+    __slots__ = ("_type", "_fields")
+
+    def __init__(self, message_type: str, fields: dict[str, Any]) -> None:
+        """Initialize the JsonMessage object.
+
+        Args:
+            message_type (str):
+                The name of the message's type, such as "ATTITUDE".
+            fields (dict[str, Any]):
+                The decoded message.
+        """
+        self._type = message_type
+        self._fields = fields
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._fields[name]
+        except KeyError:
+            raise AttributeError(f"{self._type} has no field {name!r}") from None
+
+    def get_type(self) -> str:
+        """Get the name of the message's type."""
+        return self._type
+
+    def to_dict(self) -> dict[str, Any]:
+        """Get the message's fields, along with its type as pymavlink's to_dict has it."""
+        return {"mavpackettype": self._type, **self._fields}
+
+    def __repr__(self) -> str:
+        return f"{self._type} {self._fields}"
 
 
 class MavlinkHandler:
-    
+    """Keeps the newest MAVLink message of each type, and the commands to send to the flight controller.
+
+    Properties:
+        mavlink_messages (dict[str, Any]):
+            The newest message of each type, by type name, such as "ATTITUDE".
+        message_times (dict[str, int]):
+            When the newest message of each type arrived, in nanoseconds.
+        histories (dict[str, MessageHistory]):
+            The recent samples of each subscribed message type, by type name.
+        mavlink_commands (dict[MavlinkMessageTypes, tuple[int, int, int, int, int, int, int]]):
+            The commands the queue is sending this frame, with their 7 parameters. Cleared once they're published.
+        commands (MavlinkCommandQueue):
+            The queue the commands wait in until they're acknowledged.
+        messages_received (int):
+            How many messages have arrived.
+        bad_frames (int):
+            How many raw frames couldn't be parsed, such as ones that failed their checksum.
+        running (bool):
+            Whether the UDP receiver thread is running.
+
+    Methods:
+        handle_message(path: tuple[str, ...], value: dict) -> None:
+            Handle a message routed from a ROV/mavlink/<message type> topic.
+        feed(data: bytes | memoryview) -> None:
+            Parse raw MAVLink frames.
+        listen(add_listener: Callable[..., None]) -> None:
+            Take the messages from the ROV connection as they arrive.
+        history(name: str) -> MessageHistory:
+            Get the recent samples of a subscribed message type.
+        update() -> None:
+            Settle acknowledged commands and send the ones that are due.
+        start() -> None:
+            Start receiving raw frames over UDP, if that's the transport.
+        stop() -> None:
+            Stop receiving raw frames over UDP.
+        add_command(command: MavlinkMessageTypes | int, parameters: tuple[int, int, int, int, int, int, int],
+                    timeout: float | None = None, retries: int | None = None) -> CommandFuture:
+            Queue a command to send to the flight controller.
+    """
+
     mavlink_commands: dict[MavlinkMessageTypes, tuple[int, int, int, int, int, int, int]]  # dict[message_type, tuple[param1, param2, param3, param4, param5, param6, param7]]
-    mavlink_messages: dict[str, dict]
     # _last_mavlink_commands: dict[MavlinkMessageTypes, tuple[int, int, int, int, int, int, int]]
 
-    def __init__(self):
+    def __init__(self, config: MavlinkConfig = MavlinkConfig(), history_types: Iterable[str] = (),
+                 clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the MavlinkHandler object.
+
+        Args:
+            config (MavlinkConfig, optional):
+                How the messages reach the surface and how many samples of each type to keep.
+                Defaults to MavlinkConfig(), JSON on ROV/mavlink/<message type>.
+            history_types (Iterable[str], optional):
+                The message types to keep a history of, such as the subscribed ones. COMMAND_ACK always is.
+                Defaults to (), none.
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        if config.transport not in ("json", "mqtt", "udp"):
+            raise ValueError(f"Unknown MAVLink transport: {config.transport}")
+
+        self._config = config
+        self._clock = clock
 
         self.mavlink_commands = {}  # commands that will be sent to mavlink
-        self.mavlink_messages = {}  # received data from mavlink
         # self._last_mavlink_commands = {}
 
-    def update(self, subs: dict[str, dict]) -> None:
-        for i in subs.keys():
-            if i.startswith("ROV/mavlink/"):
-                name = i.split("/")[2]
+        # Received data from mavlink. The raw frames are parsed on a background thread while the main loop reads these,
+        # so a new message type replaces the dicts rather than growing them, and a reader looping over them never sees
+        # them change size.
+        self._messages: dict[str, Any] = {}
+        self._times: dict[str, int] = {}
+        self._messages_received = 0
+        self._bad_frames = 0
+        # The JSON message types taken as they arrive rather than routed by the IO, which can store others meanwhile.
+        self._listened: frozenset[str] = frozenset()
+        self._store_lock = threading.Lock()
+        self._histories = {
+            name: MessageHistory(name, config.history_size) for name in dict.fromkeys([*history_types, "COMMAND_ACK"])
+        }
+        self._commands = MavlinkCommandQueue(
+            self._send_command, self._histories["COMMAND_ACK"], config.command_timeout, config.command_retries,
+            config.command_backoff, clock,
+        )
+
+        self._parser = _make_parser() if config.transport != "json" else None
+
+        self._socket: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._error: BaseException | None = None
+
+    @property
+    def mavlink_messages(self) -> dict[str, Any]:
+        """The newest message of each type, by type name. Raises a RuntimeError if parsing the raw frames failed."""
+        if self._error is not None:
+            raise RuntimeError("Receiving the MAVLink messages failed") from self._error
+        return self._messages
+
+    @property
+    def message_times(self) -> dict[str, int]:
+        """When the newest message of each type arrived, in nanoseconds, by type name."""
+        return self._times
+
+    @property
+    def histories(self) -> dict[str, MessageHistory]:
+        """The recent samples of each subscribed message type, by type name."""
+        return self._histories
+
+    @property
+    def commands(self) -> MavlinkCommandQueue:
+        """The queue the commands wait in until they're acknowledged."""
+        return self._commands
+
+    @property
+    def messages_received(self) -> int:
+        """How many messages have arrived."""
+        return self._messages_received
+
+    @property
+    def bad_frames(self) -> int:
+        """How many raw frames couldn't be parsed, such as ones that failed their checksum."""
+        return self._bad_frames
+
+    @property
+    def running(self) -> bool:
+        """Whether the UDP receiver thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def handle_message(self, path: tuple[str, ...], value: dict) -> None:
+        """Handle a message routed from a ROV/mavlink/<message type> topic.
+
+        Args:
+            path (tuple[str, ...]):
+                The topic levels after ROV/mavlink, starting with the message type name.
+            value (dict):
+                The decoded mavlink message.
+        """
+        if isinstance(value, dict) and path[0] not in self._listened:
+            self._store(path[0], JsonMessage(path[0], value))
+
+    def feed(self, data: bytes | memoryview) -> None:
+        """Parse raw MAVLink frames, keeping the newest message of each type. The frames can be split across calls in
+        any way. Called from one thread at a time, such as the MQTT network thread or the UDP receiver.
+
+        Args:
+            data (bytes | memoryview):
+                The raw bytes, as they arrived.
+        """
+        try:
+            messages = self._parser.parse_buffer(data)
+            if not messages:
+                return
+
+            now = self._clock()
+            for message in messages:
+                name = message.get_type()
+                if name == "BAD_DATA":
+                    self._bad_frames += 1
+                else:
+                    self._store(name, message, now)
+        except BaseException as error:
+            # Hand the error to the main loop, which would otherwise carry on with the last messages.
+            self._error = error
+
+    def listen(self, add_listener: Callable[..., None]) -> None:
+        """Take the messages from the ROV connection as they arrive, on its network thread. With the JSON transport,
+        that's every message type with a history, so each of their samples is kept and stamped with when it arrived.
+        With the MQTT transport, it's the raw frames.
+
+        Args:
+            add_listener (Callable[..., None]):
+                Adds a listener for a topic, such as ROVConnection.add_listener.
+        """
+        if self._config.transport == "mqtt":
+            add_listener(self._config.topic, self.feed, raw=True)
+        elif self._config.transport == "json":
+            for name in self._histories:
+                add_listener(f"{JSON_TOPIC}/{name}", partial(self._receive_json, name))
+            self._listened = frozenset(self._histories)
+
+    def history(self, name: str) -> MessageHistory:
+        """Get the recent samples of a subscribed message type.
+
+        Args:
+            name (str):
+                The message type, such as "ATTITUDE".
+
+        Returns:
+            MessageHistory: The samples.
+        """
+        return self._histories[name]
+
+    def update(self) -> None:
+        """Settle the acknowledged commands and put the ones that are due in mavlink_commands to be published. Called
+        once a frame, before the commands are published."""
+        self._commands.update()
+
+    def start(self) -> None:
+        """Start receiving raw frames over UDP on a thread of its own, if that's the transport."""
+        if self._config.transport != "udp" or self.running:
+            return
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._config.buffer_size)
+        self._socket.settimeout(self._config.timeout)
+        self._socket.bind((self._config.ip_address, self._config.port))
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._receive, name="MavlinkReceiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop receiving raw frames over UDP and close the socket."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def add_command(self, command: MavlinkMessageTypes | int, parameters: tuple[int, int, int, int, int, int, int],
+                    timeout: float | None = None, retries: int | None = None) -> CommandFuture:
+        """Queue a command to send to the flight controller. Commands are sent in the order they're added, and each is
+        sent again until it's acknowledged or runs out of retries.
+
+        Args:
+            command (MavlinkMessageTypes | int):
+                The command, or its MAV_CMD id.
+            parameters (tuple[int, int, int, int, int, int, int]):
+                The command's 7 parameters.
+            timeout (float | None, optional):
+                How long to wait for the first acknowledgement, in seconds.
+                Defaults to None, the configured timeout.
+            retries (int | None, optional):
+                How many times to send the command again before giving up on it.
+                Defaults to None, the configured retries.
+
+        Returns:
+            CommandFuture: The command's outcome, which resolves to the MAV_RESULT it was acknowledged with.
+        """
+        if isinstance(command, MavlinkMessageTypes):
+            command = command.value
+        return self._commands.submit(int(command), parameters, timeout, retries)
 
-                self.mavlink_messages[name] = subs[i]
-    
-    def add_command(self, command: MavlinkMessageTypes, parameters: tuple[int, int, int, int, int, int, int]):
-        self.mavlink_commands[command] = parameters
-    
     @property
     def mavlink_commands(self):
         return self._mavlink_commands
-    
+
     @mavlink_commands.setter
     def mavlink_commands(self, mavlink_commands: dict[MavlinkMessageTypes, tuple[int, int, int, int, int, int, int]]):
         self._mavlink_commands = mavlink_commands
-    
+
+    def _send_command(self, command: int, parameters: tuple[float, ...]) -> None:
+        """Put a command in mavlink_commands, for the IO to publish. Only one command of each id is in flight at a
+        time, so commands never overwrite each other here."""
+        self.mavlink_commands[command] = parameters
+
+    def _receive_json(self, name: str, value: Any) -> None:
+        """Keep a JSON message as it arrives. Called on the MQTT network thread."""
+        if not isinstance(value, dict):
+            return
+        try:
+            self._store(name, JsonMessage(name, value))
+        except BaseException as error:
+            self._error = error
+
+    def _store(self, name: str, message: Any, now: int | None = None) -> None:
+        """Keep a message as the newest of its type. With the JSON transport, the network thread and the main loop
+        both store messages, so only one does at a time."""
+        with self._store_lock:
+            if now is None:
+                now = self._clock()
+            self._messages_received += 1
+
+            history = self._histories.get(name)
+            if history is not None:
+                history.append(message, now)
+
+            if name in self._messages:
+                self._messages[name] = message
+                self._times[name] = now
+            else:
+                self._messages = {**self._messages, name: message}
+                self._times = {**self._times, name: now}
+
+    def _receive(self) -> None:
+        """Read datagrams of raw frames and parse them until stopped."""
+        buffer = bytearray(self._config.buffer_size)
+        view = memoryview(buffer)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    size = self._socket.recv_into(buffer)
+                except socket.timeout:
+                    continue
+                self.feed(view[:size])
+        except BaseException as error:
+            self._error = error
+
+
+def _make_parser() -> Any:
+    """Make a MAVLink v2 parser that hands back frames it can't parse instead of raising. pymavlink is only imported
+    here, as the JSON transport doesn't need it."""
+    from pymavlink.dialects.v20 import ardupilotmega
+
+    parser = ardupilotmega.MAVLink(None)
+    parser.robust_parsing = True
+    return parser
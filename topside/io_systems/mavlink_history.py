@@ -0,0 +1,181 @@
+"""Keeps the recent samples of a MAVLink message type, so estimators and PIDs can use every sample that arrived since
+they last looked rather than only the newest.
+
+Each type's samples are kept in a RingBuffer with a structured dtype: when each sample arrived, its time_boot_ms, and
+each of its numeric fields as a float. The fields are taken from the first message of the type, so the same history
+works for messages that arrived as JSON and ones parsed by pymavlink.
+"""
+from typing import Any
+
+import numpy as np
+
+from utilities.ring_buffer import RingBuffer
+
+# The columns every history has, ahead of the message's own fields. time_boot_ms is -1 for messages without one.
+BASE_FIELDS = [("arrival_ns", np.int64), ("time_boot_ms", np.int64)]
+BASE_DTYPE = np.dtype(BASE_FIELDS)
+
+
+class MessageHistory:
+    """The recent samples of one MAVLink message type, newest last. One thread appends while others read, without a
+    lock.
+
+    Properties:
+        name (str):
+            The message type, such as "ATTITUDE".
+        capacity (int):
+            The most samples kept.
+        count (int):
+            How many samples have been appended in total.
+        fields (tuple[str, ...]):
+            The message's numeric fields, once the first sample has arrived.
+        dtype (np.dtype):
+            The dtype of the samples.
+
+    Methods:
+        append(message: Any, arrival_ns: int) -> None:
+            Add a sample.
+        latest(n: int = 1) -> np.ndarray:
+            Get the newest samples.
+        since(time_ns: int) -> np.ndarray:
+            Get the samples that arrived at or after a time.
+        new_samples(since_count: int) -> tuple[int, np.ndarray]:
+            Get the samples appended since a previous read.
+        resample(field: str, times_ns: np.ndarray) -> np.ndarray:
+            Get a field at any times, interpolating between the samples.
+    """
+
+    def __init__(self, name: str, capacity: int = 256) -> None:
+        """Initialize the MessageHistory object.
+
+        Args:
+            name (str):
+                The message type, such as "ATTITUDE".
+            capacity (int, optional):
+                The most samples to keep.
+                Defaults to 256.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+
+        self._name = name
+        self._capacity = capacity
+        self._fields: tuple[str, ...] = ()
+        self._dtype = BASE_DTYPE
+        # Made once the first message shows which fields the type has.
+        self._buffer: RingBuffer | None = None
+
+    @property
+    def name(self) -> str:
+        """The message type, such as "ATTITUDE"."""
+        return self._name
+
+    @property
+    def capacity(self) -> int:
+        """The most samples kept."""
+        return self._capacity
+
+    @property
+    def count(self) -> int:
+        """How many samples have been appended in total, including ones that have since been overwritten."""
+        buffer = self._buffer
+        return 0 if buffer is None else buffer.count
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        """The message's numeric fields, or an empty tuple until the first sample has arrived."""
+        return self._fields
+
+    @property
+    def dtype(self) -> np.dtype:
+        """The dtype of the samples: arrival_ns, time_boot_ms, then each field."""
+        return self._dtype
+
+    def append(self, message: Any, arrival_ns: int) -> None:
+        """Add a sample. Only one thread may append.
+
+        Args:
+            message (Any):
+                The message, a pymavlink message or a JsonMessage.
+            arrival_ns (int):
+                When the message arrived, in nanoseconds.
+        """
+        values = message.to_dict()
+        if self._buffer is None:
+            self._fields = tuple(
+                field for field, value in values.items()
+                if field != "time_boot_ms" and isinstance(value, (int, float))
+            )
+            self._dtype = np.dtype(BASE_FIELDS + [(field, np.float64) for field in self._fields])
+            self._buffer = RingBuffer(self._capacity, dtype=self._dtype)
+
+        self._buffer.append(
+            (arrival_ns, values.get("time_boot_ms", -1), *(values.get(field, np.nan) for field in self._fields))
+        )
+
+    def latest(self, n: int = 1) -> np.ndarray:
+        """Get the newest samples.
+
+        Args:
+            n (int, optional):
+                How many samples to get.
+                Defaults to 1.
+
+        Returns:
+            np.ndarray: Up to n samples, oldest first.
+        """
+        return self.new_samples(self.count - n)[1]
+
+    def since(self, time_ns: int) -> np.ndarray:
+        """Get the samples that arrived at or after a time.
+
+        Args:
+            time_ns (int):
+                The time, in nanoseconds.
+
+        Returns:
+            np.ndarray: The samples, oldest first.
+        """
+        samples = self._values()
+        return samples[np.searchsorted(samples["arrival_ns"], time_ns):]
+
+    def new_samples(self, since_count: int) -> tuple[int, np.ndarray]:
+        """Get the samples appended since a previous read, so each sample is used exactly once. Samples that were
+        overwritten in the meantime are left out.
+
+        Args:
+            since_count (int):
+                The count returned by the previous read, or 0 for every sample kept.
+
+        Returns:
+            tuple[int, np.ndarray]: The count to pass to the next read, and the samples, oldest first.
+        """
+        buffer = self._buffer
+        if buffer is None:
+            return 0, np.empty(0, dtype=self._dtype)
+
+        # The oldest sample may be being overwritten, so it's left out.
+        end = buffer.count
+        return end, buffer.since(max(since_count, end - buffer.capacity + 1), end)
+
+    def resample(self, field: str, times_ns: np.ndarray) -> np.ndarray:
+        """Get a field at any times, interpolating linearly between the samples by when they arrived. Times outside
+        the samples get the nearest sample's value.
+
+        Args:
+            field (str):
+                The field, such as "roll".
+            times_ns (np.ndarray):
+                The times, in nanoseconds.
+
+        Returns:
+            np.ndarray: The field at each time, or NaN at every time if there are no samples.
+        """
+        samples = self._values()
+        if not len(samples):
+            return np.full(np.shape(times_ns), np.nan)
+        return np.interp(times_ns, samples["arrival_ns"], samples[field])
+
+    def _values(self) -> np.ndarray:
+        """Get every sample kept, oldest first."""
+        return self.new_samples(0)[1]
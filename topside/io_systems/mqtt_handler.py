@@ -1,9 +1,11 @@
-import copy
 import subprocess
 import time
 from threading import Lock
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Literal, Mapping
 from hardware.pin import Pin
 from hardware.i2c import I2C
+from io_systems.pin_frame import PIN_FRAME_TOPIC, SEQUENCE_MODULUS, encode_pin_frame
 import json
 from enums import MavlinkMessageTypes
 
@@ -22,14 +24,20 @@ class ROVConnection:
         publish_i2c(i2cs: dict[str, I2C]) -> None:
             Send a series of packets from the Raspberry Pi with the specified I2C values.
         publish_pins(pins: dict[str, Pin]) -> None:
-            Send a series of packets from the Raspberry Pi with the specified thruster PWM values.
-        get_subscriptions() -> dict[str, float | str | dict[str, float | str]]:
-            Get the sensor data from the Raspberry Pi.
+            Send a series of packets from the Raspberry Pi with the specified thruster PWM values, either on a topic
+            per pin value or as a single binary pin frame.
+        get_subscriptions() -> Mapping[str, Any]:
+            Get a read-only snapshot of the latest sensor data from the Raspberry Pi.
+        get_subscription_changes(since_generation: int) -> tuple[int, dict[str, Any]]:
+            Get only the sensor data that has arrived since a previous generation.
+        add_listener(topic: str, callback: Callable[[Any], None], raw: bool = False) -> None:
+            Call a function with each message on a topic as soon as it arrives.
         shutdown() -> None:
             Disconnect from the MQTT broker.
     """
 
-    def __init__(self, ip: str = "localhost", port: int = 1883, client_id: str = "PC") -> None:
+    def __init__(self, ip: str = "localhost", port: int = 1883, client_id: str = "PC",
+                 pin_publish_mode: Literal["topics", "frame"] = "topics") -> None:
         """Initialize the SurfaceConnection object.
 
         Args:
@@ -42,10 +50,19 @@ class ROVConnection:
             client_id (str, optional):
                 The ID of the computer connecting to the MQTT broker.
                 Defaults to "PC".
+            pin_publish_mode (Literal["topics", "frame"], optional):
+                How changed pins are sent to the ROV. "topics" publishes the id, mode, val, and freq of each pin on its
+                own topic, while "frame" packs every changed pin into a single binary message on PC/pin_frame so that
+                a thruster command is always applied as a whole.
+                Defaults to "topics".
         """
+        if pin_publish_mode not in ("topics", "frame"):
+            raise ValueError(f"pin_publish_mode must be \"topics\" or \"frame\", not {pin_publish_mode!r}.")
+
         self._ip = ip
         self._port = port
         self._client_id = client_id
+        self._pin_publish_mode = pin_publish_mode
 
         # TODO: Figure this out: callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
         self._client = mqtt_c.Client(client_id=self._client_id)
@@ -56,24 +73,36 @@ class ROVConnection:
         # self._client.on_subscribe = self._on_subscribe
         # self._client.on_disconnect = self._on_disconnect
 
+        # Payloads are decoded once when they arrive. Every message bumps the generation counter, and each topic
+        # remembers the generation it was last updated in. _topic_generations is kept in generation order by moving
+        # updated topics to the end, so changes since a generation can be found without looking at every topic.
         self._subscription_lock: Lock = Lock()
-        self._subscriptions = {}
+        self._subscriptions: dict[str, Any] = {}
+        self._topic_generations: dict[str, int] = {}
+        self._generation: int = 0
+
+        self._snapshot: Mapping[str, Any] = MappingProxyType({})
+        self._snapshot_generation: int = 0
 
-        # Store the last pin configs to only send the ones that have changed.
-        self._last_pin_configs: dict[str, Pin] = {}
+        # Pins and I2C devices report their own changes by adding their names to these dirty sets, so only the ones
+        # that have changed get sent.
+        self._tracked_pins: dict[str, Pin] = {}
+        self._dirty_pins: set[str] = set()
         self._last_pin_update: float = 0.0
         self._idle_ping_frequency: float = 2.0
+        self._pin_frame_sequence: int = 0
 
-        self._last_i2c_configs: dict[str, I2C] = {}
+        self._tracked_i2cs: dict[str, I2C] = {}
+        self._dirty_i2cs: set[str] = set()
         self._last_i2c_update: float = 0.0
 
-        self._last_mavlink_requests: dict[int, tuple[int, int, int, int, int, int, int]] = {}
-        self._last_mavlink_update: float = 0.0
-
         # Do the same for commands.
         self._last_command_values = {}
         self._last_command_update: float = 0.0
 
+        self._listeners: dict[str, list[Callable[[Any], None]]] = {}
+        self._raw_listeners: dict[str, list[Callable[[bytes], None]]] = {}
+
     def connect(self) -> None:
         """Connect to the MQTT broker."""
         try:
@@ -112,7 +141,7 @@ class ROVConnection:
         # If no values have changed for too long, send the last values every 0.5 seconds.
         if not changed_command_values:
             if time.time() - self._last_command_update > self._idle_ping_frequency:
-                changed_command_values = copy.deepcopy(self._last_command_values)
+                changed_command_values = self._last_command_values
 
         # Update the last PWM update time regardless of whether the PWM values have changed.
         self._last_command_update = time.time()
@@ -122,86 +151,111 @@ class ROVConnection:
 
     def publish_i2c(self, i2cs: dict[str, I2C]) -> None:
         """Send a series of packets from the Raspberry Pi with the specified I2C values. To improve
-        performance, only put the sending_vals that have changed into the dictionary.
+        performance, only the I2C devices that have changed since the last call are sent.
 
         Args:
             i2cs (dict[str, I2C]):
                 List of I2C values to be sent to the ROV.
         """
-        # Build a dictionary of the PWM values that have changed.
-        changed_i2c_configs = {}
-
-        # print(self._last_pin_configs)
-        for i2c, config in i2cs.items():
-            if i2c in self._last_i2c_configs.keys():
-                if config != self._last_i2c_configs.get(i2c, None):
-                    changed_i2c_configs[i2c] = copy.deepcopy(config)
-                    self._last_i2c_configs[i2c] = copy.deepcopy(config)
-            else:
-                changed_i2c_configs[i2c] = copy.deepcopy(config)
-                self._last_i2c_configs[i2c] = copy.deepcopy(config)
+        self._track_changes(i2cs, self._tracked_i2cs, self._dirty_i2cs)
 
         # If no values have changed for too long, send the last values every 0.5 seconds.
-        # if not changed_i2c_configs:
+        # if not self._dirty_i2cs:
         #     if time.time() - self._last_i2c_update > self._idle_ping_frequency:
-        #         changed_i2c_configs = copy.deepcopy(self._last_i2c_configs)
+        #         self._dirty_i2cs.update(self._tracked_i2cs)
         #         self._last_i2c_update = time.time()
         # else:
         #     # Update the last PWM update time
         #     self._last_i2c_update = time.time()
 
-
-
-        # Publish the PWM values to the MQTT broker.
-        for pos, value in changed_i2c_configs.items():
-            # print("Pin:", value.id, "Value:", value.val)
+        # Publish the I2C values to the MQTT broker.
+        for pos in self._dirty_i2cs:
+            value = self._tracked_i2cs[pos]
             self._client.publish(f"PC/i2c/{pos}/addr", value.addr)
             self._client.publish(f"PC/i2c/{pos}/send_vals", json.dumps(value.sending_vals))
             self._client.publish(f"PC/i2c/{pos}/read_regs", json.dumps(value.reading_registers))
             self._client.publish(f"PC/i2c/{pos}/poll_vals", json.dumps(value.poll_val))
 
+        self._dirty_i2cs.clear()
 
     def publish_pins(self, pins: dict[str, Pin]) -> None:
         """Send a series of packets from the Raspberry Pi with the specified thruster PWM values. To improve
-        performance, only put the PWM values that have changed into the dictionary.
+        performance, only the pins that have changed since the last call are sent. In "frame" mode all of the changed
+        pins are sent together in one message, see io_systems.pin_frame for the layout.
 
         Args:
             pins (dict[str, Pin]):
                 List of pin values to be sent to the ROV.
         """
+        self._track_changes(pins, self._tracked_pins, self._dirty_pins)
 
-        # Build a dictionary of the PWM values that have changed.
-        changed_pin_configs = {}
-
-        # print(self._last_pin_configs)
-        for pin, config in pins.items():
-            if pin in self._last_pin_configs.keys():
-                if config != self._last_pin_configs.get(pin, None):
-                    changed_pin_configs[pin] = copy.deepcopy(config)
-                    self._last_pin_configs[pin] = copy.deepcopy(config)
-            else:
-                changed_pin_configs[pin] = copy.deepcopy(config)
-                self._last_pin_configs[pin] = copy.deepcopy(config)
-
+        if self._dirty_pins:
+            names = self._dirty_pins
         # If no values have changed for too long, send the last values every 0.5 seconds.
-        if not changed_pin_configs:
-            if time.time() - self._last_pin_update > self._idle_ping_frequency:
-                changed_pin_configs = copy.deepcopy(self._last_pin_configs)
-                self._last_pin_update = time.time()
-        # else:
-        #     # Update the last PWM update time
-        #     self._last_pin_update = time.time()
-
+        elif time.time() - self._last_pin_update > self._idle_ping_frequency:
+            names = self._tracked_pins.keys()
+            self._last_pin_update = time.time()
+        else:
+            return
 
+        if not names:
+            return
 
         # Publish the PWM values to the MQTT broker.
-        for pos, value in changed_pin_configs.items():
+        if self._pin_publish_mode == "frame":
+            self._publish_pin_frame(names)
+        else:
+            self._publish_pin_topics(names)
+
+        self._dirty_pins.clear()
+
+    @staticmethod
+    def _track_changes(objects: dict[str, Pin | I2C], tracked: dict[str, Pin | I2C], dirty: set[str]) -> None:
+        """Start tracking any pins or I2C devices that have not been seen before. Newly tracked objects mark
+        themselves dirty so that they are sent at least once.
+
+        Args:
+            objects (dict[str, Pin | I2C]):
+                The objects that should be sent to the ROV.
+            tracked (dict[str, Pin | I2C]):
+                The objects that are already being tracked.
+            dirty (set[str]):
+                The dirty set the objects should report changes to.
+        """
+        for name, obj in objects.items():
+            if tracked.get(name) is not obj:
+                tracked[name] = obj
+                obj.track(name, dirty)
+
+    def _publish_pin_topics(self, names: Iterable[str]) -> None:
+        """Publish each pin's id, mode, val, and freq on its own topic.
+
+        Args:
+            names (Iterable[str]):
+                The names of the pins to publish.
+        """
+        for pos in names:
+            value = self._tracked_pins[pos]
             # print("Pin:", value.id, "Value:", value.val)
             self._client.publish(f"PC/pins/{pos}/id", value.id)
             self._client.publish(f"PC/pins/{pos}/mode", value.mode)
             self._client.publish(f"PC/pins/{pos}/val", value.val)
             self._client.publish(f"PC/pins/{pos}/freq", value.freq)
 
+    def _publish_pin_frame(self, names: Iterable[str]) -> None:
+        """Publish every pin in a single binary pin frame with a sequence number and a timestamp.
+
+        Args:
+            names (Iterable[str]):
+                The names of the pins to publish.
+        """
+        payload = encode_pin_frame(
+            ((pos, self._tracked_pins[pos]) for pos in names), self._pin_frame_sequence, time.time_ns()
+        )
+        self._pin_frame_sequence = (self._pin_frame_sequence + 1) % SEQUENCE_MODULUS
+
+        self._client.publish(PIN_FRAME_TOPIC, payload)
+
     def publish_mavlink_commands(self, commands: dict[int, tuple[int, int, int, int, int, int, int]]) -> None:
         """Send a series of packets from the Raspberry Pi with the specified mavlink commands.
 
@@ -210,21 +264,7 @@ class ROVConnection:
                 List of mavlink commands to be sent to the ROV.
                 dict[message_type, tuple[param1, param2, param3, param4, param5, param6, param7]]
         """
-
-        # changed_mavlink_requests = {}
-
-        # for key, interval in commands.items():
-        #     if key not in self._last_mavlink_requests:
-        #         self._last_mavlink_requests[key] = interval
-        #         changed_mavlink_requests[key] = interval
-        #     elif self._last_mavlink_requests[
-        #         key] != interval or time.time() - self._last_mavlink_update > self._idle_ping_frequency:
-        #         self._last_mavlink_requests[key] = interval
-        #         changed_mavlink_requests[key] = interval
-
         for key, payload in commands.items():
-            # self._last_mavlink_update = time.time()
-            print(f"Publishing {payload} to {key}")
             self._client.publish(f"PC/mavlink/send_msg/{key}", str(payload)[1:-1])
 
         commands.clear()
@@ -232,82 +272,117 @@ class ROVConnection:
     def publish_mavlink_params(self, params: dict[int, tuple[int, int, int, int, int, int, int]]) -> None:
         """Send a series of packets from the Raspberry Pi with the specified mavlink parameters."""
         for key, payload in params.items():
-            # self._last_mavlink_update = time.time()
-            print(f"Publishing {payload} to {key}")
             self._client.publish(f"PC/mavlink/send_msg/{key}", str(payload)[1:-1])
 
         params.clear()
 
     def publish_mavlink_data_request(self, mavlink: dict[int, int]) -> None:
-        """Send a series of packets from the Raspberry Pi with the specified mavlink data id and interval values.
+        """Ask the flight controller to send message types at the specified intervals. Every request is sent, as the
+        StreamRateManager decides which ones are due.
 
         Args:
             mavlink (dict[int, int]):
-                List of mavlink values to be sent to the ROV.
+                The interval to send each message type at, in microseconds, by message id.
         """
-        # changed_mavlink_requests = {}
+        for key, interval in mavlink.items():
+            self._client.publish(f"PC/mavlink/req_id/{key}", interval)
+
+    @property
+    def generation(self) -> int:
+        """The number of messages that have been received so far. Used with get_subscription_changes."""
+        return self._generation
 
-        # for key, interval in mavlink.items():
-        #     if key not in self._last_mavlink_requests:
-        #         self._last_mavlink_requests[key] = interval
-        #         changed_mavlink_requests[key] = interval
-        #     elif self._last_mavlink_requests[key] != interval or time.time() - self._last_mavlink_update > self._idle_ping_frequency:
-        #         self._last_mavlink_requests[key] = interval
-        #         changed_mavlink_requests[key] = interval
+    def get_subscriptions(self) -> Mapping[str, Any]:
+        """Get the sensor data from the Raspberry Pi. The snapshot is only rebuilt when new messages have arrived, and
+        the values are shared with the connection, so do not modify them.
 
-        
+        Returns:
+            Mapping[str, Any]: A read-only dictionary of the decoded sensor data with the key as the topic, the status
+                of the ROV, and other misc. data.
+        """
+        if self._snapshot_generation != self._generation:
+            with self._subscription_lock:
+                self._snapshot = MappingProxyType(dict(self._subscriptions))
+                self._snapshot_generation = self._generation
 
-        changed_mavlink_requests = {}
+        return self._snapshot
 
-        for key, interval in mavlink.items():
-            if key not in self._last_mavlink_requests:
-                self._last_mavlink_requests[key] = interval
-                changed_mavlink_requests[key] = interval
-            elif self._last_mavlink_requests[
-                key] != interval or time.time() - self._last_mavlink_update > self._idle_ping_frequency:
-                self._last_mavlink_requests[key] = interval
-                changed_mavlink_requests[key] = interval
-
-        for key, interval in changed_mavlink_requests.items():
-            self._last_mavlink_update = time.time()
-            self._client.publish(f"PC/mavlink/req_id/{key}", interval)
+    def get_subscription_changes(self, since_generation: int) -> tuple[int, dict[str, Any]]:
+        """Get the sensor data that has arrived since a previous generation. Only the latest value of each topic is
+        returned, and the cost depends on the number of changed topics rather than the number of known topics.
 
-    def get_subscriptions(self) -> dict[str, float | str | dict[str, float | str]]:
-        """Get the sensor data from the Raspberry Pi.
+        Args:
+            since_generation (int):
+                The generation returned by the previous call, or 0 to get every topic.
 
         Returns:
-            dict[str, float | str | dict[str, float | str]]: A dictionary of the sensor data with the key as the sensor
-                name, the status of the ROV, and other misc. data.
+            tuple[int, dict[str, Any]]: The current generation, to pass to the next call, and the decoded values of
+                the topics that have changed.
         """
-        # Make a copy of the subscriptions to get the values out as fast as possible.
-        original_vals = {}
+        changes = {}
         with self._subscription_lock:
-            original_vals |= copy.deepcopy(self._subscriptions)
+            for topic in reversed(self._topic_generations):
+                if self._topic_generations[topic] <= since_generation:
+                    break
+                changes[topic] = self._subscriptions[topic]
+
+            return self._generation, changes
 
-        # Decode the JSON strings and return the dictionary.
-        decoded_vals = {}
-        for key, val in original_vals.items():
-            try:
-                decoded_vals[key] = json.loads(val)
-            except json.JSONDecodeError:
-                decoded_vals[key] = val
+    def add_listener(self, topic: str, callback: Callable[[Any], None], raw: bool = False) -> None:
+        """Call a function with each message on a topic as soon as it arrives, for messages that can't wait for the
+        main loop, such as replies that are being timed. The function is called on the network thread, so it must be
+        quick and thread safe. The messages still show up in the subscriptions as well, unless they're raw.
 
-        return decoded_vals
+        Args:
+            topic (str):
+                The topic to listen to, such as "ROV/pong".
+            callback (Callable[[Any], None]):
+                The function to call with each message's decoded payload, or its bytes if it's raw.
+            raw (bool, optional):
+                Whether the topic carries binary data, such as raw MAVLink frames. Its messages are handed over as they
+                are, without being decoded or kept in the subscriptions.
+                Defaults to False.
+        """
+        listeners = self._raw_listeners if raw else self._listeners
+        listeners.setdefault(topic, []).append(callback)
+
+    @staticmethod
+    def _decode_payload(payload: bytes) -> Any:
+        """Decode a message payload. JSON payloads are parsed, anything else is returned as a string.
+
+        Args:
+            payload (bytes):
+                The raw message payload.
 
-    def _set_subscription_value(self, sub: str, value: str | float) -> None:
+        Returns:
+            Any: The decoded value.
+        """
+        value = payload.decode()
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+
+    def _set_subscription_value(self, sub: str, value: Any) -> None:
         """Set the subscription dictionary values.
 
         Args:
             sub (str):
                 The subscription to set the value for.
-            value (str | float):
-                The value to set the subscription to.
+            value (Any):
+                The decoded value to set the subscription to.
         """
         with self._subscription_lock:
+            self._generation += 1
             self._subscriptions[sub] = value
 
+            # Move the topic to the end so that the generations stay in order.
+            self._topic_generations.pop(sub, None)
+            self._topic_generations[sub] = self._generation
+
     def _on_message(self, client, userdata, message) -> None:
-        """Handle incoming messages from the MQTT broker.
+        """Handle incoming messages from the MQTT broker. The payload is decoded here, on the network thread, so that
+        it only has to be decoded once.
 
         Args:
             client (mqtt.Client):
@@ -319,7 +394,16 @@ class ROVConnection:
         """
         # print(f"Received message '{message.payload.decode()}' on topic '{message.topic}'")
 
-        self._set_subscription_value(message.topic, message.payload.decode())
+        raw_listeners = self._raw_listeners.get(message.topic)
+        if raw_listeners is not None:
+            for callback in raw_listeners:
+                callback(message.payload)
+            return
+
+        value = self._decode_payload(message.payload)
+        for callback in self._listeners.get(message.topic, ()):
+            callback(value)
+        self._set_subscription_value(message.topic, value)
 
     def _on_connect(self, client, userdata, flags, rc) -> None:
         """Handle connection to the MQTT broker.
@@ -0,0 +1,111 @@
+"""Binary "pin frame" encoding used to send every changed pin to the ROV in a single MQTT message.
+
+A pin frame is a small header followed by one entry per pin. All values are little-endian.
+
+Header:
+    version (uint8), sequence (uint32), timestamp in nanoseconds (int64), entry count (uint16)
+
+Entry:
+    name length (uint8), name (utf-8), mode length (uint8), mode (utf-8), pin id (uint16), value (int32),
+    frequency (int32, -1 if the pin has no frequency)
+
+Functions:
+    encode_pin_frame(pins: Iterable[tuple[str, Pin]], sequence: int, timestamp_ns: int) -> bytes:
+        Pack a set of pins into a pin frame payload.
+    decode_pin_frame(payload: bytes) -> tuple[int, int, dict[str, PinConfig]]:
+        Unpack a pin frame payload into its sequence, timestamp, and pin configs.
+"""
+import struct
+from typing import Iterable
+
+from config.pin import PinConfig
+from hardware.pin import Pin
+
+PIN_FRAME_TOPIC = "PC/pin_frame"
+PIN_FRAME_VERSION = 1
+
+_HEADER = struct.Struct("<BIqH")
+_STRING_LENGTH = struct.Struct("<B")
+_ENTRY = struct.Struct("<Hii")
+
+# The sequence number is a uint32 on the wire, so it wraps around instead of overflowing.
+SEQUENCE_MODULUS = 2 ** 32
+
+
+def _encode_string(value: str) -> bytes:
+    """Encode a string with a one byte length prefix.
+
+    Args:
+        value (str):
+            The string to encode.
+
+    Returns:
+        bytes: The length prefixed string.
+    """
+    encoded = str(value).encode("utf-8")
+    if len(encoded) > 255:
+        raise ValueError(f"Pin frame strings must be at most 255 bytes long, got {len(encoded)}: {value!r}")
+
+    return _STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+def encode_pin_frame(pins: Iterable[tuple[str, Pin]], sequence: int, timestamp_ns: int) -> bytes:
+    """Pack a set of pins into a pin frame payload.
+
+    Args:
+        pins (Iterable[tuple[str, Pin]]):
+            The name and pin object of every pin to put in the frame.
+        sequence (int):
+            The sequence number of the frame. Wrapped to fit in a uint32.
+        timestamp_ns (int):
+            The time the frame was built at, in nanoseconds.
+
+    Returns:
+        bytes: The encoded pin frame.
+    """
+    entries = []
+    for name, pin in pins:
+        freq = -1 if pin.freq is None else pin.freq
+        entries.append(_encode_string(name) + _encode_string(pin.mode) + _ENTRY.pack(pin.id, int(pin.val), freq))
+
+    if len(entries) > 0xFFFF:
+        raise ValueError(f"A pin frame can hold at most {0xFFFF} pins, got {len(entries)}.")
+
+    header = _HEADER.pack(PIN_FRAME_VERSION, sequence % SEQUENCE_MODULUS, timestamp_ns, len(entries))
+
+    return header + b"".join(entries)
+
+
+def decode_pin_frame(payload: bytes) -> tuple[int, int, dict[str, PinConfig]]:
+    """Unpack a pin frame payload. This is the inverse of encode_pin_frame and is mostly useful for the ROV side and
+    for testing.
+
+    Args:
+        payload (bytes):
+            The encoded pin frame.
+
+    Returns:
+        tuple[int, int, dict[str, PinConfig]]: The sequence number, the timestamp in nanoseconds, and the pin configs
+            keyed by pin name.
+    """
+    version, sequence, timestamp_ns, count = _HEADER.unpack_from(payload, 0)
+    if version != PIN_FRAME_VERSION:
+        raise ValueError(f"Unsupported pin frame version {version}.")
+
+    offset = _HEADER.size
+    pins = {}
+    for _ in range(count):
+        strings = []
+        for _ in range(2):
+            (length,) = _STRING_LENGTH.unpack_from(payload, offset)
+            offset += _STRING_LENGTH.size
+            strings.append(bytes(payload[offset:offset + length]).decode("utf-8"))
+            offset += length
+
+        pin_id, val, freq = _ENTRY.unpack_from(payload, offset)
+        offset += _ENTRY.size
+
+        name, mode = strings
+        pins[name] = PinConfig(id=pin_id, mode=mode, val=val, freq=None if freq == -1 else freq)
+
+    return sequence, timestamp_ns, pins
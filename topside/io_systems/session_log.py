@@ -0,0 +1,500 @@
+"""Records the controller inputs and sensor data of each frame so that a piloting session can be played back later.
+
+A session log is a directory of files:
+    meta.json:
+        The layout of each controller and the names of the topics.
+    controllers.npy:
+        One row per frame with the time and the raw readings of every controller.
+    subscriptions.npy:
+        One row per topic that changed in a frame, pointing at its value in values.bin.
+    values.bin:
+        The JSON encoded values of the changed topics, back to back.
+
+The .npy files are ordinary numpy arrays that can be opened with np.load(..., mmap_mode="r") to look through a long
+session without reading all of it. The recorder writes them as it goes, a batch of frames at a time, and rewrites their
+headers after each batch, so a session that ends without close() only loses the frames since the last batch.
+
+A SessionReplay feeds a log back through a ReplayInputHandler and a ReplayConnection, which stand in for the
+InputHandler and ROVConnection, so a control mode can be run without controllers, pygame's event loop, or an MQTT
+broker. The controllers are replayed by polling the recorded readings, so taps that started and ended within a frame
+are only replayed as far as they showed in that frame's readings.
+"""
+import json
+import os
+import struct
+import time
+from typing import Any, Callable, Mapping
+
+import numpy as np
+
+import controller as ctrl
+from io_systems.mqtt_handler import ROVConnection
+
+# Bump whenever the layout of the files changes.
+LOG_VERSION = 1
+
+# Each topic change is stored as the frame it happened in, the topic's number in meta.json, and where its JSON encoded
+# value is in values.bin.
+CHANGE_DTYPE = np.dtype([("frame", np.uint32), ("topic", np.uint32), ("offset", np.uint64), ("length", np.uint32)])
+
+
+def _controller_name(name) -> str:
+    """Get the name a controller is stored under in the log.
+
+    Args:
+        name (enums.ControllerNames | str):
+            The key of the controller.
+
+    Returns:
+        str: The name of the controller.
+    """
+    return getattr(name, "name", str(name))
+
+
+def frame_dtype(layouts: list[dict[str, Any]]) -> np.dtype:
+    """Get the type of a row of controllers.npy for a set of controller layouts.
+
+    Args:
+        layouts (list[dict[str, Any]]):
+            The layout of each controller, as stored in meta.json.
+
+    Returns:
+        np.dtype: A structured type with the time of the frame and the axes, buttons, and hats of each controller.
+    """
+    fields = [("time_ns", np.int64)]
+    for i, layout in enumerate(layouts):
+        fields += [
+            (f"axes{i}", np.float64, (len(layout["axis_indices"]),)),
+            (f"buttons{i}", np.bool_, (len(layout["button_indices"]),)),
+            (f"hats{i}", np.int8, (len(layout["hat_indices"]), 2)),
+        ]
+    return np.dtype(fields)
+
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    """Make the header of a one dimensional .npy file. The header is the same size whatever the number of rows, so it
+    can be rewritten in place as the file grows.
+
+    Args:
+        dtype (np.dtype):
+            The type of the rows.
+        rows (int):
+            The number of rows in the file.
+
+    Returns:
+        bytes: The header, padded so that the rows start on a 64 byte boundary.
+    """
+    descr = np.lib.format.dtype_to_descr(dtype)
+
+    # The magic string, version, and header length take 10 bytes and the header ends in a newline. Leave room for a
+    # row count of up to 20 digits.
+    empty = repr({"descr": descr, "fortran_order": False, "shape": (0,)})
+    size = (11 + len(empty) + 20 + 63) // 64 * 64
+
+    header = repr({"descr": descr, "fortran_order": False, "shape": (rows,)}).ljust(size - 11) + "\n"
+    return np.lib.format.MAGIC_PREFIX + bytes((1, 0)) + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class SessionRecorder:
+    """Records the raw controller readings and the changed sensor data of each frame to a session log.
+
+    Methods:
+        record(changes: Mapping[str, Any]) -> None:
+            Record a frame.
+        flush() -> None:
+            Write the recorded frames to the log.
+        close() -> None:
+            Write the remaining frames and close the log.
+    """
+
+    def __init__(self, directory: str, controllers: Mapping[Any, ctrl.Controller], batch_size: int = 256,
+                 clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the SessionRecorder object. The directory is created if needed, and any log in it is replaced.
+
+        Args:
+            directory (str):
+                The directory to write the log to.
+            controllers (Mapping[Any, ctrl.Controller]):
+                The controllers to record.
+            batch_size (int, optional):
+                How many frames to keep in memory before writing them to the log.
+                Defaults to 256.
+            clock (Callable[[], int], optional):
+                The clock each frame is timed with, in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._clock = clock
+
+        self._controllers = list(controllers.values())
+        self._layouts = [
+            {
+                "name": _controller_name(name),
+                "axis_indices": list(controller.axis_indices),
+                "button_indices": list(controller.button_indices),
+                "hat_indices": list(controller.hat_indices),
+            }
+            for name, controller in controllers.items()
+        ]
+        self._dtype = frame_dtype(self._layouts)
+
+        # Frames and topic changes waiting to be written.
+        self._frames = np.zeros(batch_size, dtype=self._dtype)
+        self._pending_frames = 0
+        self._changes: list[tuple[int, int, int, int]] = []
+
+        self._frame_count = 0
+        self._change_count = 0
+        self._values_size = 0
+        self._topics: dict[str, int] = {}
+
+        self._frames_file = open(os.path.join(directory, "controllers.npy"), "wb")
+        self._changes_file = open(os.path.join(directory, "subscriptions.npy"), "wb")
+        self._values_file = open(os.path.join(directory, "values.bin"), "wb")
+        self._frames_file.write(_npy_header(self._dtype, 0))
+        self._changes_file.write(_npy_header(CHANGE_DTYPE, 0))
+        self._write_meta()
+
+    @property
+    def frame_count(self) -> int:
+        """How many frames have been recorded."""
+        return self._frame_count + self._pending_frames
+
+    def record(self, changes: Mapping[str, Any]) -> None:
+        """Record the controllers' latest readings and the sensor data that changed as a new frame.
+
+        Args:
+            changes (Mapping[str, Any]):
+                The decoded values of the topics that changed since the previous frame.
+        """
+        frame = self._frame_count + self._pending_frames
+        row = self._frames[self._pending_frames]
+        row["time_ns"] = self._clock()
+        for i, controller in enumerate(self._controllers):
+            axes, buttons, hats = controller.read_raw()
+            row[f"axes{i}"] = axes
+            row[f"buttons{i}"] = buttons
+            if hats:
+                row[f"hats{i}"] = hats
+
+        for topic, value in changes.items():
+            topic_number = self._topics.setdefault(topic, len(self._topics))
+            data = json.dumps(value).encode()
+            self._values_file.write(data)
+            self._changes.append((frame, topic_number, self._values_size, len(data)))
+            self._values_size += len(data)
+
+        self._pending_frames += 1
+        if self._pending_frames == len(self._frames):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the recorded frames to the log, leaving it readable as it stands."""
+        # Values first, then the changes that point at them, then the frames, so that everything a frame refers to is
+        # written by the time the frame is.
+        self._values_file.flush()
+
+        if self._changes:
+            self._changes_file.write(np.array(self._changes, dtype=CHANGE_DTYPE).tobytes())
+            self._change_count += len(self._changes)
+            self._changes.clear()
+        self._rewrite_header(self._changes_file, CHANGE_DTYPE, self._change_count)
+
+        self._frames_file.write(self._frames[:self._pending_frames].tobytes())
+        self._frame_count += self._pending_frames
+        self._pending_frames = 0
+        self._rewrite_header(self._frames_file, self._dtype, self._frame_count)
+
+        self._write_meta()
+
+    def close(self) -> None:
+        """Write the remaining frames and close the log."""
+        if self._frames_file.closed:
+            return
+
+        self.flush()
+        self._frames_file.close()
+        self._changes_file.close()
+        self._values_file.close()
+
+    @staticmethod
+    def _rewrite_header(file, dtype: np.dtype, rows: int) -> None:
+        """Update the row count in the header of a .npy file that is being written.
+
+        Args:
+            file:
+                The open .npy file.
+            dtype (np.dtype):
+                The type of the rows.
+            rows (int):
+                The number of rows written so far.
+        """
+        file.seek(0)
+        file.write(_npy_header(dtype, rows))
+        file.seek(0, os.SEEK_END)
+        file.flush()
+
+    def _write_meta(self) -> None:
+        """Write meta.json, replacing the old one in a single step so that it is never left half written."""
+        meta = {
+            "version": LOG_VERSION,
+            "controllers": self._layouts,
+            "topics": list(self._topics),
+        }
+        path = os.path.join(self._directory, "meta.json")
+        with open(path + ".tmp", "w") as file:
+            json.dump(meta, file, indent=4)
+        os.replace(path + ".tmp", path)
+
+
+class ReplayJoystick:
+    """Stands in for a pygame joystick, reading from the current frame of a session log."""
+
+    def __init__(self, instance_id: int, layout: dict[str, Any]) -> None:
+        """Initialize the ReplayJoystick object.
+
+        Args:
+            instance_id (int):
+                The number of the controller in the log.
+            layout (dict[str, Any]):
+                The layout of the controller, as stored in meta.json.
+        """
+        self._instance_id = instance_id
+        self._axis_columns = {index: i for i, index in enumerate(layout["axis_indices"])}
+        self._button_columns = {index: i for i, index in enumerate(layout["button_indices"])}
+        self._hat_columns = {index: i for i, index in enumerate(layout["hat_indices"])}
+
+        self._axes = np.zeros(len(self._axis_columns))
+        self._buttons = np.zeros(len(self._button_columns), dtype=np.bool_)
+        self._hats = np.zeros((len(self._hat_columns), 2), dtype=np.int8)
+
+    def set_frame(self, axes: np.ndarray, buttons: np.ndarray, hats: np.ndarray) -> None:
+        """Set the readings the joystick returns.
+
+        Args:
+            axes (np.ndarray):
+                The readings of the axes.
+            buttons (np.ndarray):
+                The readings of the buttons.
+            hats (np.ndarray):
+                The readings of the hats.
+        """
+        self._axes = axes
+        self._buttons = buttons
+        self._hats = hats
+
+    def get_instance_id(self) -> int:
+        return self._instance_id
+
+    def get_axis(self, index: int) -> float:
+        column = self._axis_columns.get(index)
+        return 0.0 if column is None else float(self._axes[column])
+
+    def get_button(self, index: int) -> bool:
+        column = self._button_columns.get(index)
+        return False if column is None else bool(self._buttons[column])
+
+    def get_hat(self, index: int) -> tuple[int, int]:
+        column = self._hat_columns.get(index)
+        return (0, 0) if column is None else (int(self._hats[column][0]), int(self._hats[column][1]))
+
+    def quit(self) -> None:
+        pass
+
+
+class ReplayConnection(ROVConnection):
+    """Stands in for the ROVConnection during a replay. It serves the recorded sensor data and never connects, so
+    everything published goes nowhere, but it is still worked out and encoded the same as it would be live."""
+
+    def connect(self) -> None:
+        """Do nothing, there is no broker to connect to."""
+
+    def apply_changes(self, changes: Mapping[str, Any]) -> None:
+        """Apply a frame of recorded sensor data as if it had just arrived.
+
+        Args:
+            changes (Mapping[str, Any]):
+                The changed topics, newest first as get_subscription_changes returns them.
+        """
+        for topic, value in reversed(changes.items()):
+            self._set_subscription_value(topic, value)
+
+    def shutdown(self) -> None:
+        """Do nothing, there is no broker to disconnect from."""
+
+
+class ReplayInputHandler:
+    """Stands in for the InputHandler during a replay. Each update moves the replay on a frame and reads the recorded
+    readings into the controllers.
+
+    Properties:
+        controllers (dict[enums.ControllerNames, ctrl.Controller]):
+            The controllers being replayed into.
+        backend (str):
+            Always "replay".
+
+    Methods:
+        update() -> None:
+            Move the replay on a frame and update the controllers.
+        shutdown() -> None:
+            Does nothing.
+    """
+
+    def __init__(self, replay: "SessionReplay", controllers: dict[Any, ctrl.Controller]) -> None:
+        """Initialize the ReplayInputHandler object.
+
+        Args:
+            replay (SessionReplay):
+                The replay to read from.
+            controllers (dict[enums.ControllerNames, ctrl.Controller]):
+                The controllers to replay into. They are matched to the controllers in the log by name, and any without
+                a match read as if nothing was touched.
+        """
+        self.controllers = controllers
+        self._replay = replay
+
+        for name, controller in controllers.items():
+            controller.initialize(replay.joystick(_controller_name(name)))
+
+    @property
+    def backend(self) -> str:
+        """How the controllers are read, always "replay"."""
+        return "replay"
+
+    def update(self) -> None:
+        """Move the replay on a frame and update the controllers from its readings."""
+        self._replay.advance()
+
+        for controller in self.controllers.values():
+            controller.update()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class SessionReplay:
+    """Plays a session log back a frame at a time.
+
+    Properties:
+        frame_count (int):
+            How many frames the log holds.
+        frame (int):
+            The frame being played, or -1 before the first.
+        finished (bool):
+            Whether the last frame has been played.
+        connection (ReplayConnection):
+            The connection that serves the recorded sensor data.
+
+    Methods:
+        input_handler(controllers: dict[enums.ControllerNames, ctrl.Controller]) -> ReplayInputHandler:
+            Make an input handler that replays the log into controllers.
+        joystick(name: str) -> ReplayJoystick:
+            Get a joystick that reads a controller's recorded readings.
+        advance() -> bool:
+            Move on to the next frame.
+        rewind() -> None:
+            Go back to before the first frame.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the SessionReplay object.
+
+        Args:
+            directory (str):
+                The directory of the log.
+        """
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+        if meta["version"] != LOG_VERSION:
+            raise ValueError(f"Unsupported session log version {meta['version']}, expected {LOG_VERSION}")
+
+        self._layouts: list[dict[str, Any]] = meta["controllers"]
+        self._frames = np.load(os.path.join(directory, "controllers.npy"), mmap_mode="r")
+        if self._frames.dtype != frame_dtype(self._layouts):
+            raise ValueError("The controller readings don't match the layout in meta.json")
+
+        # The sensor data is decoded up front, since the live system decodes it on the network thread rather than in
+        # the main loop.
+        topics: list[str] = meta["topics"]
+        changes = np.load(os.path.join(directory, "subscriptions.npy"))
+        with open(os.path.join(directory, "values.bin"), "rb") as file:
+            values = file.read()
+        self._changes: dict[int, dict[str, Any]] = {}
+        for frame, topic, offset, length in changes.tolist():
+            self._changes.setdefault(frame, {})[topics[topic]] = json.loads(values[offset:offset + length])
+
+        self._joysticks: dict[int, ReplayJoystick] = {}
+        self._connection = ReplayConnection()
+        self._frame = -1
+
+    @property
+    def frame_count(self) -> int:
+        """How many frames the log holds."""
+        return len(self._frames)
+
+    @property
+    def frame(self) -> int:
+        """The frame being played, or -1 before the first."""
+        return self._frame
+
+    @property
+    def finished(self) -> bool:
+        """Whether the last frame has been played."""
+        return self._frame >= len(self._frames) - 1
+
+    @property
+    def connection(self) -> ReplayConnection:
+        """The connection that serves the recorded sensor data."""
+        return self._connection
+
+    def input_handler(self, controllers: dict[Any, ctrl.Controller]) -> ReplayInputHandler:
+        """Make an input handler that replays the log into controllers.
+
+        Args:
+            controllers (dict[enums.ControllerNames, ctrl.Controller]):
+                The controllers to replay into.
+
+        Returns:
+            ReplayInputHandler: The input handler to give to the IO in place of an InputHandler.
+        """
+        return ReplayInputHandler(self, controllers)
+
+    def joystick(self, name: str) -> ReplayJoystick:
+        """Get a joystick that reads a controller's recorded readings.
+
+        Args:
+            name (str):
+                The name of the controller in the log.
+
+        Returns:
+            ReplayJoystick: The joystick. A controller that isn't in the log gets one with no inputs.
+        """
+        for i, layout in enumerate(self._layouts):
+            if layout["name"] == name:
+                return self._joysticks.setdefault(i, ReplayJoystick(i, layout))
+        return ReplayJoystick(-1, {"axis_indices": [], "button_indices": [], "hat_indices": []})
+
+    def advance(self) -> bool:
+        """Move on to the next frame, updating the joysticks and applying the frame's sensor data to the connection.
+
+        Returns:
+            bool: False if the last frame had already been played, in which case nothing changes.
+        """
+        if self.finished:
+            return False
+
+        self._frame += 1
+        row = self._frames[self._frame]
+        for i, joystick in self._joysticks.items():
+            joystick.set_frame(row[f"axes{i}"], row[f"buttons{i}"], row[f"hats{i}"])
+
+        changes = self._changes.get(self._frame)
+        if changes:
+            self._connection.apply_changes(changes)
+        return True
+
+    def rewind(self) -> None:
+        """Go back to before the first frame so the log can be played again. The connection keeps its sensor data,
+        which is overwritten as the log plays."""
+        self._frame = -1
@@ -0,0 +1,182 @@
+"""Works out how often the flight controller should send each subscribed MAVLink message type, and asks again for the
+ones that don't arrive that often.
+
+Each consumer, such as a control mode, declares the message types it reads and how many times a second it needs each.
+A type is asked for at the highest rate any active consumer needs, and the types no active consumer reads are asked for
+at the idle rate, which leaves room on the tether. Each type's arrivals are counted from its history, which the
+MavlinkHandler fills as the messages arrive rather than once a frame (see MavlinkHandler.listen), so rates above the
+control rate are counted in full. A type that arrives well under its rate, such as because the request was lost or the
+flight controller restarted, is asked for again, while the ones that arrive as often as they should are left alone.
+"""
+import time
+from typing import Callable, Mapping
+
+from config.mavlink import StreamRateConfig
+from io_systems.mavlink_history import MessageHistory
+
+# The interval that asks the flight controller to stop sending a message type.
+DISABLED_INTERVAL = -1
+
+
+class _Stream:
+    """The rate a message type was asked for, and its arrivals since the rate was last checked."""
+
+    __slots__ = ("rate", "since_ns", "since_count", "measured")
+
+    def __init__(self) -> None:
+        self.rate: float | None = None
+        self.since_ns = 0
+        self.since_count = 0
+        self.measured = 0.0
+
+
+class StreamRateManager:
+    """Asks the flight controller for each subscribed message type at the rate the active consumers need, and again
+    whenever one arrives too slowly. Used from the main loop only.
+
+    Properties:
+        requested (dict[str, float]):
+            The rate each message type was last asked for, in Hz, by type name.
+        measured (dict[str, float]):
+            The rate each message type arrived at over its last check, in Hz, by type name.
+
+    Methods:
+        declare(consumer: str, rates: Mapping[str, float]) -> None:
+            Set the message types a consumer reads and the rates it needs them at.
+        activate(consumer: str, active: bool = True) -> None:
+            Start or stop counting a consumer's needs.
+        interval(rate: float) -> int:
+            Get the interval to ask for a rate with.
+        update() -> None:
+            Ask for the message types whose rate changed or that are arriving too slowly.
+    """
+
+    def __init__(self, message_ids: Mapping[str, int], request: Callable[[dict[int, int]], None],
+                 histories: Mapping[str, MessageHistory], config: StreamRateConfig = StreamRateConfig(),
+                 clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the StreamRateManager object.
+
+        Args:
+            message_ids (Mapping[str, int]):
+                The subscribed message types, by name in any case, with their ids.
+            request (Callable[[dict[int, int]], None]):
+                Asks the flight controller for message types, by id, at intervals in microseconds, such as
+                ROVConnection.publish_mavlink_data_request.
+            histories (Mapping[str, MessageHistory]):
+                The history of each message type, by type name, such as MavlinkHandler.histories. The types without
+                one are asked for, but never checked.
+            config (StreamRateConfig, optional):
+                The idle rate and how closely the rates are checked.
+                Defaults to StreamRateConfig().
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        self._message_ids = {name.upper(): message_id for name, message_id in message_ids.items()}
+        self._request = request
+        self._histories = histories
+        self._config = config
+        self._clock = clock
+
+        self._check_ns = int(config.check_interval * 1_000_000_000)
+        self._consumers: dict[str, dict[str, float]] = {}
+        self._active: set[str] = set()
+        self._streams = {name: _Stream() for name in self._message_ids}
+        self._changed = True
+
+    @property
+    def requested(self) -> dict[str, float]:
+        """The rate each message type was last asked for, in Hz, by type name. 0 until the first update."""
+        return {name: stream.rate or 0.0 for name, stream in self._streams.items()}
+
+    @property
+    def measured(self) -> dict[str, float]:
+        """The rate each message type arrived at over its last check, in Hz, by type name."""
+        return {name: stream.measured for name, stream in self._streams.items()}
+
+    def declare(self, consumer: str, rates: Mapping[str, float]) -> None:
+        """Set the message types a consumer reads and the rates it needs them at. The consumer's needs only count once
+        it's active.
+
+        Args:
+            consumer (str):
+                The name of the consumer, such as the control mode's.
+            rates (Mapping[str, float]):
+                How many times a second the consumer needs each message type, in Hz, by type name.
+        """
+        unknown = set(rates) - set(self._message_ids)
+        if unknown:
+            raise ValueError(f"{consumer} reads message types that aren't subscribed to: {sorted(unknown)}")
+
+        self._consumers[consumer] = dict(rates)
+        self._changed = True
+
+    def activate(self, consumer: str, active: bool = True) -> None:
+        """Start or stop counting a consumer's needs. The rates change on the next update.
+
+        Args:
+            consumer (str):
+                The name the consumer was declared with.
+            active (bool, optional):
+                Whether the consumer is reading its message types.
+                Defaults to True.
+        """
+        if consumer not in self._consumers:
+            raise KeyError(f"Unknown consumer: {consumer}")
+
+        if active:
+            self._active.add(consumer)
+        else:
+            self._active.discard(consumer)
+        self._changed = True
+
+    @staticmethod
+    def interval(rate: float) -> int:
+        """Get the interval to ask for a rate with.
+
+        Args:
+            rate (float):
+                The rate, in Hz.
+
+        Returns:
+            int: The interval between messages, in microseconds, or DISABLED_INTERVAL for a rate of 0.
+        """
+        return round(1_000_000 / rate) if rate > 0 else DISABLED_INTERVAL
+
+    def update(self) -> None:
+        """Ask for the message types whose rate changed since the last update, and the ones that arrived at under the
+        configured fraction of their rate over their last check. Called at the telemetry rate."""
+        now = self._clock()
+        due: set[str] = set()
+
+        if self._changed:
+            self._changed = False
+            for name, stream in self._streams.items():
+                rate = max(
+                    (self._consumers[consumer].get(name, 0.0) for consumer in self._active), default=0.0
+                ) or self._config.idle_rate
+                if rate != stream.rate:
+                    stream.rate = rate
+                    due.add(name)
+
+        for name, stream in self._streams.items():
+            history = self._histories.get(name)
+            if name in due or history is None or not stream.rate or now - stream.since_ns < self._check_ns:
+                continue
+
+            count = history.count
+            stream.measured = (count - stream.since_count) * 1_000_000_000 / (now - stream.since_ns)
+            if stream.measured < stream.rate * self._config.under_delivery:
+                due.add(name)
+            else:
+                stream.since_ns, stream.since_count = now, count
+
+        if not due:
+            return
+
+        # The arrivals are counted afresh from each request, so the flight controller gets a whole check to catch up.
+        for name in due:
+            stream = self._streams[name]
+            history = self._histories.get(name)
+            stream.since_ns, stream.since_count = now, 0 if history is None else history.count
+        self._request({self._message_ids[name]: self.interval(self._streams[name].rate) for name in sorted(due)})
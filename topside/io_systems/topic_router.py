@@ -0,0 +1,93 @@
+"""Routes incoming MQTT topics straight to the handler that owns them."""
+from typing import Any, Callable
+
+# Key used inside a trie node to hold the callback registered for that node's prefix. Topic levels are always
+# strings, so this can never clash with one.
+_CALLBACK = None
+_UNRESOLVED = object()
+
+
+class TopicRouter:
+    """A trie of topic prefixes and the callbacks that handle them.
+
+    Each topic is split into its levels and matched against the trie the first time it is seen, and the result is
+    cached, so routing a known topic is a single dictionary lookup. The callback of the longest matching prefix is
+    called with the levels of the topic that come after the prefix and the message value.
+
+    Methods:
+        register(prefix: str, callback: Callable[[tuple[str, ...], Any], None]) -> None:
+            Send every topic under a prefix to a callback.
+        route(topic: str, value: Any) -> bool:
+            Send a message to the callback that owns its topic.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the TopicRouter object."""
+        self._trie: dict = {}
+        self._routes: dict[str, tuple[Callable[[tuple[str, ...], Any], None], tuple[str, ...]] | None] = {}
+
+    def register(self, prefix: str, callback: Callable[[tuple[str, ...], Any], None]) -> None:
+        """Send every topic under a prefix to a callback.
+
+        Args:
+            prefix (str):
+                The topic prefix, such as "ROV/pins".
+            callback (Callable[[tuple[str, ...], Any], None]):
+                Called with the topic levels after the prefix and the message value. For "ROV/pins" and the topic
+                "ROV/pins/FRONT_LEFT", the levels are ("FRONT_LEFT",).
+        """
+        node = self._trie
+        for level in prefix.strip("/").split("/"):
+            node = node.setdefault(level, {})
+        node[_CALLBACK] = callback
+
+        # Registering a new prefix can change where already seen topics should go.
+        self._routes.clear()
+
+    def route(self, topic: str, value: Any) -> bool:
+        """Send a message to the callback that owns its topic.
+
+        Args:
+            topic (str):
+                The topic the message arrived on.
+            value (Any):
+                The decoded message value.
+
+        Returns:
+            bool: True if a callback handled the message, False if no registered prefix matched the topic.
+        """
+        route = self._routes.get(topic, _UNRESOLVED)
+        if route is _UNRESOLVED:
+            route = self._resolve(topic)
+            self._routes[topic] = route
+
+        if route is None:
+            return False
+
+        callback, levels = route
+        callback(levels, value)
+        return True
+
+    def _resolve(self, topic: str) -> tuple[Callable[[tuple[str, ...], Any], None], tuple[str, ...]] | None:
+        """Find the callback of the longest registered prefix of a topic.
+
+        Args:
+            topic (str):
+                The topic to look up.
+
+        Returns:
+            tuple[Callable[[tuple[str, ...], Any], None], tuple[str, ...]] | None: The callback and the topic levels
+                after the prefix, or None if no prefix matches.
+        """
+        levels = tuple(topic.split("/"))
+
+        match = None
+        node = self._trie
+        for depth, level in enumerate(levels):
+            node = node.get(level)
+            if node is None:
+                break
+            if _CALLBACK in node:
+                match = (node[_CALLBACK], levels[depth + 1:])
+
+        return match
@@ -1,62 +1,309 @@
-"""Socket video communications handler for the surface system."""
-from config.video import VideoConfig
+"""Socket video communications handler for the surface system.
+
+The video arrives as UDP datagrams, each holding a slice of a JPEG frame behind a small header (see video_packets).
+A receiver thread reads the datagrams straight into a reused buffer and copies each slice into place in one of a few
+preallocated frame buffers. Complete frames are decoded on a thread pool, which can be shared between streams, one
+frame of a stream at a time. Frames that complete while one is decoding wait in a queue that only keeps the newest, so a
+slow decode skips frames instead of falling behind, and the receiver never waits on it.
+
+Each frame carries the time the ROV captured it. Once the clocks are synced, showing a frame records how old it was by
+then, from the camera to the screen.
+"""
 import socket
-import cv2
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable
+
 import numpy as np
 
+from config.video import VideoConfig
+from io_systems.clock_sync import ClockSync
+from io_systems.frame_decoder import FrameDecoder
+from io_systems.video_packets import (
+    DecodedFrame, Frame, FrameAssembler, FrameBufferPool, LatestFrameQueue, VideoStats,
+)
+from utilities.ring_buffer import RingBuffer
+
+# When each recent frame finished decoding and how long it took.
+DECODE_DTYPE = np.dtype([("time_ns", np.int64), ("duration_ns", np.int64)])
+# When each recent frame was shown and how long it had been since the ROV captured it.
+AGE_DTYPE = np.dtype([("time_ns", np.int64), ("age_ns", np.int64)])
+
 
 class UDPSocket:
+    """Receives a video stream over UDP on a thread of its own and decodes its frames on a thread pool.
+
+    Properties:
+        running (bool):
+            Whether the receiver thread is running.
+        frame_id (int | None):
+            The id of the latest decoded frame.
+        decoder (FrameDecoder | None):
+            The decoder, unless the frames are decoded some other way.
+        stats (VideoStats):
+            How well the video is arriving.
+
+    Methods:
+        start() -> None:
+            Open the socket and start the receiver thread.
+        stop() -> None:
+            Stop the receiver thread, wait for the last decode, and close the socket.
+        get_frame() -> np.ndarray | None:
+            Get the latest decoded frame.
+        latest() -> DecodedFrame | None:
+            Get the latest decoded frame along with its id and timestamps.
+        frame_shown(frame: DecodedFrame) -> None:
+            Record how old a frame was when it was shown.
+    """
 
-    def __init__(self, config: VideoConfig):
+    def __init__(self, config: VideoConfig, decode: Callable[[memoryview], np.ndarray | None] | None = None,
+                 executor: Executor | None = None, clock_sync: ClockSync | None = None,
+                 clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the UDPSocket object.
+
+        Args:
+            config (VideoConfig):
+                The stream's configuration.
+            decode (Callable[[memoryview], np.ndarray | None] | None, optional):
+                Decodes an encoded frame, returning None if it can't. The data is only valid during the call.
+                Defaults to None, a FrameDecoder at the configured width and height.
+            executor (Executor | None, optional):
+                The pool to decode on, which can be shared with other streams. It must run the frames on threads, as
+                they're handed over in the receiver's buffers.
+                Defaults to None, a thread of the stream's own.
+            clock_sync (ClockSync | None, optional):
+                Turns the ROV's capture times into the surface's time, so the age of the frames shown can be recorded.
+                It must use the same clock.
+                Defaults to None, the ages aren't recorded.
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
         self._config = config
 
         self._ip = self._config.ip_address
         self._port = self._config.port
-
-        self.delimiter = b'FRAME_END_MARKER'
-        self.chunk_size = self._config.chunk_size
         self._width = self._config.width
         self._height = self._config.height
 
-    def run(self):
+        self._decoder: FrameDecoder | None = None
+        if decode is None:
+            self._decoder = FrameDecoder(self._width, self._height, self._config.mirror)
+            decode = self._decoder.decode
+        self._decode = decode
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._clock_sync = clock_sync
+        self._clock = clock
 
-        try:  # Create the UDP socket
-            self.UDP_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.UDP_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._config.buffer_size)
+        # Each frame in progress holds a buffer, as do the frame waiting to be decoded and the one being decoded.
+        self._pool = FrameBufferPool(self._config.max_pending_frames + 2, self._config.max_frame_size)
+        self._assembler = FrameAssembler(
+            self._pool, self._config.chunk_size, self._config.max_pending_frames, self._config.reassembly_timeout,
+            clock=clock,
+        )
+        self._queue = LatestFrameQueue()
+        self._datagram = bytearray(self._config.chunk_size)
 
-            # Bind the socket to listen for incoming video stream
-            self.UDP_socket.bind((self._ip, self._port))
-            print(f"UDP socket bound to {self._ip}:{self._port}")
+        # Swapped for a new tuple on each decode, so readers never see half of one.
+        self._frame: DecodedFrame | None = None
 
-            # Create a window for displaying video
-            cv2.namedWindow("Received Video Feed", cv2.WINDOW_NORMAL)
+        # Only one frame of the stream is decoded at a time, so the frames are shown in order.
+        self._decoding = False
+        self._decode_lock = threading.Lock()
+        self._decode_idle = threading.Event()
+        self._decode_idle.set()
+        self._decodes = RingBuffer(256, dtype=DECODE_DTYPE)
+        self._ages = RingBuffer(256, dtype=AGE_DTYPE)
 
-            while True:
-                # Buffer to store received frame chunks
-                frame_data = bytearray()
+        self._socket: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._error: BaseException | None = None
 
-                while True:
-                    # Receive chunks of the video stream
-                    chunk, addr = self.UDP_socket.recvfrom(self.chunk_size)
-                    if chunk == self.delimiter:
-                        print("End of frame received")
-                        break  # End of current frame, exit the loop
+    @property
+    def running(self) -> bool:
+        """Whether the receiver thread is running."""
+        return self._thread is not None and self._thread.is_alive()
 
-                    # Append chunk to the frame data buffer
-                    frame_data.extend(chunk)
+    @property
+    def frame_id(self) -> int | None:
+        """The id of the latest decoded frame, or None if no frame has been decoded yet."""
+        frame = self._frame
+        return None if frame is None else frame.frame_id
 
-                # Decode the frame data into an image
-                frame = cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    @property
+    def decoder(self) -> FrameDecoder | None:
+        """The decoder, unless the frames are decoded some other way."""
+        return self._decoder
 
-                # If frame is valid, display it
-                if frame is not None:
-                    frame = cv2.resize(frame, (self._width, self._height))
-                    cv2.imshow("Received Video Feed", frame)
+    @property
+    def stats(self) -> VideoStats:
+        """How well the video is arriving. The rates and percentiles cover the last second."""
+        assembler = self._assembler
+        window_start = self._clock() - 1_000_000_000
 
-                # Exit condition: press 'q' to quit
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-        finally:
+        completions = assembler.completions()
+        completions = completions[completions["time_ns"] > window_start]
+        decodes = self._decodes.since(self._decodes.count - self._decodes.capacity + 1)
+        decodes = decodes[decodes["time_ns"] > window_start]
+        ages = self._ages.since(self._ages.count - self._ages.capacity + 1)
+        ages = ages[ages["time_ns"] > window_start]
+
+        frames_sent = assembler.frames_completed + assembler.frames_lost
+        chunks_sent = assembler.chunks_received + assembler.chunks_lost
+
+        return VideoStats(
+            float(len(completions)), assembler.frames_completed, assembler.frames_lost, self._queue.replaced,
+            assembler.frames_lost / frames_sent if frames_sent else 0.0,
+            assembler.chunks_lost / chunks_sent if chunks_sent else 0.0,
+            *_percentiles_ms(completions["latency_ns"]),
+            float(completions["size"].sum()) * 8 / 1000,
+            *_percentiles_ms(decodes["duration_ns"]),
+            *_percentiles_ms(ages["age_ns"]),
+        )
+
+    def start(self) -> None:
+        """Open the socket and start the receiver thread."""
+        if self.running:
+            return
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._config.buffer_size)
+        self._socket.settimeout(self._config.timeout)
+
+        # Bind the socket to listen for incoming video stream
+        self._socket.bind((self._ip, self._port))
+        print(f"UDP socket bound to {self._ip}:{self._port}")
+
+        if self._owns_executor:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix=f"VideoDecoder:{self._port}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._receive, name=f"VideoReceiver:{self._port}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the receiver thread, wait for the frame being decoded, and close the socket."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self._decode_idle.wait()
+        frame = self._queue.get(0)
+        if frame is not None:
+            self._pool.release(frame.buffer)
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        if self._socket is not None:
             print("Closing the socket and cleaning up.")
-            self.UDP_socket.close()
-            cv2.destroyAllWindows()
+            self._socket.close()
+            self._socket = None
+
+    def get_frame(self) -> np.ndarray | None:
+        """Get the latest decoded frame.
+
+        Returns:
+            np.ndarray | None: The frame, or None if no frame has been decoded yet.
+        """
+        frame = self.latest()
+        return None if frame is None else frame.image
+
+    def latest(self) -> DecodedFrame | None:
+        """Get the latest decoded frame along with its id, so a reader can tell whether it has changed, and its
+        timestamps.
+
+        Returns:
+            DecodedFrame | None: The frame, or None if no frame has been decoded yet.
+        """
+        if self._error is not None:
+            raise RuntimeError("The video threads stopped") from self._error
+        return self._frame
+
+    def frame_shown(self, frame: DecodedFrame) -> None:
+        """Record how old a frame was when it was shown, if the clocks are synced. Call it once per frame, from one
+        thread, such as the dashboard's.
+
+        Args:
+            frame (DecodedFrame):
+                The frame that was shown.
+        """
+        if self._clock_sync is None:
+            return
+        captured = self._clock_sync.to_local(frame.capture_ns)
+        if captured is None:
+            return
+
+        now = self._clock()
+        self._ages.append((now, now - captured))
+
+    def _receive(self) -> None:
+        """Read datagrams and put frames back together until stopped."""
+        datagram = memoryview(self._datagram)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    size, _ = self._socket.recvfrom_into(self._datagram)
+                except socket.timeout:
+                    self._assembler.expire()
+                    continue
+
+                frame = self._assembler.add(datagram[:size])
+                if frame is None:
+                    continue
+
+                replaced = self._queue.put(frame)
+                if replaced is not None:
+                    self._pool.release(replaced.buffer)
+                self._schedule_decode()
+        except BaseException as error:
+            # Hand the error to the main loop, which would otherwise carry on showing the last frame.
+            self._error = error
+
+    def _schedule_decode(self) -> None:
+        """Start decoding the newest complete frame, unless one of the stream's frames is already decoding."""
+        with self._decode_lock:
+            if self._decoding or self._stop_event.is_set():
+                return
+
+            frame = self._queue.get(0)
+            if frame is None:
+                return
+
+            self._decoding = True
+            self._decode_idle.clear()
+        self._executor.submit(self._decode_frame, frame)
+
+    def _decode_frame(self, frame: Frame) -> None:
+        """Decode a frame on the pool, then move on to the newest frame that completed in the meantime."""
+        try:
+            start = self._clock()
+            try:
+                image = self._decode(frame.data)
+            finally:
+                self._pool.release(frame.buffer)
+            end = self._clock()
+            self._decodes.append((end, end - start))
+
+            if image is not None:
+                self._frame = DecodedFrame(frame.frame_id, image, frame.capture_ns, frame.completed_ns)
+        except BaseException as error:
+            self._error = error
+        finally:
+            with self._decode_lock:
+                self._decoding = False
+                self._decode_idle.set()
+        self._schedule_decode()
+
+
+def _percentiles_ms(durations_ns: np.ndarray) -> tuple[float, float]:
+    """Get the median and 95th percentile of some durations in milliseconds, or zeros if there are none."""
+    if not len(durations_ns):
+        return 0.0, 0.0
+    p50, p95 = np.percentile(durations_ns, (50, 95)) / 1_000_000
+    return float(p50), float(p95)
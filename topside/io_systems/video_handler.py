@@ -0,0 +1,164 @@
+"""Receives every video stream from the ROV."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.video import VideoConfig
+from io_systems.clock_sync import ClockSync
+from io_systems.udp_socket import UDPSocket
+from io_systems.video_packets import DecodedFrame, VideoStats
+
+
+class VideoHandler:
+    """Receives each video stream on a thread of its own and decodes all of them on one pool of threads, so the
+    streams decode in parallel across the cores. OpenCV lets go of the GIL while it decodes, so threads are enough.
+
+    Properties:
+        streams (dict[str, UDPSocket]):
+            The streams, by name.
+        running (bool):
+            Whether any stream is being received.
+        clock_sync (ClockSync | None):
+            The estimate of the offset between the ROV's clock and the surface's.
+
+    Methods:
+        start() -> None:
+            Start receiving every stream.
+        stop() -> None:
+            Stop receiving every stream.
+        update() -> None:
+            Ping the ROV to keep the clocks synced.
+        get_frame(name: str) -> np.ndarray | None:
+            Get the latest decoded frame of a stream.
+        frame_shown(name: str, frame: DecodedFrame) -> None:
+            Record how old a stream's frame was when it was shown.
+        stats() -> dict[str, VideoStats]:
+            Get how well each stream is arriving.
+        summary() -> str:
+            Get a line for each stream with how old its frames are when shown and how well it's arriving.
+        report() -> str:
+            Get a readable table of how long each stage of decoding takes for each stream.
+    """
+
+    def __init__(self, configs: dict[str, VideoConfig], decode_workers: int | None = None,
+                 clock_sync: ClockSync | None = None) -> None:
+        """Initialize the VideoHandler object.
+
+        Args:
+            configs (dict[str, VideoConfig]):
+                The configuration of each stream, by name.
+            decode_workers (int | None, optional):
+                How many frames can decode at once, across every stream.
+                Defaults to None, one per stream up to the number of cores.
+            clock_sync (ClockSync | None, optional):
+                Turns the ROV's capture times into the surface's time, so the age of the frames shown can be recorded.
+                Defaults to None, the ages aren't recorded.
+        """
+        if decode_workers is None:
+            decode_workers = max(1, min(len(configs), os.cpu_count() or 1))
+
+        # The pool only starts its threads once there are frames to decode.
+        self._executor = ThreadPoolExecutor(decode_workers, thread_name_prefix="VideoDecoder")
+        self._clock_sync = clock_sync
+        self._streams = {
+            name: UDPSocket(config, executor=self._executor, clock_sync=clock_sync) for name, config in configs.items()
+        }
+
+    @property
+    def streams(self) -> dict[str, UDPSocket]:
+        """The streams, by name."""
+        return self._streams
+
+    @property
+    def running(self) -> bool:
+        """Whether any stream is being received."""
+        return any(stream.running for stream in self._streams.values())
+
+    @property
+    def clock_sync(self) -> ClockSync | None:
+        """The estimate of the offset between the ROV's clock and the surface's, if the ages are recorded."""
+        return self._clock_sync
+
+    def start(self) -> None:
+        """Start receiving every stream."""
+        for stream in self._streams.values():
+            stream.start()
+
+    def stop(self) -> None:
+        """Stop receiving every stream and wait for their last frames to decode. The streams can't be started again
+        afterwards."""
+        for stream in self._streams.values():
+            stream.stop()
+        self._executor.shutdown()
+
+    def update(self) -> None:
+        """Ping the ROV to keep the clocks synced, if a ping is due. Called at the telemetry rate."""
+        if self._clock_sync is not None:
+            self._clock_sync.update()
+
+    def get_frame(self, name: str) -> np.ndarray | None:
+        """Get the latest decoded frame of a stream.
+
+        Args:
+            name (str):
+                The name of the stream.
+
+        Returns:
+            np.ndarray | None: The frame, or None if no frame has been decoded yet.
+        """
+        return self._streams[name].get_frame()
+
+    def frame_shown(self, name: str, frame: DecodedFrame) -> None:
+        """Record how old a stream's frame was when it was shown.
+
+        Args:
+            name (str):
+                The name of the stream.
+            frame (DecodedFrame):
+                The frame that was shown.
+        """
+        self._streams[name].frame_shown(frame)
+
+    def stats(self) -> dict[str, VideoStats]:
+        """Get how well each stream is arriving.
+
+        Returns:
+            dict[str, VideoStats]: The stats of each stream, by name.
+        """
+        return {name: stream.stats for name, stream in self._streams.items()}
+
+    def summary(self) -> str:
+        """Get a line for each stream with how old its frames are when shown and how well it's arriving, under a line
+        with how far apart the clocks are.
+
+        Returns:
+            str: The summary.
+        """
+        clock_sync = self._clock_sync
+        if clock_sync is None:
+            lines = ["clock not synced, no ages"]
+        elif not clock_sync.synced:
+            lines = ["clock syncing..."]
+        else:
+            lines = [
+                f"clock offset {clock_sync.offset_ns / 1_000_000:+.1f} ms, rtt {clock_sync.rtt_ns / 1_000_000:.1f} ms"
+            ]
+
+        for name, stats in self.stats().items():
+            lines.append(
+                f"{name}: age {stats.age_p50_ms:.0f}/{stats.age_p95_ms:.0f} ms (p50/p95), {stats.fps:.1f} fps, "
+                f"{stats.frame_loss:.1%} lost, decode {stats.decode_p95_ms:.1f} ms"
+            )
+        return "\n".join(lines)
+
+    def report(self) -> str:
+        """Get a readable table of how long each stage of decoding takes for each stream, in microseconds.
+
+        Returns:
+            str: A table for each stream decoded by a FrameDecoder.
+        """
+        return "\n\n".join(
+            f"{name}:\n{stream.decoder.profiler.report()}"
+            for name, stream in self._streams.items() if stream.decoder is not None
+        )
@@ -0,0 +1,531 @@
+"""Splits video frames into datagrams and puts them back together, without touching the network or decoding.
+
+Each datagram carries a small header in front of its slice of the frame:
+    frame id (uint32):
+        Goes up by one for each frame the ROV sends, wrapping around at 2 ** 32.
+    chunk index (uint16):
+        The slice's position in the frame.
+    chunk count (uint16):
+        How many slices make up the frame.
+    capture time (uint64):
+        When the ROV captured the frame, in nanoseconds on the ROV's clock. See clock_sync for turning it into the
+        surface's time.
+
+Every slice but the last fills a datagram, so a slice's index says where in the frame it goes. This lets slices be
+copied straight into place as they arrive, in any order, and a frame is complete once it has one of each. Frames that
+never complete are dropped rather than shown broken.
+"""
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from utilities.ring_buffer import RingBuffer
+
+CHUNK_HEADER = struct.Struct("!IHHQ")
+FRAME_ID_MODULUS = 1 << 32
+MAX_CHUNKS = 1 << 16
+
+# When each recent frame completed, how big it was, and how long it took from its first datagram to its last.
+COMPLETION_DTYPE = np.dtype([("time_ns", np.int64), ("size", np.int64), ("latency_ns", np.int64)])
+
+
+def packetize_frame(frame_id: int, data: bytes | memoryview, chunk_size: int, capture_ns: int = 0) -> list[bytes]:
+    """Split a frame into datagrams. Used by senders, such as the ROV and the loopback benchmark.
+
+    Args:
+        frame_id (int):
+            The frame's id, wrapped to 32 bits.
+        data (bytes | memoryview):
+            The encoded frame.
+        chunk_size (int):
+            The size of each datagram, header included.
+        capture_ns (int, optional):
+            When the frame was captured, in nanoseconds on the sender's clock.
+            Defaults to 0.
+
+    Returns:
+        list[bytes]: The datagrams, in order.
+    """
+    payload_size = chunk_size - CHUNK_HEADER.size
+    if payload_size <= 0:
+        raise ValueError(f"Chunk size must be larger than the {CHUNK_HEADER.size} byte header, got {chunk_size}")
+
+    data = memoryview(data)
+    count = max(1, -(-len(data) // payload_size))
+    if count > MAX_CHUNKS:
+        raise ValueError(f"A frame of {len(data)} bytes needs more than {MAX_CHUNKS} chunks of {chunk_size} bytes")
+
+    frame_id %= FRAME_ID_MODULUS
+    return [
+        CHUNK_HEADER.pack(frame_id, index, count, capture_ns) + data[index * payload_size:(index + 1) * payload_size]
+        for index in range(count)
+    ]
+
+
+def newer(frame_id: int, other: int) -> bool:
+    """Whether a frame id comes after another, allowing for the ids wrapping around.
+
+    Args:
+        frame_id (int):
+            The frame id to check.
+        other (int):
+            The frame id to check against.
+
+    Returns:
+        bool: True if frame_id comes after other.
+    """
+    return 0 < (frame_id - other) % FRAME_ID_MODULUS < FRAME_ID_MODULUS // 2
+
+
+class FrameBufferPool:
+    """A fixed set of preallocated frame buffers, handed out and given back so no frame allocates.
+
+    Properties:
+        size (int):
+            The size of each buffer, in bytes.
+        available (int):
+            How many buffers are free.
+
+    Methods:
+        acquire() -> bytearray | None:
+            Take a free buffer.
+        release(buffer: bytearray) -> None:
+            Give a buffer back.
+    """
+
+    def __init__(self, count: int, size: int) -> None:
+        """Initialize the FrameBufferPool object.
+
+        Args:
+            count (int):
+                How many buffers to make.
+            size (int):
+                The size of each buffer, in bytes.
+        """
+        if count <= 0:
+            raise ValueError(f"Buffer count must be positive, got {count}")
+
+        self._size = size
+        self._free = [bytearray(size) for _ in range(count)]
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """The size of each buffer, in bytes."""
+        return self._size
+
+    @property
+    def available(self) -> int:
+        """How many buffers are free."""
+        return len(self._free)
+
+    def acquire(self) -> bytearray | None:
+        """Take a free buffer.
+
+        Returns:
+            bytearray | None: The buffer, or None if they're all in use.
+        """
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, buffer: bytearray) -> None:
+        """Give a buffer back once nothing uses it any more.
+
+        Args:
+            buffer (bytearray):
+                A buffer from acquire().
+        """
+        with self._lock:
+            self._free.append(buffer)
+
+
+class VideoStats(NamedTuple):
+    """How well a video stream is arriving. The rates and percentiles cover the last second.
+
+    Attributes:
+        fps (float): How many frames a second were put back together.
+        frames_received (int): How many frames were put back together in total.
+        frames_lost (int): How many frames were dropped incomplete or never arrived at all, in total.
+        frames_skipped (int): How many complete frames were replaced by newer ones before they could be decoded.
+        frame_loss (float): The fraction of the frames sent that were lost, in total.
+        chunk_loss (float): The fraction of the datagrams of the frames that arrived that were lost, in total.
+        reassembly_p50_ms (float): The median time from a frame's first datagram to its last, in milliseconds.
+        reassembly_p95_ms (float): The 95th percentile time from a frame's first datagram to its last, in milliseconds.
+        throughput_kbps (float): How much video arrived, in kilobits a second.
+        decode_p50_ms (float): The median time to decode a frame, in milliseconds.
+        decode_p95_ms (float): The 95th percentile time to decode a frame, in milliseconds.
+        age_p50_ms (float): The median time from the ROV capturing a frame to it being shown, in milliseconds. Zero
+            until the clocks are synced and frames are being shown.
+        age_p95_ms (float): The 95th percentile time from the ROV capturing a frame to it being shown, in milliseconds.
+    """
+    fps: float
+    frames_received: int
+    frames_lost: int
+    frames_skipped: int
+    frame_loss: float
+    chunk_loss: float
+    reassembly_p50_ms: float
+    reassembly_p95_ms: float
+    throughput_kbps: float
+    decode_p50_ms: float
+    decode_p95_ms: float
+    age_p50_ms: float = 0.0
+    age_p95_ms: float = 0.0
+
+
+class Frame(NamedTuple):
+    """A complete frame, put back together from its datagrams.
+
+    Attributes:
+        frame_id (int): The frame's id.
+        data (memoryview): The encoded frame. A view of buffer, only valid until the buffer is released.
+        buffer (bytearray): The pooled buffer the frame is in, to release once the frame is decoded.
+        first_chunk_ns (int): When the first of the frame's datagrams arrived, in nanoseconds.
+        completed_ns (int): When the last of the frame's datagrams arrived, in nanoseconds.
+        capture_ns (int): When the ROV captured the frame, in nanoseconds on the ROV's clock.
+    """
+    frame_id: int
+    data: memoryview
+    buffer: bytearray
+    first_chunk_ns: int
+    completed_ns: int
+    capture_ns: int
+
+
+class DecodedFrame(NamedTuple):
+    """A decoded frame, ready to show.
+
+    Attributes:
+        frame_id (int): The frame's id.
+        image (np.ndarray): The decoded frame.
+        capture_ns (int): When the ROV captured the frame, in nanoseconds on the ROV's clock.
+        completed_ns (int): When the last of the frame's datagrams arrived, in nanoseconds.
+    """
+    frame_id: int
+    image: np.ndarray
+    capture_ns: int
+    completed_ns: int
+
+
+class _Assembly:
+    """A frame that is still missing some of its datagrams."""
+
+    __slots__ = ("frame_id", "buffer", "count", "received", "received_count", "size", "first_chunk_ns", "capture_ns")
+
+    def __init__(self, frame_id: int, buffer: bytearray, count: int, now: int, capture_ns: int) -> None:
+        self.frame_id = frame_id
+        self.buffer = buffer
+        self.count = count
+        self.received = bytearray(count)
+        self.received_count = 0
+        self.size = 0
+        self.first_chunk_ns = now
+        self.capture_ns = capture_ns
+
+
+class FrameAssembler:
+    """Puts frames back together from datagrams that may arrive out of order, twice, or not at all.
+
+    A few frames can be in progress at once, so a datagram that arrives late still counts. Once a frame completes, any
+    older frame still in progress is dropped, as it would be shown after a newer one. Frames that stay incomplete for
+    too long, or that have to make room for newer ones, are dropped as well.
+
+    Properties:
+        frames_completed (int):
+            How many frames were put back together.
+        frames_lost (int):
+            How many frames were dropped incomplete or never arrived at all.
+        chunks_received (int):
+            How many datagrams were used.
+        chunks_lost (int):
+            How many datagrams the lost frames were known to be missing.
+        chunks_ignored (int):
+            How many datagrams were duplicates, too late, or malformed.
+
+    Methods:
+        add(datagram: memoryview) -> Frame | None:
+            Add a datagram, returning the frame it completes.
+        expire() -> None:
+            Drop the frames that have been in progress for too long.
+        completions() -> np.ndarray:
+            Get when the recent frames completed, how big they were, and how long they took to put back together.
+    """
+
+    def __init__(self, pool: FrameBufferPool, chunk_size: int, max_pending: int = 4, timeout: float = 0.1,
+                 history: int = 256, clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the FrameAssembler object.
+
+        Args:
+            pool (FrameBufferPool):
+                The buffers to put frames together in. Each frame in progress holds one until it completes or drops.
+            chunk_size (int):
+                The size of each datagram, header included.
+            max_pending (int, optional):
+                The most frames to have in progress at once.
+                Defaults to 4.
+            timeout (float, optional):
+                How long a frame can be in progress before it's dropped, in seconds.
+                Defaults to 0.1.
+            history (int, optional):
+                How many recent frames to keep the completion times, sizes, and latencies of.
+                Defaults to 256.
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        if max_pending <= 0:
+            raise ValueError(f"Max pending frames must be positive, got {max_pending}")
+
+        self._pool = pool
+        self._payload_size = chunk_size - CHUNK_HEADER.size
+        self._max_pending = max_pending
+        self._timeout_ns = int(timeout * 1_000_000_000)
+        self._clock = clock
+
+        self._pending: dict[int, _Assembly] = {}
+        self._newest_id: int | None = None
+        self._completed_id: int | None = None
+        # Recently dropped frames, so their stragglers don't start them over.
+        self._dropped: deque[int] = deque(maxlen=4 * max_pending)
+
+        self._frames_completed = 0
+        self._frames_lost = 0
+        self._chunks_received = 0
+        self._chunks_lost = 0
+        self._chunks_ignored = 0
+
+        self._completions = RingBuffer(history, dtype=COMPLETION_DTYPE)
+
+    @property
+    def frames_completed(self) -> int:
+        """How many frames were put back together."""
+        return self._frames_completed
+
+    @property
+    def frames_lost(self) -> int:
+        """How many frames were dropped incomplete or never arrived at all."""
+        return self._frames_lost
+
+    @property
+    def chunks_received(self) -> int:
+        """How many datagrams were used."""
+        return self._chunks_received
+
+    @property
+    def chunks_lost(self) -> int:
+        """How many datagrams the lost frames were known to be missing. Frames that never arrived don't count, as
+        there's no telling how many datagrams they had."""
+        return self._chunks_lost
+
+    @property
+    def chunks_ignored(self) -> int:
+        """How many datagrams were duplicates, too late, or malformed."""
+        return self._chunks_ignored
+
+    def add(self, datagram: memoryview) -> Frame | None:
+        """Add a datagram, copying its slice of the frame into place.
+
+        Args:
+            datagram (memoryview):
+                The datagram, header included.
+
+        Returns:
+            Frame | None: The frame the datagram completed, if it did. Its buffer is the caller's to release.
+        """
+        if len(datagram) < CHUNK_HEADER.size:
+            self._chunks_ignored += 1
+            return None
+
+        frame_id, index, count, capture_ns = CHUNK_HEADER.unpack_from(datagram)
+        payload = datagram[CHUNK_HEADER.size:]
+        now = self._clock()
+
+        assembly = self._pending.get(frame_id)
+        if assembly is None:
+            if self._completed_id is not None and not newer(frame_id, self._completed_id):
+                self._chunks_ignored += 1
+                return None
+
+            assembly = self._start(frame_id, count, now, capture_ns)
+            if assembly is None:
+                self._chunks_ignored += 1
+                return None
+
+        if count != assembly.count or index >= count or assembly.received[index]:
+            self._chunks_ignored += 1
+            return None
+
+        # Every chunk but the last fills its datagram, which is how the chunks know where they go.
+        offset = index * self._payload_size
+        end = offset + len(payload)
+        if (len(payload) != self._payload_size and index != count - 1) or end > len(assembly.buffer):
+            self._chunks_ignored += 1
+            return None
+
+        assembly.buffer[offset:end] = payload
+        assembly.received[index] = 1
+        assembly.received_count += 1
+        self._chunks_received += 1
+        if index == count - 1:
+            assembly.size = end
+
+        if assembly.received_count < count:
+            return None
+        return self._complete(assembly, now)
+
+    def expire(self) -> None:
+        """Drop the frames that have been in progress for longer than the timeout."""
+        now = self._clock()
+        for frame_id in [frame_id for frame_id, assembly in self._pending.items()
+                         if now - assembly.first_chunk_ns > self._timeout_ns]:
+            self._drop(frame_id)
+
+    def completions(self) -> np.ndarray:
+        """Get when the recent frames completed, how big they were, and how long they took from their first datagram
+        to their last, oldest first. Safe to call while another thread adds datagrams.
+
+        Returns:
+            np.ndarray: The completions, as COMPLETION_DTYPE.
+        """
+        # The oldest one may be being overwritten, so it's left out.
+        return self._completions.since(self._completions.count - self._completions.capacity + 1)
+
+    def _start(self, frame_id: int, count: int, now: int, capture_ns: int) -> _Assembly | None:
+        """Start putting a frame together, making room for it if need be."""
+        if count == 0 or (count - 1) * self._payload_size >= self._pool.size or frame_id in self._dropped:
+            return None
+
+        # Frames that were skipped over entirely will never arrive.
+        if self._newest_id is None or newer(frame_id, self._newest_id):
+            if self._newest_id is not None:
+                self._frames_lost += (frame_id - self._newest_id) % FRAME_ID_MODULUS - 1
+            self._newest_id = frame_id
+        else:
+            # A frame that was counted as skipped turned up late after all.
+            self._frames_lost -= 1
+
+        self.expire()
+
+        while True:
+            if len(self._pending) < self._max_pending:
+                buffer = self._pool.acquire()
+                if buffer is not None:
+                    break
+
+            # Make room by dropping the oldest frame in progress, unless this one is older still.
+            oldest = max(self._pending, key=self._age, default=None)
+            if oldest is None or self._age(frame_id) > self._age(oldest):
+                self._frames_lost += 1
+                self._dropped.append(frame_id)
+                return None
+            self._drop(oldest)
+
+        assembly = _Assembly(frame_id, buffer, count, now, capture_ns)
+        self._pending[frame_id] = assembly
+        return assembly
+
+    def _age(self, frame_id: int) -> int:
+        """How many frames older than the newest one a frame is."""
+        return (self._newest_id - frame_id) % FRAME_ID_MODULUS
+
+    def _complete(self, assembly: _Assembly, now: int) -> Frame:
+        """Hand over a complete frame and drop the older ones still in progress."""
+        del self._pending[assembly.frame_id]
+        for frame_id in [frame_id for frame_id in self._pending if newer(assembly.frame_id, frame_id)]:
+            self._drop(frame_id)
+
+        self._completed_id = assembly.frame_id
+        self._frames_completed += 1
+        self._completions.append((now, assembly.size, now - assembly.first_chunk_ns))
+
+        return Frame(
+            assembly.frame_id, memoryview(assembly.buffer)[:assembly.size], assembly.buffer, assembly.first_chunk_ns,
+            now, assembly.capture_ns,
+        )
+
+    def _drop(self, frame_id: int) -> None:
+        """Drop a frame in progress and give its buffer back."""
+        assembly = self._pending.pop(frame_id)
+        self._pool.release(assembly.buffer)
+        self._dropped.append(frame_id)
+        self._frames_lost += 1
+        self._chunks_lost += assembly.count - assembly.received_count
+
+
+class LatestFrameQueue:
+    """Holds the newest complete frame for the decoder. A new frame replaces one that hasn't been taken yet, so the
+    decoder never falls behind by more than a frame.
+
+    Properties:
+        replaced (int):
+            How many frames were replaced before the decoder took them.
+
+    Methods:
+        put(frame: Frame) -> Frame | None:
+            Offer a frame, returning the one it replaced.
+        get(timeout: float | None = None) -> Frame | None:
+            Wait for a frame and take it.
+        close() -> Frame | None:
+            Wake the decoder so it can stop, returning the frame left waiting.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the LatestFrameQueue object."""
+        self._frame: Frame | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._replaced = 0
+
+    @property
+    def replaced(self) -> int:
+        """How many frames were replaced before the decoder took them."""
+        return self._replaced
+
+    def put(self, frame: Frame) -> Frame | None:
+        """Offer a frame to the decoder.
+
+        Args:
+            frame (Frame):
+                The frame.
+
+        Returns:
+            Frame | None: The frame this one replaced, whose buffer is the caller's to release.
+        """
+        with self._condition:
+            replaced, self._frame = self._frame, frame
+            if replaced is not None:
+                self._replaced += 1
+            self._condition.notify()
+        return replaced
+
+    def get(self, timeout: float | None = None) -> Frame | None:
+        """Wait for a frame and take it.
+
+        Args:
+            timeout (float | None, optional):
+                The longest to wait, in seconds. None waits until a frame arrives or the queue is closed.
+                Defaults to None.
+
+        Returns:
+            Frame | None: The frame, or None if there wasn't one in time or the queue is closed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame is not None or self._closed, timeout)
+            frame, self._frame = self._frame, None
+        return frame
+
+    def close(self) -> Frame | None:
+        """Wake the decoder so it can stop.
+
+        Returns:
+            Frame | None: The frame left waiting, whose buffer is the caller's to release.
+        """
+        with self._condition:
+            self._closed = True
+            frame, self._frame = self._frame, None
+            self._condition.notify_all()
+        return frame
@@ -0,0 +1,154 @@
+"""Adapts the quality of the ROV's video streams to what the link and the decoders can keep up with.
+
+The pilot's sliders set the most each stream may use. Each stream's quality backs off multiplicatively as soon as
+frames start going missing or queueing up on the way, and climbs back additively while they don't, leaving room on the
+tether for the control traffic.
+"""
+import time
+from typing import Callable, NamedTuple
+
+from config.video import VideoQualityConfig
+from io_systems.video_packets import VideoStats
+
+
+class VideoTargets(NamedTuple):
+    """What to ask the ROV to send a video stream at.
+
+    Attributes:
+        height (int): The height of the frames, in pixels.
+        fps (int): The frame rate.
+        quality (int): The JPEG quality, from 1 to 100.
+    """
+    height: int
+    fps: int
+    quality: int
+
+
+class _StreamState:
+    """How far a stream has backed off, and what its stats were at the last update."""
+
+    __slots__ = ("level", "scale", "frames_received", "frames_lost", "held_until", "scale_held_until")
+
+    def __init__(self) -> None:
+        self.level = 1.0
+        self.scale = 1.0
+        self.frames_received = 0
+        self.frames_lost = 0
+        self.held_until = 0
+        self.scale_held_until = 0
+
+
+class VideoQualityController:
+    """Sets the resolution, frame rate, and JPEG quality of each video stream from how well it's arriving, never going
+    past the pilot's limits.
+
+    Properties:
+        targets (dict[str, VideoTargets]):
+            What each stream was last asked for, by name.
+
+    Methods:
+        update() -> None:
+            Adjust each stream and send the ROV what it should send.
+        command_names(name: str) -> tuple[str, str, str]:
+            Get the commands a stream's targets are sent on.
+    """
+
+    def __init__(self, stats: Callable[[], dict[str, VideoStats]], limits: Callable[[], VideoTargets],
+                 publish: Callable[[dict[str, str | float]], None], config: VideoQualityConfig = VideoQualityConfig(),
+                 clock: Callable[[], int] = time.monotonic_ns) -> None:
+        """Initialize the VideoQualityController object.
+
+        Args:
+            stats (Callable[[], dict[str, VideoStats]]):
+                Gets how well each stream is arriving, by name, such as VideoHandler.stats.
+            limits (Callable[[], VideoTargets]):
+                Gets the most any stream may use, such as the dashboard's Height, FPS, and Quality sliders.
+            publish (Callable[[dict[str, str | float]], None]):
+                Sends commands to the ROV, such as ROVConnection.publish_commands.
+            config (VideoQualityConfig, optional):
+                How quickly to back off and recover.
+                Defaults to VideoQualityConfig().
+            clock (Callable[[], int], optional):
+                Gets the time in nanoseconds.
+                Defaults to time.monotonic_ns.
+        """
+        self._stats = stats
+        self._limits = limits
+        self._publish = publish
+        self._config = config
+        self._clock = clock
+
+        self._hold_ns = int(config.hold * 1_000_000_000)
+        self._states: dict[str, _StreamState] = {}
+        self._targets: dict[str, VideoTargets] = {}
+
+    @property
+    def targets(self) -> dict[str, VideoTargets]:
+        """What each stream was last asked for, by name."""
+        return self._targets
+
+    @staticmethod
+    def command_names(name: str) -> tuple[str, str, str]:
+        """Get the commands a stream's targets are sent on. The ROV listens for them under PC/commands.
+
+        Args:
+            name (str):
+                The name of the stream.
+
+        Returns:
+            tuple[str, str, str]: The commands for the height, frame rate, and JPEG quality.
+        """
+        return f"video/{name}/height", f"video/{name}/fps", f"video/{name}/quality"
+
+    def update(self) -> None:
+        """Adjust each stream from its stats since the last update, and send the ROV what it should send."""
+        config = self._config
+        limits = self._limits()
+        now = self._clock()
+
+        commands = {}
+        for name, stats in self._stats().items():
+            state = self._states.get(name)
+            if state is None:
+                state = self._states[name] = _StreamState()
+
+            received = stats.frames_received - state.frames_received
+            lost = stats.frames_lost - state.frames_lost
+            state.frames_received = stats.frames_received
+            state.frames_lost = stats.frames_lost
+
+            # Nothing to go by if no frames have come or gone, such as before the ROV starts sending.
+            if received + lost > 0:
+                congested = (
+                    lost / (received + lost) > config.loss_threshold
+                    or stats.reassembly_p95_ms > config.reassembly_limit_ms
+                    or (config.max_kbps is not None and stats.throughput_kbps > config.max_kbps)
+                )
+                state.level, state.held_until = self._step(state.level, state.held_until, congested, now)
+                state.scale, state.scale_held_until = self._step(
+                    state.scale, state.scale_held_until, stats.decode_p95_ms > config.decode_budget_ms, now
+                )
+
+            targets = VideoTargets(
+                _scaled(limits.height, state.scale, config.min_height),
+                _scaled(limits.fps, min(1.0, state.level / config.fps_knee), config.min_fps),
+                _scaled(limits.quality, state.level, config.min_quality),
+            )
+            self._targets[name] = targets
+            commands.update(zip(self.command_names(name), targets))
+
+        if commands:
+            self._publish(commands)
+
+    def _step(self, level: float, held_until: int, back_off: bool, now: int) -> tuple[float, int]:
+        """Back a level off multiplicatively or raise it additively, returning the level and when it's held until."""
+        if back_off:
+            if now < held_until:
+                return level, held_until
+            return max(self._config.min_level, level * self._config.backoff), now + self._hold_ns
+        return min(1.0, level + self._config.increase), held_until
+
+
+def _scaled(limit: float, fraction: float, minimum: int) -> int:
+    """Scale a limit down, keeping it at or above a minimum unless the limit itself is lower."""
+    return int(min(limit, max(minimum, round(limit * fraction))))
@@ -6,7 +6,7 @@ from typing import Callable
 from hardware.thruster_pwm import FrameThrusters
 from enums import Directions, ControllerAxisNames, ControllerButtonNames, ThrusterPositions
 import kinematics as kms
-from mavlink_flight_controller import FlightController
+from mavlink_flight_controller import FlightController, MAVLINK_RATES
 from controller_input import combine_triggers
 from io_systems.io_handler import IO
 from dashboard import Dashboard
@@ -32,6 +32,8 @@ class Manual(ControlMode):
             Shutdown the ROV.
     """
 
+    mavlink_rates = MAVLINK_RATES
+
     def __init__(self, frame: FrameThrusters, io: IO, kinematics: kms.Kinematics, flight_controller: FlightController,
                  dash: Dashboard, set_control_mode: Callable) -> None:
         """Initialize the Manual object.
@@ -77,11 +79,7 @@ class Manual(ControlMode):
 
         # mavlink = subscriptions["mavlink"]
 
-        mavlink = {}
-        for key, val in subscriptions.items():
-            path = key.split("/")
-            if path[1] == "mavlink":
-                mavlink[path[2]] = val
+        mavlink = self._io.mavlink_handler.mavlink_messages
 
         # Get the gyro data from the subscriptions if it exists.
         # if "imu" in i2c:
@@ -188,7 +186,7 @@ class Manual(ControlMode):
         stop = controller.buttons[ControllerButtonNames.B].toggled
 
         if controller.buttons[ControllerButtonNames.Y].just_pressed:
-            self._flight_controller.calibrate_gyro(self._io._mavlink)
+            self._flight_controller.calibrate_gyro(self._io.mavlink_handler)
 
         # # Calibrate the gyro if the Y button is pressed.
         # if controller.buttons[ControllerButtonNames.Y].just_pressed:
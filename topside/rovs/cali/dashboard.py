@@ -2,6 +2,7 @@ import cv2
 import tkinter as tk
 from PIL import Image, ImageTk
 from config.dashboard import DashboardConfig
+from utilities.rotation_cache import RotationCache
 
 
 class Dashboard(tk.Frame):
@@ -15,6 +16,7 @@ class Dashboard(tk.Frame):
         self.images = {}
 
         self.displays = {}
+        self.display_sizes = {}
 
         self._config = config
 
@@ -30,10 +32,11 @@ class Dashboard(tk.Frame):
         for i in self._config.images:
             self.put_image(i.name, i.row, i.column, i.width, i.height, i.filename, i.rspan, i.cspan)
 
-        self.pack()
         # Cameras
-        # self.put_display("frame0", 1, 0, rspan=5)
-        # self.put_display("frame1", 6, 0, rspan=5)
+        for i in self._config.displays:
+            self.put_display(i.name, i.row, i.column, i.width, i.height, i.rspan, i.cspan)
+
+        self.pack()
 
     def put_scale(self, name, row, column, min_, max_, default, rspan=1, cspan=1):
         scale = tk.Scale(self, from_=min_, to=max_, orient=tk.HORIZONTAL, length=300)
@@ -91,34 +94,48 @@ class Dashboard(tk.Frame):
         image = Image.open(filename)
         image.thumbnail((width, height), Image.LANCZOS)
 
-        tkimage = ImageTk.PhotoImage(image)
+        # Each turn of the image is rendered once and reused, rather than rendered again every frame.
+        rotations = RotationCache(
+            lambda angle: ImageTk.PhotoImage(image.rotate(angle, expand=True)),
+            self._config.rotation_resolution,
+            None if self._config.prerender_rotations else self._config.rotation_cache_size,
+        )
+        if self._config.prerender_rotations:
+            rotations.prerender()
 
-        image_id = canvas.create_image(coord, coord, image=tkimage)
+        step = rotations.step(0)
+        image_id = canvas.create_image(coord, coord, image=rotations.get_step(step))
 
-        self.images[name] = (image, tkimage, image_id, coord, canvas)
+        self.images[name] = (rotations, step, image_id, canvas)
 
     def rotate_image(self, name, angle):
-        image, tkimage, image_id, coord, canvas = self.images[name]
-        tkimage = ImageTk.PhotoImage(image.rotate(angle, expand=True))
-        canvas.delete(image_id)
-        image_id = canvas.create_image(coord, coord, image=tkimage)
-        self.images[name] = (image, tkimage, image_id, coord, canvas)
-
-    def put_display(self, name, row, column, rspan=1, cspan=1):
-        display = tk.Label(self)
+        rotations, step, image_id, canvas = self.images[name]
+
+        # Angles too close to tell apart on screen snap to the same step, so there's nothing to redraw.
+        new_step = rotations.step(angle)
+        if new_step == step:
+            return
+
+        canvas.itemconfig(image_id, image=rotations.get_step(new_step))
+        self.images[name] = (rotations, new_step, image_id, canvas)
+
+    def put_display(self, name, row, column, width, height, rspan=1, cspan=1):
+        # The image is made once and pasted over with each frame.
+        imgtk = ImageTk.PhotoImage("RGB", (width, height))
+
+        display = tk.Label(self, image=imgtk)
+        display.imgtk = imgtk
         display.grid(row=row, column=column, rowspan=rspan, columnspan=cspan)
 
         self.displays[name] = display
+        self.display_sizes[name] = (width, height)
 
     def update_display(self, name, frame):
-        display = self.displays[name]
-        frame = cv2.flip(frame, 1)
-        cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-        img = Image.fromarray(cv2image)
-        imgtk = ImageTk.PhotoImage(image=img)
-        display.imgtk = imgtk
-        display.configure(image=imgtk)
-        self.displays[name] = display
+        # Frames arrive decoded to RGB, so only the smaller displays have anything left to do.
+        width, height = self.display_sizes[name]
+        if frame.shape[0] != height or frame.shape[1] != width:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        self.displays[name].imgtk.paste(Image.fromarray(frame))
 
     def update_images(self, images: dict[str, float]):
         for name, value in images.items():
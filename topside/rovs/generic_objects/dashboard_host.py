@@ -0,0 +1,368 @@
+"""Keeps the Tkinter dashboard's work out of the control loop.
+
+The control loop never touches Tkinter. It writes what it wants shown into a DashboardSnapshot, which has the same
+methods as the Dashboard that the control modes and ROVs use, and the DashboardHost copies the latest snapshot onto the
+real dashboard at the dashboard's own rate. Only the newest value of each image and label is kept, so a slow dashboard
+never makes the control loop wait or queue work up. Video frames skip the control loop altogether: the host takes the
+latest decoded frame of each stream straight from the video receivers, and reports each frame it shows so its age can
+be recorded.
+
+The host can run the dashboard in one of three ways:
+    "inline":
+        On the main thread, in the main loop's dashboard stage.
+    "thread":
+        On a thread of its own, which owns the Tkinter root and refreshes it at the dashboard rate.
+    "disabled":
+        Not at all. No window is opened, which suits benchmarks and machines without a display.
+"""
+import threading
+import time
+from typing import Any, Callable, Literal
+
+import tkinter as tk
+
+from config.dashboard import DashboardConfig, MAIN_DISPLAY
+from io_systems.video_packets import DecodedFrame
+
+
+class DashboardSnapshot:
+    """The latest values the control loop wants shown on the dashboard, and the latest values typed into the
+    dashboard. Safe to use from the control loop while the dashboard reads it from another thread.
+
+    Properties:
+        labels (frozenset[str]):
+            The names of the dashboard's labels.
+        selected_stream (str | None):
+            The video stream to show on the main display.
+
+    Methods:
+        update_images(images: dict[str, float]) -> None:
+            Set the angles to rotate images to.
+        set_label(name: str, text: str) -> None:
+            Set the text of a label.
+        get_entry(name: str, default: Any) -> Any:
+            Get the latest value of an entry.
+        get_scale(name: str) -> float:
+            Get the latest value of a slider bar.
+        take() -> tuple[dict[str, float], dict[str, str]]:
+            Take the images and labels that have changed since the last take.
+        publish_inputs(entries: dict[str, Any], scales: dict[str, float]) -> None:
+            Store the latest values of the dashboard's entries and slider bars.
+        select_stream(name: str) -> None:
+            Show a video stream on the main display.
+    """
+
+    def __init__(self, config: DashboardConfig | None = None) -> None:
+        """Initialize the DashboardSnapshot object.
+
+        Args:
+            config (DashboardConfig | None, optional):
+                The dashboard's configuration, for the names of its labels and the defaults of its slider bars.
+                Defaults to None, a dashboard with nothing on it.
+        """
+        self._lock = threading.Lock()
+        self._images: dict[str, float] = {}
+        self._label_texts: dict[str, str] = {}
+
+        self._labels = frozenset(label.name for label in config.labels) if config is not None else frozenset()
+        self._entries: dict[str, Any] = {}
+        self._scales: dict[str, float] = (
+            {scale.name: scale.default for scale in config.scales} if config is not None else {}
+        )
+        self._selected_stream: str | None = None
+
+    @property
+    def labels(self) -> frozenset[str]:
+        """The names of the dashboard's labels."""
+        return self._labels
+
+    @property
+    def selected_stream(self) -> str | None:
+        """The video stream to show on the main display, or None for the first one."""
+        return self._selected_stream
+
+    def select_stream(self, name: str) -> None:
+        """Show a video stream on the main display. Can be called from the control loop or the dashboard.
+
+        Args:
+            name (str):
+                The name of the stream.
+        """
+        self._selected_stream = name
+
+    def update_images(self, images: dict[str, float]) -> None:
+        """Set the angles to rotate images to.
+
+        Args:
+            images (dict[str, float]):
+                The angle of each image, in degrees.
+        """
+        with self._lock:
+            self._images.update(images)
+
+    def set_label(self, name: str, text: str) -> None:
+        """Set the text of a label.
+
+        Args:
+            name (str):
+                The name of the label.
+            text (str):
+                The text to show.
+        """
+        with self._lock:
+            self._label_texts[name] = text
+
+    def get_entry(self, name: str, default: Any) -> Any:
+        """Get the latest value of an entry, as converted by the entry's converter.
+
+        Args:
+            name (str):
+                The name of the entry.
+            default (Any):
+                The value to return if the entry is empty or doesn't hold a valid value.
+
+        Returns:
+            Any: The value of the entry.
+        """
+        value = self._entries.get(name)
+        return default if value is None else value
+
+    def get_scale(self, name: str) -> float:
+        """Get the latest value of a slider bar.
+
+        Args:
+            name (str):
+                The name of the slider bar.
+
+        Returns:
+            float: The value of the slider bar.
+        """
+        return self._scales[name]
+
+    def take(self) -> tuple[dict[str, float], dict[str, str]]:
+        """Take the images and labels that have changed since the last take. Used by the DashboardHost.
+
+        Returns:
+            tuple[dict[str, float], dict[str, str]]: The angle of each changed image and the text of each changed label.
+        """
+        with self._lock:
+            images, self._images = self._images, {}
+            label_texts, self._label_texts = self._label_texts, {}
+        return images, label_texts
+
+    def publish_inputs(self, entries: dict[str, Any], scales: dict[str, float]) -> None:
+        """Store the latest values of the dashboard's entries and slider bars. Used by the DashboardHost.
+
+        Args:
+            entries (dict[str, Any]):
+                The converted value of each entry, or None if it doesn't hold a valid value.
+            scales (dict[str, float]):
+                The value of each slider bar.
+        """
+        # Swapping in new dictionaries is atomic, so readers don't need the lock.
+        self._entries = entries
+        self._scales = {**self._scales, **scales}
+
+
+class DashboardHost:
+    """Runs the dashboard inline, on a thread of its own, or not at all, feeding it from a DashboardSnapshot.
+
+    Properties:
+        snapshot (DashboardSnapshot):
+            The snapshot for the control loop to write to in place of the dashboard.
+        mode (Literal["inline", "thread", "disabled"]):
+            How the dashboard is run.
+
+    Methods:
+        start() -> None:
+            Open the dashboard.
+        update() -> None:
+            Refresh the dashboard when it runs inline.
+        stop() -> None:
+            Close the dashboard.
+    """
+
+    def __init__(self, make_dashboard: Callable[[tk.Tk], Any], config: DashboardConfig,
+                 mode: Literal["inline", "thread", "disabled"] = "inline", rate: float = 30,
+                 title: str = "ROV monitor",
+                 video_sources: dict[str, Callable[[], DecodedFrame | None]] | None = None,
+                 on_frame_shown: Callable[[str, DecodedFrame], None] | None = None) -> None:
+        """Initialize the DashboardHost object.
+
+        Args:
+            make_dashboard (Callable[[tk.Tk], Dashboard]):
+                Builds the dashboard in a Tkinter root. It is called on the thread the dashboard runs on.
+            config (DashboardConfig):
+                The dashboard's configuration.
+            mode (Literal["inline", "thread", "disabled"], optional):
+                How to run the dashboard.
+                Defaults to "inline".
+            rate (float, optional):
+                How many times a second the dashboard thread refreshes the dashboard, in Hz. When inline, the main
+                loop's dashboard stage sets the rate instead.
+                Defaults to 30.
+            title (str, optional):
+                The title of the window.
+                Defaults to "ROV monitor".
+            video_sources (dict[str, Callable[[], DecodedFrame | None]] | None, optional):
+                Gets the latest decoded frame of each video stream, by name, such as UDPSocket.latest. Each stream is
+                shown on the display of the same name, and the selected one on the main display too. Clicking a
+                stream's display selects it.
+                Defaults to None, no video.
+            on_frame_shown (Callable[[str, DecodedFrame], None] | None, optional):
+                Called with the stream's name and the frame once for each new frame shown, on the thread the dashboard
+                runs on, such as VideoHandler.frame_shown.
+                Defaults to None.
+        """
+        if mode not in ("inline", "thread", "disabled"):
+            raise ValueError(f"Unknown dashboard mode: {mode}")
+
+        self._make_dashboard = make_dashboard
+        self._mode = mode
+        self._period = 1 / rate
+        self._title = title
+
+        self._snapshot = DashboardSnapshot(config)
+
+        self._video_sources = video_sources or {}
+        self._on_frame_shown = on_frame_shown
+        # The stream and frame id each display shows, so unchanged frames aren't drawn again.
+        self._shown: dict[str, tuple[str, int | None]] = {}
+        # The id of the last frame of each stream reported as shown.
+        self._reported: dict[str, int] = {}
+
+        self._root: tk.Tk | None = None
+        self._dashboard = None
+
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._error: BaseException | None = None
+
+    @property
+    def snapshot(self) -> DashboardSnapshot:
+        """The snapshot for the control loop to write to in place of the dashboard."""
+        return self._snapshot
+
+    @property
+    def mode(self) -> str:
+        """How the dashboard is run, "inline", "thread", or "disabled"."""
+        return self._mode
+
+    def start(self) -> None:
+        """Open the dashboard. When it runs on a thread, this waits until the window is up."""
+        if self._mode == "inline":
+            self._build()
+        elif self._mode == "thread":
+            self._stop_event.clear()
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="Dashboard", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            self._raise_error()
+
+    def update(self) -> None:
+        """Refresh the dashboard when it runs inline. Otherwise, check that the dashboard thread is still going."""
+        if self._mode == "inline":
+            self._refresh()
+        else:
+            self._raise_error()
+
+    def stop(self) -> None:
+        """Close the dashboard."""
+        if self._mode == "inline" and self._root is not None:
+            self._root.destroy()
+            self._root = None
+        elif self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _build(self) -> None:
+        """Open the window and build the dashboard in it, on the thread the dashboard runs on."""
+        self._root = tk.Tk()
+        self._root.wm_title(self._title)
+        self._dashboard = self._make_dashboard(self._root)
+        self._shown = {}
+
+        # Clicking a stream's display shows it on the main display.
+        for name in self._video_sources:
+            if name in self._dashboard.displays:
+                self._dashboard.displays[name].bind(
+                    "<Button-1>", lambda event, name=name: self._snapshot.select_stream(name)
+                )
+
+    def _refresh(self) -> None:
+        """Copy the snapshot onto the dashboard, read back what has been typed into it, and let Tkinter redraw."""
+        images, label_texts = self._snapshot.take()
+        if images:
+            self._dashboard.update_images(images)
+        for name, text in label_texts.items():
+            self._dashboard.set_label(name, text)
+
+        self._snapshot.publish_inputs(
+            {name: self._dashboard.get_entry(name, None) for name in self._dashboard.entries},
+            {name: self._dashboard.get_scale(name) for name in self._dashboard.scales},
+        )
+
+        if self._video_sources:
+            self._refresh_video()
+
+        self._root.update()
+
+    def _refresh_video(self) -> None:
+        """Draw the frames that have changed since the last refresh on their displays."""
+        selected = self._snapshot.selected_stream
+        if selected not in self._video_sources:
+            selected = next(iter(self._video_sources))
+
+        displays = self._dashboard.displays
+        for name, latest in self._video_sources.items():
+            targets = [display for display in (name, MAIN_DISPLAY if name == selected else None) if display in displays]
+            if not targets:
+                continue
+
+            frame = latest()
+            if frame is None:
+                continue
+
+            shown = False
+            for display in targets:
+                if self._shown.get(display) != (name, frame.frame_id):
+                    self._dashboard.update_display(display, frame.image)
+                    self._shown[display] = (name, frame.frame_id)
+                    shown = True
+
+            # A frame is reported once, however many displays it's on, and again only once it has changed.
+            if shown and self._on_frame_shown is not None and self._reported.get(name) != frame.frame_id:
+                self._on_frame_shown(name, frame)
+                self._reported[name] = frame.frame_id
+
+    def _run(self) -> None:
+        """Build and refresh the dashboard at its rate until stopped. Everything Tkinter happens on this thread."""
+        try:
+            self._build()
+            self._ready.set()
+
+            deadline = time.monotonic()
+            while not self._stop_event.is_set():
+                self._refresh()
+
+                # Skip refreshes that are already late rather than running them back to back.
+                deadline += self._period
+                now = time.monotonic()
+                if now > deadline:
+                    deadline = now
+                self._stop_event.wait(deadline - now)
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._ready.set()
+            if self._root is not None:
+                self._root.destroy()
+                self._root = None
+
+    def _raise_error(self) -> None:
+        """Raise an error from the dashboard thread in the thread that asked about it."""
+        if self._error is not None:
+            raise RuntimeError("The dashboard thread stopped") from self._error
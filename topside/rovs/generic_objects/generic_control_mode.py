@@ -9,6 +9,12 @@ from kinematics import Kinematics
 class ControlMode:
     """The ControlMode class is the base class for all control modes.
 
+    Attributes:
+        mavlink_rates (dict[str, float]):
+            The MAVLink message types the control mode reads, by type name, with how many times a second it needs
+            each, in Hz. While the control mode is active, the flight controller is asked to send them at least that
+            often.
+
     Methods:
         update() -> None:
             Update the control mode.
@@ -16,6 +22,8 @@ class ControlMode:
             Shutdown the control mode.
     """
 
+    mavlink_rates: dict[str, float] = {}
+
     def __init__(self, frame: FrameThrusters, io: IO, kinematics: Kinematics, set_control_mode: Callable,
                  dash: Dashboard) -> None:
         """Initialize the Manual object.
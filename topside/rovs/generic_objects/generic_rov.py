@@ -17,7 +17,15 @@ class GenericROV:
         self._io: IO = io
 
     def loop(self) -> None:
-        """Run the ROV."""
+        """Run the ROV. Called at the control rate."""
+        pass
+
+    def update_dashboard(self) -> None:
+        """Redraw the dashboard. Called at the dashboard rate."""
+        pass
+
+    def update_telemetry(self) -> None:
+        """Do any slower telemetry work. Called at the telemetry rate."""
         pass
 
     def shutdown(self) -> None:
@@ -10,7 +10,7 @@ import kinematics as kms
 from controller_input import combine_triggers
 from io_systems.io_handler import IO
 from dashboard import Dashboard
-from mavlink_flight_controller import FlightController
+from mavlink_flight_controller import FlightController, MAVLINK_RATES
 
 from utilities.vector import Vector3
 
@@ -31,6 +31,8 @@ class PIDTuning(ControlMode):
             Shutdown the ROV.
     """
 
+    mavlink_rates = MAVLINK_RATES
+
     def __init__(self, frame: FrameThrusters, io: IO, kinematics: kms.Kinematics, flight_controller: FlightController,
                  dash: Dashboard, set_control_mode: Callable) -> None:
         """Initialize the Manual object.
@@ -103,11 +105,7 @@ class PIDTuning(ControlMode):
         # i2c = self._io.i2c_handler.i2cs
 
         # mavlink = subscriptions["mavlink"]
-        mavlink = {}
-        for key, val in subscriptions.items():
-            path = key.split("/")
-            if path[1] == "mavlink":
-                mavlink[path[2]] = val
+        mavlink = self._io.mavlink_handler.mavlink_messages
 
         # Get the gyro data from the subscriptions if it exists.
         # if "imu" in i2c:
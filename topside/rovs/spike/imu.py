@@ -135,6 +135,8 @@ class IMU:
         """
         imu.sending_vals[self._imu_config.gyro_init_register] = self._imu_config.gyro_init_value
         imu.sending_vals[self._imu_config.accel_init_register] = self._imu_config.accel_init_value
+        # The registers are written in place, so the I2C has to be told it changed for them to be sent.
+        imu.mark_dirty()
 
     def calibrate_gyro(self) -> None:
         """Re-centers the gyroscope values. WARNING: Can cause unintended effects
@@ -1,14 +1,21 @@
 import math
+from concurrent.futures import Future
+from typing import Any
 
 from config.flight_controller import FlightControllerConfig
 from io_systems.mavlink_handler import MavlinkHandler
 from enums import MavlinkMessageTypes
 
-from wpimath.geometry import Quaternion
-from pymavlink import mavextra, mavexpression, rotmat
+from pymavlink import rotmat
 
+from utilities.attitude import Attitude
 from utilities.vector import Vector3
-from utilities.math_help.shared import wrap_angle
+
+# The flight controller only acknowledges a calibration once it has finished, in seconds.
+CALIBRATION_TIMEOUT = 30.0
+
+# The message types update reads, with how many times a second it needs each, in Hz. It's updated at the control rate.
+MAVLINK_RATES = {"ATTITUDE": 100, "ATTITUDE_QUATERNION": 100, "SCALED_IMU": 100}
 
 
 class FlightController:
@@ -24,32 +31,31 @@ class FlightController:
         self._flight_controller_config = flight_controller_config
 
 
-        self._attitude_quat = Quaternion(0, 0, 0, 0)
+        # The attitude from the newest ATTITUDE_QUATERNION message, and that message, so each is only converted once.
+        self._attitude_quat = Attitude()
+        self._attitude_quat_message: Any = None
         self._attitude = rotmat.Vector3(x=0, y=0, z=0)  # radians
         self._attitude_speed = Vector3(yaw=0, pitch=0, roll=0)  # rad/s
         self._lateral_accel = rotmat.Vector3(x=0, y=0, z=0)  # mG
         self._compass = rotmat.Vector3(x=0, y=0, z=0)  # mGauss
-        self._dcm_state = mavextra.DCM_State(roll=0, pitch=0, yaw=0)
 
-        self._currently_calibrating = False
+        # The calibration command in progress, which settles once the flight controller acknowledges it.
+        self._calibration: Future | None = None
 
-    #TODO: fix this so it is irrespective of the order that the quaternion is in
     @property
     def attitude(self) -> Vector3:
-        attitude = []
-        quat = self._attitude_quat.toRotationVector()
-        for q in quat:
-            attitude.append(q)
-        return Vector3(yaw=attitude[0], pitch=attitude[1], roll=attitude[2])
-        # return Vector3(roll=self._dcm_state.roll, pitch=self._dcm_state.pitch, yaw=self._dcm_state.yaw)
+        """The yaw, pitch, and roll from the newest attitude quaternion, in radians. Shared between reads until the
+        next quaternion arrives, so copy it to change it."""
+        return self._attitude_quat.euler
 
     @property
     def attitude_speed(self):
         return self._attitude_speed
 
     @property
-    def attitude_quat(self) -> Quaternion:
-        return self._attitude_quat
+    def attitude_quat(self) -> tuple[float, float, float, float]:
+        """The newest attitude quaternion, as w, x, y, and z."""
+        return self._attitude_quat.quaternion
 
     @property
     def attitude_quat_speed(self):
@@ -64,84 +70,88 @@ class FlightController:
         return self._compass
 
     @property
-    def currently_calibrating(self):
-        return self._currently_calibrating
+    def currently_calibrating(self) -> bool:
+        """Whether a calibration has been sent and not yet acknowledged or given up on."""
+        return self._calibration is not None and not self._calibration.done()
 
     def initialize_flight_controller(self, mavlink: MavlinkHandler) -> None:
-        mavlink.mavlink_commands = self._flight_controller_config.initial_commands
+        for command, parameters in self._flight_controller_config.initial_commands.items():
+            mavlink.add_command(command, parameters)
 
-    def update(self, messages: dict[str, dict]) -> None:
+    def update(self, messages: dict[str, Any]) -> None:
         """Update the flight controller with the latest messages.
 
         Args:
-            messages (dict[str, dict]):
-                The messages from the mavlink handler.
+            messages (dict[str, Any]):
+                The newest message of each type from the mavlink handler, with its fields as attributes.
         """
         if "ATTITUDE" in messages:
             att = messages["ATTITUDE"]
-            self._dcm_state.roll = att["roll"]
-            self._dcm_state.yaw = att["yaw"]
-
             self._attitude = rotmat.Vector3(
-                x=att["yaw"], z=att["pitch"],
-                y=att["roll"]
+                x=att.yaw, z=att.pitch,
+                y=att.roll
             )
             self._attitude_speed = rotmat.Vector3(
-                x=att["yawspeed"], z=att["pitchspeed"], y=att["rollspeed"]
+                x=att.yawspeed, z=att.pitchspeed, y=att.rollspeed
             )
 
         if "ATTITUDE_QUATERNION" in messages:
             attq = messages["ATTITUDE_QUATERNION"]
 
-            self._attitude_quat = Quaternion(
-                w=attq["q1"], x=attq["q2"], y=attq["q3"], z=attq["q4"]
-            )
+            if attq is not self._attitude_quat_message:
+                self._attitude_quat_message = attq
+                self._attitude_quat.set_quaternion(attq.q1, attq.q2, attq.q3, attq.q4)
             self._attitude_speed = rotmat.Vector3(
-                y=attq["rollspeed"], x=attq["yawspeed"], z=attq["pitchspeed"]
+                y=attq.rollspeed, x=attq.yawspeed, z=attq.pitchspeed
             )
 
         if "SCALED_IMU" in messages:
             s_i = messages["SCALED_IMU"]
             self._lateral_accel = rotmat.Vector3(
-                s_i["xacc"], s_i["yacc"], s_i["zacc"]
+                s_i.xacc, s_i.yacc, s_i.zacc
             )
             self._compass = rotmat.Vector3(
-                s_i["xmag"], s_i["ymag"], s_i["zmag"]
+                s_i.xmag, s_i.ymag, s_i.zmag
             )
 
-        self._dcm_state.update(gyro=self._attitude, accel=self._lateral_accel, mag=self._compass, GPS=0)
-
 
     def calibrate_gyro(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the gyroscope.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
+        if not self.currently_calibrating:
             mavlink.add_command(int(MavlinkMessageTypes.MAV_CMD_DO_SET_MODE.value), (0, 0, 0, 0, 0, 0, 0))
             # mavlink.mavlink_commands[MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION] = (1, 0, 0, 0, 0, 0, 0)
-            mavlink.add_command(int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value), (1, 0, 0, 0, 0, 0, 0))
+            self._calibrate(mavlink, (1, 0, 0, 0, 0, 0, 0))
 
     def calibrate_accelerometer(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the accelerometer.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
+        if not self.currently_calibrating:
             # mavlink.mavlink_commands[int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value)] = (0, 0, 0, 0, 1, 0, 0)
-            mavlink.add_command(int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value), (0, 0, 0, 0, 1, 0, 0))
+            self._calibrate(mavlink, (0, 0, 0, 0, 1, 0, 0))
 
     def calibrate_compass(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the compass.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
+        if not self.currently_calibrating:
             # mavlink.mavlink_commands[int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value)] = (0, 1, 0, 0, 0, 0, 0)
-            mavlink.add_command(int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value), (0, 1, 0, 0, 0, 0, 0))
+            self._calibrate(mavlink, (0, 1, 0, 0, 0, 0, 0))
+
+    def _calibrate(self, mavlink: MavlinkHandler, parameters: tuple[int, int, int, int, int, int, int]) -> None:
+        """Send a calibration command. It isn't sent again, as the flight controller would start over."""
+        self._calibration = mavlink.add_command(
+            int(MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION.value), parameters,
+            timeout=CALIBRATION_TIMEOUT, retries=0,
+        )
@@ -1,7 +1,10 @@
+import time
 import tkinter as tk
 
 from hardware.thruster_pwm import ThrusterPWM, FrameThrusters
 from io_systems.io_handler import IO
+from io_systems.stream_rates import StreamRateManager
+from io_systems.video_quality import VideoQualityController, VideoTargets
 
 from rov_config import ROVConfig
 from dashboard import Dashboard
@@ -13,6 +16,7 @@ from mavlink_flight_controller import FlightController
 from control_modes import *
 
 from rovs.generic_objects.generic_control_mode import ControlMode
+from rovs.generic_objects.dashboard_host import DashboardHost, DashboardSnapshot
 
 from rovs.generic_objects.generic_rov import GenericROV
 
@@ -36,23 +40,52 @@ class ROV(GenericROV):
         # self._imu: IMU = IMU(self._config.imu_config)
         self._flight_controller: FlightController = FlightController(self._config.flight_controller_config)
 
-        # Tkinter GUI.
-        self.root: tk.Tk = tk.Tk()
-        self.root.wm_title("ROV monitor")
-        self._dash: Dashboard = Dashboard(self.root, self._config.dash_config)
-
-        # Mavlink connection.
-        self._mavlink_interval_ns: int = config.mavlink_interval
-
-        self._io.rov_comms.publish_mavlink_data_request(
-            {val: self._mavlink_interval_ns for val in self._config.mavlink_subscriptions.values()}
+        # Tkinter GUI. The control modes draw on a snapshot, which the host copies onto the dashboard at the dashboard
+        # rate, so the control loop never waits on Tkinter. Video frames go from the receivers straight to the
+        # dashboard and never pass through the control loop at all. The dashboard reports each frame it shows, so the
+        # video's age can be shown too.
+        video_sources = {}
+        on_frame_shown = None
+        if self._io.rov_video is not None:
+            video_sources = {name: stream.latest for name, stream in self._io.rov_video.streams.items()}
+            on_frame_shown = self._io.rov_video.frame_shown
+        self._dashboard_host: DashboardHost = DashboardHost(
+            self._make_dashboard, self._config.dash_config, self._config.dashboard_mode,
+            self._config.loop_config.dashboard_rate, video_sources=video_sources, on_frame_shown=on_frame_shown,
+        )
+        self._dash: DashboardSnapshot = self._dashboard_host.snapshot
+        self._dashboard_host.start()
+
+        # Video quality. The dashboard's sliders set the most each stream may use, and the controller backs off from
+        # there while the link is congested.
+        self._video_quality: VideoQualityController | None = None
+        if self._io.rov_video is not None:
+            self._video_quality = VideoQualityController(
+                self._io.rov_video.stats, self._video_limits, self._io.rov_comms.publish_commands,
+                self._config.video_quality,
+            )
+
+        # Loop timing. The profile on the dashboard is refreshed less often than the dashboard itself because working
+        # out the percentiles isn't free.
+        self._control_mode_span = self._io.profiler.span("control_mode.loop")
+        self._dashboard_span = self._io.profiler.span("dashboard.update")
+        self._profile_refresh_ns: int = 500_000_000
+        self._next_profile_refresh: int = 0
+
+        # Mavlink connection. The flight controller is asked for each subscribed message type as often as the control
+        # mode reads it, the rest at the idle rate, and again for any that arrive too slowly.
+        self._stream_rates: StreamRateManager = StreamRateManager(
+            self._config.mavlink_subscriptions, self._io.rov_comms.publish_mavlink_data_request,
+            self._io.mavlink_handler.histories, self._config.stream_rates,
         )
 
         # Configure thrusters.
         for position, thruster_config in self._config.thruster_configs.items():
             self._thrusters[position] = ThrusterPWM(thruster_config)
 
-        self._frame: FrameThrusters = FrameThrusters(self._thrusters)
+        self._frame: FrameThrusters = FrameThrusters(
+            self._thrusters, self._config.thrust_allocation, self._io.profiler
+        )
 
         # Set up control modes.
         self._control_mode_dict: dict[ControlModeNames: ControlMode] = {
@@ -72,6 +105,33 @@ class ROV(GenericROV):
 
         # change default control mode here
         self._control_mode: ControlMode = self._control_mode_dict[ControlModeNames.MANUAL]
+        self.set_control_mode(self._control_mode)
+
+    def _make_dashboard(self, root: tk.Tk) -> Dashboard:
+        """Build the dashboard. Called by the dashboard host on the thread the dashboard runs on.
+
+        Args:
+            root (tk.Tk):
+                The window to build the dashboard in.
+
+        Returns:
+            Dashboard: The dashboard.
+        """
+        dash = Dashboard(root, self._config.dash_config)
+        for name in ("Profile", "Video"):
+            if name in dash.labels:
+                dash.labels[name].config(font="TkFixedFont", justify=tk.LEFT)
+        return dash
+
+    def _video_limits(self) -> VideoTargets:
+        """Get the most any video stream may use from the dashboard's sliders.
+
+        Returns:
+            VideoTargets: The highest height, frame rate, and JPEG quality.
+        """
+        return VideoTargets(
+            int(self._dash.get_scale("Height")), int(self._dash.get_scale("FPS")), int(self._dash.get_scale("Quality"))
+        )
 
     def set_control_mode(self, control_mode: ControlModeNames | ControlMode) -> None:
         """Set the current control mode of the ROV.
@@ -85,14 +145,41 @@ class ROV(GenericROV):
         else:
             self._control_mode = self._control_mode_dict[control_mode]
 
+        # Only the message types the new control mode reads are needed at more than the idle rate.
+        self._stream_rates.declare("control_mode", self._control_mode.mavlink_rates)
+        self._stream_rates.activate("control_mode")
+
     def loop(self) -> None:
         """Update the io system and loop the control mode."""
         self._io.update()
-        self._control_mode.loop()
-        self.root.update()
+        with self._control_mode_span:
+            self._control_mode.loop()
+
+    def update_dashboard(self) -> None:
+        """Refresh the profile and the video's age on the dashboard and, when the dashboard runs inline, redraw it."""
+        now = time.monotonic_ns()
+        if now >= self._next_profile_refresh:
+            if "Profile" in self._dash.labels:
+                self._dash.set_label("Profile", self._io.profiler.report())
+            if "Video" in self._dash.labels and self._io.rov_video is not None:
+                self._dash.set_label("Video", self._io.rov_video.summary())
+            self._next_profile_refresh = now + self._profile_refresh_ns
+
+        with self._dashboard_span:
+            self._dashboard_host.update()
+
+    def update_telemetry(self) -> None:
+        """Keep the clocks synced with the ROV, adjust the video quality to how well the video is arriving, and ask the
+        flight controller for the MAVLink messages that are due. Called at the telemetry rate."""
+        if self._io.rov_video is not None:
+            self._io.rov_video.update()
+        if self._video_quality is not None:
+            self._video_quality.update()
+        self._stream_rates.update()
 
     def shutdown(self) -> None:
         """Shutdown the ROV hardware."""
         # TODO: Implement this method further.
         self._control_mode.shutdown()
+        self._dashboard_host.stop()
         print("ROV shutdown complete.")
@@ -16,6 +16,11 @@ from config.pid import PIDConfig
 from config.imu import IMUConfig
 from config.dashboard import *
 from config.flight_controller import FlightControllerConfig
+from config.input_sampler import InputSamplerConfig
+from config.loop import LoopConfig
+from config.mavlink import MavlinkConfig, StreamRateConfig
+from config.thrust_allocation import ThrustAllocationConfig
+from config.video import VideoConfig, VideoQualityConfig
 
 from utilities.vector import Vector3
 
@@ -31,6 +36,22 @@ class ROVConfig:
         self.comms_port = 1883
         self.video_port = 5600
 
+        # How pin values are sent to the ROV. "topics" sends every value on its own topic, "frame" batches all changed
+        # pins into a single binary message. The ROV must be listening on PC/pin_frame to use "frame".
+        self.pin_publish_mode = "topics"
+
+        # How often the main loop runs each of its stages, in Hz.
+        self.loop_config = LoopConfig(control_rate=100, dashboard_rate=30, telemetry_rate=10)
+
+        # How the dashboard runs. "inline" redraws it in the main loop's dashboard stage, "thread" runs it on a thread
+        # of its own at the dashboard rate, and "disabled" doesn't open it at all, for benchmarks and machines without
+        # a display.
+        self.dashboard_mode = "inline"
+
+        # A directory to record the controller readings and sensor data of every frame to, so the session can be played
+        # back later, for example with benchmarks/replay_benchmark.py. None turns recording off.
+        self.session_log_dir: str | None = None
+
         self.rov_dir = os.path.dirname(os.path.realpath(__file__))
 
         # TODO: This is where you change the IP. It needs to be the local IP for remote stuff to connect.
@@ -43,6 +64,19 @@ class ROVConfig:
         self.host_ip = ip_addr
         # self.host_ip = "192.168.2.3"
 
+        # The video streams from the ROV, by name. Each is shown on the dashboard display of the same name, and the
+        # selected one on the main display as well. The ROV sends each stream to its own port.
+        self.video_configs: dict[str, VideoConfig] = {
+            "frame0": VideoConfig(self.host_ip, self.video_port),
+            "frame1": VideoConfig(self.host_ip, self.video_port + 1),
+        }
+        # How many frames can decode at once, across every stream. None uses a thread per stream, up to the number of
+        # cores.
+        self.video_decode_workers: int | None = None
+        # How the video quality backs off when the link is congested. The dashboard's Height, FPS, and Quality sliders
+        # set the most each stream may use.
+        self.video_quality = VideoQualityConfig()
+
         ### CONTROLLERS ###
 
         # Put specific settings for each axis/button here. I recommend using a second set of dictionaries for a second
@@ -74,6 +108,12 @@ class ROVConfig:
             enums.ControllerNames.PRIMARY_DRIVER: controller.Controller(0, self.buttons, self.axes, self.hats),
         }
 
+        # How the controllers are read. "events" only updates the inputs that pygame reports a change for, "polling"
+        # reads every input of every controller each frame, and "sampled" reads them on a thread of its own at the
+        # sampler's rate so that taps shorter than a frame aren't missed.
+        self.input_backend = "polling"
+        self.input_sampler = InputSamplerConfig(rate=250, capacity=256, axis_filter="mean")
+
         ### THRUSTERS ###
 
         self.thruster_positions: dict[enums.ThrusterPositions, Vector3] = {
@@ -152,6 +192,11 @@ class ROVConfig:
             ) for position in self.thruster_positions.keys()
         }
 
+        # How requested motions are turned into thruster powers. "direct" scales the lateral and vertical thrusters
+        # separately, "optimal" solves for the powers that get closest to the requested motion within the limits of
+        # every thruster, which keeps the ROV going the right way when some of them saturate.
+        self.thrust_allocation = ThrustAllocationConfig(mode="direct")
+
         ### PIDs ###
 
         self.kinematics_config = KinematicsConfig(
@@ -192,14 +237,21 @@ class ROVConfig:
             accel_conversion_factor=1.0
         )
 
-        self.mavlink_interval = 10_000  # 10ms
+        # How the flight controller's messages reach the surface. "mqtt" and "udp" pass the raw MAVLink frames through,
+        # which the ROV must be set up to match.
+        self.mavlink_config = MavlinkConfig(transport="json")
+
+        # How often to ask the flight controller for the subscribed message types that no active control mode reads.
+        self.stream_rates = StreamRateConfig(idle_rate=1.0)
 
+        # The message types to ask the flight controller for, by name in lower case, with their ids. The surface keeps a
+        # history of the recent samples of each.
         self.mavlink_subscriptions: dict[str, int] = {
             "heartbeat": 0,
             "sys_status": 1,
             "scaled_imu": 26,
             "attitude": 30,
-            "attitude_quarternion": 31,
+            "attitude_quaternion": 31,
             "local_position_ned": 32,
         }
 
@@ -217,6 +269,8 @@ class ROVConfig:
                 LabelConfig("Height", 2, 2, "Height"),
                 LabelConfig("FPS", 3, 2, "FPS"),
                 LabelConfig("Quality", 4, 2, "Quality"),
+                LabelConfig("Profile", 5, 2, "", cspan=6),
+                LabelConfig("Video", 8, 0, "", cspan=8),
                 # LabelConfig("Depth", 5, 1, "Depth: "),
             ),
             scales=(
@@ -227,6 +281,11 @@ class ROVConfig:
             images=(
                 ImageConfig("topview", 1, 2, 125, 125, f"{self.rov_dir}/assets/topview.png", cspan=2),
                 ImageConfig("sideview", 1, 4, 125, 125, f"{self.rov_dir}/assets/sideview.png", cspan=2),
-                ImageConfig("frontview", 1, 6, 125, 125, f"{self.rov_dir}/assets/frontview.png", cspan=2)
-            )
+                ImageConfig("frontview", 1, 6, 125, 125, f"{self.rov_dir}/assets/frontview.png", cspan=2),
+            ),
+            displays=(
+                DisplayConfig(MAIN_DISPLAY, 6, 0, 640, 480, rspan=2, cspan=6),
+                DisplayConfig("frame0", 6, 6, 213, 160, cspan=2),
+                DisplayConfig("frame1", 7, 6, 213, 160, cspan=2),
+            ),
         )
@@ -9,7 +9,7 @@ import kinematics as kms
 from controller_input import combine_triggers
 from io_systems.io_handler import IO
 from dashboard import Dashboard
-from mavlink_flight_controller import FlightController
+from mavlink_flight_controller import FlightController, MAVLINK_RATES
 
 from utilities.vector import Vector3
 
@@ -30,6 +30,8 @@ class PIDTuning(ControlMode):
             Shutdown the ROV.
     """
 
+    mavlink_rates = MAVLINK_RATES
+
     def __init__(self, frame: FrameThrusters, io: IO, kinematics: kms.Kinematics, flight_controller: FlightController,
                  dash: Dashboard, set_control_mode: Callable) -> None:
         """Initialize the Manual object.
@@ -73,7 +75,7 @@ class PIDTuning(ControlMode):
 
         controller = inputs[enums.ControllerNames.PRIMARY_DRIVER]
 
-        mavlink = subscriptions["mavlink"]
+        mavlink = self._io.mavlink_handler.mavlink_messages
 
         # Get the gyro data from the subscriptions if it exists.
         # if "imu" in i2c:
@@ -1,9 +1,18 @@
+from concurrent.futures import Future
+from typing import Any
+
 from config.flight_controller import FlightControllerConfig
 from io_systems.mavlink_handler import MavlinkHandler
 from enums import MavlinkMessageTypes
 
 from utilities.vector import Vector3
 
+# The flight controller only acknowledges a calibration once it has finished, in seconds.
+CALIBRATION_TIMEOUT = 30.0
+
+# The message types update reads, with how many times a second it needs each, in Hz. It's updated at the control rate.
+MAVLINK_RATES = {"ATTITUDE": 100, "SCALED_IMU": 100}
+
 
 class FlightController:
 
@@ -22,7 +31,8 @@ class FlightController:
         self._lateral_accel = Vector3(x=0, y=0, z=0)  # mG
         self._compass = Vector3(x=0, y=0, z=0)  # mGauss
 
-        self._currently_calibrating = False
+        # The calibration command in progress, which settles once the flight controller acknowledges it.
+        self._calibration: Future | None = None
 
     @property
     def attitude(self):
@@ -41,64 +51,72 @@ class FlightController:
         return self._compass
 
     @property
-    def currently_calibrating(self):
-        return self._currently_calibrating
+    def currently_calibrating(self) -> bool:
+        """Whether a calibration has been sent and not yet acknowledged or given up on."""
+        return self._calibration is not None and not self._calibration.done()
 
-    def initialize_flight_controller(self, mavlink: MavlinkHandler.mavlink_commands) -> None:
-        mavlink.mavlink_commands = self._flight_controller_config.initial_commands
+    def initialize_flight_controller(self, mavlink: MavlinkHandler) -> None:
+        for command, parameters in self._flight_controller_config.initial_commands.items():
+            mavlink.add_command(command, parameters)
 
-    def update(self, messages: dict[str, dict]) -> None:
+    def update(self, messages: dict[str, Any]) -> None:
         """Update the flight controller with the latest messages.
 
         Args:
-            messages (dict[str, dict]):
-                The messages from the mavlink handler.
+            messages (dict[str, Any]):
+                The newest message of each type from the mavlink handler, with its fields as attributes.
         """
         if "ATTITUDE" in messages:
             self._attitude = (
-                messages["ATTITUDE"]["yaw"], messages["ATTITUDE"]["pitch"], messages["ATTITUDE"]["roll"]
+                messages["ATTITUDE"].yaw, messages["ATTITUDE"].pitch, messages["ATTITUDE"].roll
             )
             self._attitude_speed = (
-                messages["ATTITUDE"]["yawspeed"], messages["ATTITUDE"]["pitchspeed"], messages["ATTITUDE"]["rollspeed"]
+                messages["ATTITUDE"].yawspeed, messages["ATTITUDE"].pitchspeed, messages["ATTITUDE"].rollspeed
             )
 
         if "SCALED_IMU" in messages:
             self._lateral_accel = (
-                messages["SCALED_IMU"]["xacc"], messages["SCALED_IMU"]["yacc"], messages["SCALED_IMU"]["zacc"]
+                messages["SCALED_IMU"].xacc, messages["SCALED_IMU"].yacc, messages["SCALED_IMU"].zacc
             )
             self._compass = (
-                messages["SCALED_IMU"]["xmag"], messages["SCALED_IMU"]["ymag"], messages["SCALED_IMU"]["zmag"]
+                messages["SCALED_IMU"].xmag, messages["SCALED_IMU"].ymag, messages["SCALED_IMU"].zmag
             )
 
-    def calibrate_gyro(self, mavlink: MavlinkHandler.mavlink_commands) -> None:
+    def calibrate_gyro(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the gyroscope.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
-            mavlink.mavlink_commands[MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION] = (1, 0, 0, 0, 0, 0, 0)
+        if not self.currently_calibrating:
+            self._calibrate(mavlink, (1, 0, 0, 0, 0, 0, 0))
 
-    def calibrate_accelerometer(self, mavlink: MavlinkHandler.mavlink_commands) -> None:
+    def calibrate_accelerometer(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the accelerometer.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
-            mavlink.mavlink_commands[MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION] = (0, 0, 0, 0, 1, 0, 0)
+        if not self.currently_calibrating:
+            self._calibrate(mavlink, (0, 0, 0, 0, 1, 0, 0))
 
-    def calibrate_compass(self, mavlink: MavlinkHandler.mavlink_commands) -> None:
+    def calibrate_compass(self, mavlink: MavlinkHandler) -> None:
         """Calibrate the compass.
 
         Args:
-            mavlink (MavlinkHandler.mavlink_commands):
-                The mavlink commands property.
+            mavlink (MavlinkHandler):
+                The mavlink handler to send the command through.
         """
-        if not self._currently_calibrating:
-            mavlink.mavlink_commands[MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION] = (0, 1, 0, 0, 0, 0, 0)
+        if not self.currently_calibrating:
+            self._calibrate(mavlink, (0, 1, 0, 0, 0, 0, 0))
+
+    def _calibrate(self, mavlink: MavlinkHandler, parameters: tuple[int, int, int, int, int, int, int]) -> None:
+        """Send a calibration command. It isn't sent again, as the flight controller would start over."""
+        self._calibration = mavlink.add_command(
+            MavlinkMessageTypes.MAV_CMD_PREFLIGHT_CALIBRATION, parameters, timeout=CALIBRATION_TIMEOUT, retries=0,
+        )
 
 
     # def set_gyro_offsets(mavlink: MavlinkHandler.mavlink_commands) -> None:
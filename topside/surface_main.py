@@ -5,8 +5,10 @@ import rovs.cali.rov as rov
 import rovs.cali.rov_config as rov_config
 
 import controller_input
-from io_systems import gpio_handler, i2c_handler, mqtt_handler, mavlink_handler
+from io_systems import clock_sync, gpio_handler, i2c_handler, mqtt_handler, mavlink_handler, video_handler
 from io_systems.io_handler import IO
+from io_systems.session_log import SessionRecorder
+from utilities.loop_scheduler import LoopScheduler
 
 
 class MainSystem:
@@ -18,10 +20,6 @@ class MainSystem:
         """Initialize an instance of the class"""
         self.run = True
 
-        # Set the number of loops per second and the number of nanoseconds per loop for rate limiting.
-        self._loops_per_second = 60
-        self._nanoseconds_per_loop = 1_000_000_000 // self._loops_per_second
-
         # Set up the configuration for the ROV.
         self.rov_config = rov_config.ROVConfig()
 
@@ -30,60 +28,85 @@ class MainSystem:
         self._comms_port = self.rov_config.comms_port
         self._host_ip = self.rov_config.host_ip
 
-        # TODO: Set this up to receive the video stream(s)
-        # self.socket = socket_handler.SocketHandler(self, self.pi_ip, self.video_port)
-
         # Set up the input handler to handle the controller inputs.
-        self.input_handler = controller_input.InputHandler(self.rov_config.controllers)
+        self.input_handler = controller_input.InputHandler(
+            self.rov_config.controllers, backend=self.rov_config.input_backend,
+            sampler_config=self.rov_config.input_sampler,
+        )
 
         # The MQTT handler is used to communicate with the ROV sending and receiving thruster commands and sensor data.
-        self.rov_connection = mqtt_handler.ROVConnection(self._host_ip, self._comms_port)
+        self.rov_connection = mqtt_handler.ROVConnection(
+            self._host_ip, self._comms_port, pin_publish_mode=self.rov_config.pin_publish_mode
+        )
+
+        # Ping the ROV over MQTT to work out how far its clock is from ours, so the age of its video frames is known.
+        # The pongs are timed as soon as they arrive, on the network thread.
+        self.clock_sync = clock_sync.ClockSync(self.rov_connection.publish_commands)
+        self.rov_connection.add_listener(clock_sync.PONG_TOPIC, self.clock_sync.handle_pong)
+
+        # Receive the video streams, each on a thread of its own, decoding them on a shared pool of threads.
+        self.video_handler = video_handler.VideoHandler(
+            self.rov_config.video_configs, self.rov_config.video_decode_workers, self.clock_sync
+        )
 
         self.gpio_handler = gpio_handler.GPIOHandler(self.rov_config.pins)
 
         self.i2c_handler = i2c_handler.I2CHandler(self.rov_config.i2cs)
 
-        self.mavlink_handler = mavlink_handler.MavlinkHandler()
+        # The flight controller's messages arrive as JSON, or as raw MAVLink frames parsed on the MQTT network thread or
+        # a UDP receiver thread of their own. The subscribed JSON types are taken on the network thread too, so their
+        # histories keep every sample.
+        self.mavlink_handler = mavlink_handler.MavlinkHandler(
+            self.rov_config.mavlink_config, [name.upper() for name in self.rov_config.mavlink_subscriptions],
+        )
+        self.mavlink_handler.listen(self.rov_connection.add_listener)
 
-        # TODO: Incorporate terminal input and openCV video stream(s). Maybe incorporate a video stream switching
-        #  system.
+        # TODO: Incorporate terminal input.
         # self.input_map: dict[str, Callable[[], any]] = {
         #     "controller": self.input_handler.controllers,
         #     "subscriptions": self.rov_connection.get_subscriptions,
-        #     # "socket": self.socket.get_video,
         # }
+        # Record the session if the config asks for it.
+        recorder = None
+        if self.rov_config.session_log_dir is not None:
+            recorder = SessionRecorder(self.rov_config.session_log_dir, self.rov_config.controllers)
+
         self._io = IO(
-            self.gpio_handler, self.i2c_handler, self.mavlink_handler, self.input_handler, self.rov_connection
+            self.gpio_handler, self.i2c_handler, self.mavlink_handler, self.input_handler, self.rov_connection,
+            rov_video=self.video_handler, recorder=recorder,
         )
 
         self.rov_connection.connect()
+        self.video_handler.start()
+        self.mavlink_handler.start()
 
         self._rov = rov.ROV(self.rov_config, self._io)
 
-        # self.socket.connect_outbound()
-        # self.socket.start_listening()
+        # Each stage of the loop runs at its own rate against fixed deadlines.
+        loop_config = self.rov_config.loop_config
+        self._scheduler = LoopScheduler(loop_config.spin_threshold_ns, loop_config.jitter_buckets_us)
+        self._scheduler.add_stage("control", loop_config.control_rate, self._rov.loop)
+        self._scheduler.add_stage("dashboard", loop_config.dashboard_rate, self._rov.update_dashboard)
+        self._scheduler.add_stage("telemetry", loop_config.telemetry_rate, self._rov.update_telemetry)
+
         # self.terminal.start_listening()
 
     def main_loop(self) -> None:
-        """Executes the main loop of the program."""
-        # Get the time at the start of the loop.
-        start_loop: int = time.monotonic_ns()
-
-        # Execute the loop of the ROV.
-        self._rov.loop()
-
-        # Rate limit the loop to the specified number of loops per second.
-        end_loop: int = time.monotonic_ns()
-        loop_time: int = end_loop - start_loop
-        sleep_time: float = (self._nanoseconds_per_loop - loop_time) / 1_000_000_000
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+        """Executes the main loop of the program. Each call waits for the next stage deadline and runs every stage
+        that is due."""
+        self._scheduler.run_once()
 
     def shutdown(self) -> None:
         """Shuts down the system and its subsystems."""
         self.run = False
+        print(self._scheduler.report())
+        print(self._io.profiler.report())
+        print(self.video_handler.report())
         self._rov.shutdown()
         self.rov_connection.shutdown()
-        # self.socket.shutdown()
+        self.video_handler.stop()
+        self.mavlink_handler.stop()
+        if self._io.recorder is not None:
+            self._io.recorder.close()
         # Delay to let things close properly
         time.sleep(.25)
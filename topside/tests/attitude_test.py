@@ -0,0 +1,80 @@
+import math
+import unittest
+
+import numpy as np
+
+from io_systems.mavlink_handler import JsonMessage
+from io_systems.mavlink_history import MessageHistory
+from utilities.attitude import Attitude, history_to_euler, quaternion_to_euler, quaternions_to_euler
+
+
+def from_euler(yaw: float, pitch: float, roll: float) -> tuple[float, float, float, float]:
+    """Build the quaternion for a yaw, pitch, roll sequence, as w, x, y, and z."""
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    return (
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    )
+
+
+class attitude_test(unittest.TestCase):
+
+    def assertEuler(self, actual, yaw: float, pitch: float, roll: float) -> None:
+        self.assertAlmostEqual(actual.yaw, yaw, places=9)
+        self.assertAlmostEqual(actual.pitch, pitch, places=9)
+        self.assertAlmostEqual(actual.roll, roll, places=9)
+
+    def test_single_axes(self):
+        self.assertEuler(quaternion_to_euler(1, 0, 0, 0), 0, 0, 0)
+        self.assertEuler(quaternion_to_euler(*from_euler(0.5, 0, 0)), 0.5, 0, 0)
+        self.assertEuler(quaternion_to_euler(*from_euler(0, -0.3, 0)), 0, -0.3, 0)
+        self.assertEuler(quaternion_to_euler(*from_euler(0, 0, 2.5)), 0, 0, 2.5)
+
+    def test_round_trip_unnormalized(self):
+        w, x, y, z = from_euler(-2.0, 0.4, 1.2)
+        self.assertEuler(quaternion_to_euler(3 * w, 3 * x, 3 * y, 3 * z), -2.0, 0.4, 1.2)
+        self.assertEuler(quaternion_to_euler(0, 0, 0, 0), 0, 0, 0)
+
+    def test_batch_matches_single(self):
+        rng = np.random.default_rng(0)
+        quaternions = rng.normal(size=(50, 4))
+        euler = quaternions_to_euler(quaternions)
+
+        self.assertEqual(euler.shape, (50, 3))
+        for quaternion, angles in zip(quaternions, euler):
+            self.assertEuler(quaternion_to_euler(*quaternion), *angles)
+        np.testing.assert_array_equal(quaternions_to_euler(np.zeros((2, 4))), np.zeros((2, 3)))
+
+        single = quaternions_to_euler(np.array(from_euler(0.5, -0.2, 1.0)))
+        self.assertEqual(single.shape, (3,))
+        np.testing.assert_allclose(single, [0.5, -0.2, 1.0])
+        np.testing.assert_array_equal(quaternions_to_euler(np.zeros(4)), np.zeros(3))
+
+    def test_history(self):
+        history = MessageHistory("ATTITUDE_QUATERNION")
+        for i, yaw in enumerate((0.1, 0.2, 0.3)):
+            w, x, y, z = from_euler(yaw, 0, 0)
+            history.append(JsonMessage("ATTITUDE_QUATERNION", {"q1": w, "q2": x, "q3": y, "q4": z}), i)
+
+        np.testing.assert_allclose(history_to_euler(history.latest(3))[:, 0], [0.1, 0.2, 0.3])
+
+    def test_converted_once_per_quaternion(self):
+        attitude = Attitude()
+        self.assertEuler(attitude.euler, 0, 0, 0)
+
+        attitude.set_quaternion(*from_euler(1.0, 0, 0))
+        first = attitude.euler
+        self.assertIs(attitude.euler, first)
+        self.assertEuler(first, 1.0, 0, 0)
+
+        attitude.set_quaternion(*from_euler(1.0, 0, 0))
+        self.assertIsNot(attitude.euler, first)
+        self.assertEqual(attitude.generation, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
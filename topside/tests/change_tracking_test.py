@@ -0,0 +1,88 @@
+import time
+import unittest
+
+from config.i2c import I2CConfig
+from config.pin import PinConfig
+from hardware.i2c import I2C
+from hardware.pin import Pin
+from io_systems.mqtt_handler import ROVConnection
+
+
+class RecordingClient:
+    """Stand-in for the paho client that records the topics published to."""
+
+    def __init__(self):
+        self.topics = []
+
+    def publish(self, topic, payload=None, *args, **kwargs):
+        self.topics.append(topic)
+
+
+class change_tracking_test(unittest.TestCase):
+
+    def setUp(self):
+        self._connection = ROVConnection()
+        self._client = RecordingClient()
+        self._connection._client = self._client
+
+        self._pins = {
+            "FRONT_LEFT": Pin(PinConfig(id=21, mode="PWMus", val=1500, freq=50)),
+            "FRONT_RIGHT": Pin(PinConfig(id=20, mode="PWMus", val=1500, freq=50)),
+        }
+
+    def published_pins(self):
+        return {topic.split("/")[2] for topic in self._client.topics}
+
+    def test_only_changed_pins_are_sent(self):
+        self._connection.publish_pins(self._pins)
+        self.assertEqual(self.published_pins(), {"FRONT_LEFT", "FRONT_RIGHT"})
+
+        self._client.topics.clear()
+        self._pins["FRONT_LEFT"].val = 1600
+        self._pins["FRONT_RIGHT"].val = 1500
+        self._connection.publish_pins(self._pins)
+        self.assertEqual(self.published_pins(), {"FRONT_LEFT"})
+
+        # Nothing changed and the idle ping was just sent, so nothing should be published.
+        self._client.topics.clear()
+        self._connection._last_pin_update = time.time()
+        self._connection.publish_pins(self._pins)
+        self.assertEqual(self._client.topics, [])
+
+    def test_idle_ping_resends_all_pins(self):
+        self._connection.publish_pins(self._pins)
+        self._client.topics.clear()
+
+        self._connection._last_pin_update = 0.0
+        self._connection.publish_pins(self._pins)
+
+        self.assertEqual(self.published_pins(), {"FRONT_LEFT", "FRONT_RIGHT"})
+
+    def test_replaced_pin_is_sent(self):
+        self._connection.publish_pins(self._pins)
+        self._client.topics.clear()
+
+        self._pins["FRONT_RIGHT"] = Pin(PinConfig(id=20, mode="PWMus", val=1500, freq=50))
+        self._connection.publish_pins(self._pins)
+
+        self.assertEqual(self.published_pins(), {"FRONT_RIGHT"})
+
+    def test_i2c_in_place_edit(self):
+        i2cs = {"imu": I2C(I2CConfig(addr=0x6A, sending_vals={}))}
+        self._connection.publish_i2c(i2cs)
+        self._client.topics.clear()
+
+        i2cs["imu"].sending_vals[0x10] = 0x40
+        self._connection.publish_i2c(i2cs)
+        self.assertEqual(self._client.topics, [])
+
+        i2cs["imu"].mark_dirty()
+        self._connection.publish_i2c(i2cs)
+        self.assertIn("PC/i2c/imu/send_vals", self._client.topics)
+
+    def test_i2c_equality(self):
+        first = I2C(I2CConfig(addr=0x6A))
+        second = I2C(I2CConfig(addr=0x6B))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, I2C(I2CConfig(addr=0x6A)))
@@ -0,0 +1,72 @@
+import unittest
+
+from io_systems.clock_sync import ClockSync, PING_COMMAND
+
+ROV_OFFSET = 5_000_000_000
+
+
+class clock_sync_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_000_000_000
+        self.pings = []
+        self.sync = ClockSync(
+            lambda commands: self.pings.append(commands[PING_COMMAND]), interval=1.0, window=4, timeout=2.0,
+            clock=lambda: self.now,
+        )
+
+    def round_trip(self, out_ns: int, back_ns: int) -> None:
+        """Ping, then have the ROV answer after out_ns and the pong arrive back_ns later."""
+        self.now += 1_000_000_000
+        self.sync.update()
+        sent = self.pings[-1]
+        self.now += out_ns
+        reply = [sent, self.now + ROV_OFFSET]
+        self.now += back_ns
+        self.sync.handle_pong(reply)
+
+    def test_offset_from_symmetric_round_trip(self):
+        self.assertFalse(self.sync.synced)
+        self.assertIsNone(self.sync.to_local(ROV_OFFSET))
+
+        self.round_trip(2_000_000, 2_000_000)
+        self.assertEqual(self.sync.offset_ns, ROV_OFFSET)
+        self.assertEqual(self.sync.rtt_ns, 4_000_000)
+        self.assertEqual(self.sync.to_local(self.now + ROV_OFFSET), self.now)
+
+    def test_keeps_quickest_round_trip(self):
+        self.round_trip(1_000_000, 1_000_000)
+        # A slow, lopsided round trip would put the offset 20 ms out.
+        self.round_trip(50_000_000, 10_000_000)
+        self.assertEqual(self.sync.offset_ns, ROV_OFFSET)
+        self.assertEqual(self.sync.rtt_ns, 2_000_000)
+
+        # Once the quick one falls out of the window, the best of the rest is used.
+        for _ in range(3):
+            self.round_trip(3_000_000, 5_000_000)
+        self.assertEqual(self.sync.rtt_ns, 8_000_000)
+        self.assertEqual(self.sync.offset_ns, ROV_OFFSET - 1_000_000)
+
+    def test_ignores_repeated_and_unknown_pongs(self):
+        self.round_trip(1_000_000, 1_000_000)
+        first = self.pings[-1]
+
+        # The command keepalive can send an old ping again, long after it was answered.
+        self.now += 500_000_000
+        self.sync.handle_pong([first, self.now + ROV_OFFSET])
+        self.sync.handle_pong([12345, self.now])
+        self.sync.handle_pong("not a pong")
+        self.assertEqual(self.sync.rtt_ns, 2_000_000)
+
+    def test_pings_at_interval(self):
+        self.sync.update()
+        self.now += 500_000_000
+        self.sync.update()
+        self.assertEqual(len(self.pings), 1)
+        self.now += 500_000_000
+        self.sync.update()
+        self.assertEqual(len(self.pings), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Stand-ins for the controllers, shared by the tests and benchmarks that read controller input."""
+import controller as ctrl
+from rovs.spike.enums import ControllerAxisNames, ControllerButtonNames, ControllerHatNames
+
+
+class FakeJoystick:
+    """Stands in for a pygame joystick, with its state set directly."""
+
+    def __init__(self, instance_id: int = 0, axis_count: int = 6, button_count: int = 11) -> None:
+        self.instance_id = instance_id
+        self.axes = [0.0] * axis_count
+        self.buttons = [False] * button_count
+        self.hat = (0, 0)
+
+    def get_instance_id(self) -> int:
+        return self.instance_id
+
+    def get_axis(self, index: int) -> float:
+        return self.axes[index]
+
+    def get_button(self, index: int) -> bool:
+        return self.buttons[index]
+
+    def get_hat(self, index: int) -> tuple[int, int]:
+        return self.hat
+
+    def quit(self) -> None:
+        pass
+
+
+def make_controller(axis_count: int = 6, button_count: int = 8, deadzone: float = 0.15) -> ctrl.Controller:
+    """Make a controller with the first axes and buttons of the ROV's controller layout, and a D-pad."""
+    axis_names = list(ControllerAxisNames)[:axis_count]
+    button_names = list(ControllerButtonNames)[:button_count]
+    axes = {name: ctrl.Axis(index=i, deadzone=deadzone) for i, name in enumerate(axis_names)}
+    buttons = {name: ctrl.Button(index=i) for i, name in enumerate(button_names)}
+    hats = {ControllerHatNames.DPAD: ctrl.Hat(index=0)}
+    return ctrl.Controller(0, buttons, axes, hats)
+
+
+def snapshot(controller: ctrl.Controller) -> list:
+    """Get the value of every axis and the state of every button, including the hats', to compare controllers by."""
+    state = [axis.value for axis in controller.axes.values()]
+    buttons = list(controller.buttons.values())
+    for hat in controller.hats.values():
+        buttons += list(hat.buttons.values())
+    for button in buttons:
+        state.append((button.pressed, button.just_pressed, button.just_released, button.toggled))
+    return state
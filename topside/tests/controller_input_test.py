@@ -0,0 +1,72 @@
+import random
+import unittest
+
+import pygame
+
+from controller_input import InputHandler
+from rovs.spike.enums import ControllerNames, ControllerButtonNames
+from tests.controller_helpers import FakeJoystick, make_controller, snapshot
+
+
+class controller_input_test(unittest.TestCase):
+
+    def test_events_match_polling(self):
+        polled = InputHandler({ControllerNames.PRIMARY_DRIVER: make_controller()}, backend="polling",
+                              joysticks={ControllerNames.PRIMARY_DRIVER: FakeJoystick(0)})
+        evented = InputHandler({ControllerNames.PRIMARY_DRIVER: make_controller()}, backend="events",
+                               joysticks={ControllerNames.PRIMARY_DRIVER: FakeJoystick(7)})
+        polled_joystick = polled.controllers[ControllerNames.PRIMARY_DRIVER].joystick
+        polled_controller = polled.controllers[ControllerNames.PRIMARY_DRIVER]
+        evented_controller = evented.controllers[ControllerNames.PRIMARY_DRIVER]
+
+        rng = random.Random(0)
+        for _ in range(500):
+            events = []
+            for index in rng.sample(range(6), 2):
+                value = rng.uniform(-1, 1)
+                polled_joystick.axes[index] = value
+                events.append(pygame.event.Event(pygame.JOYAXISMOTION, instance_id=7, axis=index, value=value))
+            if rng.random() < 0.3:
+                index = rng.randrange(8)
+                state = not polled_joystick.buttons[index]
+                polled_joystick.buttons[index] = state
+                event_type = pygame.JOYBUTTONDOWN if state else pygame.JOYBUTTONUP
+                events.append(pygame.event.Event(event_type, instance_id=7, button=index))
+            if rng.random() < 0.1:
+                polled_joystick.hat = (rng.choice((-1, 0, 1)), rng.choice((-1, 0, 1)))
+                events.append(pygame.event.Event(pygame.JOYHATMOTION, instance_id=7, hat=0, value=polled_joystick.hat))
+
+            polled.update()
+            evented.process_events(events)
+
+            self.assertEqual(snapshot(evented_controller), snapshot(polled_controller))
+
+    def test_events_from_other_joysticks_ignored(self):
+        handler = InputHandler({ControllerNames.PRIMARY_DRIVER: make_controller()}, backend="events",
+                               joysticks={ControllerNames.PRIMARY_DRIVER: FakeJoystick(0)})
+
+        handler.process_events([pygame.event.Event(pygame.JOYBUTTONDOWN, instance_id=3, button=0)])
+
+        self.assertFalse(handler.controllers[ControllerNames.PRIMARY_DRIVER].buttons[ControllerButtonNames.A].pressed)
+
+    def test_button_held_at_startup_matches_polling(self):
+        polled_joystick, evented_joystick = FakeJoystick(0), FakeJoystick(7)
+        polled_joystick.buttons[0] = evented_joystick.buttons[0] = True
+        polled_joystick.hat = evented_joystick.hat = (0, 1)
+        polled = InputHandler({ControllerNames.PRIMARY_DRIVER: make_controller()}, backend="polling",
+                              joysticks={ControllerNames.PRIMARY_DRIVER: polled_joystick})
+        evented = InputHandler({ControllerNames.PRIMARY_DRIVER: make_controller()}, backend="events",
+                               joysticks={ControllerNames.PRIMARY_DRIVER: evented_joystick})
+        # The events backend has already read the controller once, so polling catches up a frame.
+        polled.update()
+
+        for _ in range(3):
+            polled.update()
+            evented.process_events([])
+            self.assertEqual(snapshot(evented.controllers[ControllerNames.PRIMARY_DRIVER]),
+                             snapshot(polled.controllers[ControllerNames.PRIMARY_DRIVER]))
+
+        button = evented.controllers[ControllerNames.PRIMARY_DRIVER].buttons[ControllerButtonNames.A]
+        self.assertTrue(button.pressed)
+        self.assertFalse(button.just_pressed)
+        self.assertTrue(button.toggled)
@@ -0,0 +1,58 @@
+import unittest
+
+from config.dashboard import DashboardConfig, LabelConfig, ScaleConfig
+from rovs.generic_objects.dashboard_host import DashboardHost, DashboardSnapshot
+
+CONFIG = DashboardConfig(
+    labels=(LabelConfig("Profile", 0, 0, ""),),
+    scales=(ScaleConfig("FPS", 1, 0, 1, 30, 15),),
+    images=(),
+)
+
+
+class dashboard_host_test(unittest.TestCase):
+
+    def test_snapshot_keeps_latest(self):
+        snapshot = DashboardSnapshot(CONFIG)
+
+        snapshot.update_images({"topview": 10, "sideview": 20})
+        snapshot.update_images({"topview": 30})
+        snapshot.set_label("Profile", "a")
+        snapshot.set_label("Profile", "b")
+
+        self.assertEqual(snapshot.take(), ({"topview": 30, "sideview": 20}, {"Profile": "b"}))
+        self.assertEqual(snapshot.take(), ({}, {}))
+
+    def test_snapshot_inputs(self):
+        snapshot = DashboardSnapshot(CONFIG)
+
+        self.assertIn("Profile", snapshot.labels)
+        self.assertEqual(snapshot.get_scale("FPS"), 15)
+        self.assertEqual(snapshot.get_entry("Depth", 1.5), 1.5)
+
+        snapshot.publish_inputs({"Depth": 2.0}, {"FPS": 20})
+
+        self.assertEqual(snapshot.get_scale("FPS"), 20)
+        self.assertEqual(snapshot.get_entry("Depth", 1.5), 2.0)
+
+    def test_disabled_never_builds(self):
+        def make_dashboard(root):
+            raise AssertionError("The dashboard should not be built")
+
+        host = DashboardHost(make_dashboard, CONFIG, mode="disabled")
+        host.start()
+        host.snapshot.update_images({"topview": 10})
+        host.update()
+        host.stop()
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            DashboardHost(lambda root: None, CONFIG, mode="window")
+
+    def test_snapshot_selects_stream(self):
+        snapshot = DashboardSnapshot(CONFIG)
+        self.assertIsNone(snapshot.selected_stream)
+
+        snapshot.select_stream("frame1")
+
+        self.assertEqual(snapshot.selected_stream, "frame1")
@@ -0,0 +1,40 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from io_systems.frame_decoder import FrameDecoder, jpeg_size
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    # Blue on the left half and red on the right, in OpenCV's BGR order.
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[:, :width // 2] = (255, 0, 0)
+    image[:, width // 2:] = (0, 0, 255)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+class frame_decoder_test(unittest.TestCase):
+
+    def test_jpeg_size(self):
+        self.assertEqual(jpeg_size(make_jpeg(640, 480)), (640, 480))
+        self.assertIsNone(jpeg_size(b"not a jpeg"))
+
+    def test_reduced_decode_to_rgb(self):
+        decoder = FrameDecoder(160, 120)
+
+        frame = decoder.decode(make_jpeg(1280, 960))
+
+        self.assertEqual(frame.shape, (120, 160, 3))
+        np.testing.assert_allclose(frame[60, 10], (0, 0, 255), atol=8)
+        np.testing.assert_allclose(frame[60, 150], (255, 0, 0), atol=8)
+        # An eighth of the size is exactly right, so nothing is left to resize.
+        self.assertEqual(decoder.profiler.stats("resize").count, 0)
+
+    def test_mirror(self):
+        frame = FrameDecoder(64, 48, mirror=True).decode(make_jpeg(64, 48))
+
+        np.testing.assert_allclose(frame[24, 5], (255, 0, 0), atol=8)
+
+    def test_invalid_frame(self):
+        self.assertIsNone(FrameDecoder(64, 48).decode(b"\xff\xd8 not a jpeg"))
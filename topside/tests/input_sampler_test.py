@@ -0,0 +1,98 @@
+import time
+import unittest
+
+import controller as ctrl
+from input_sampler import InputSampler
+from rovs.spike.enums import ControllerNames, ControllerAxisNames, ControllerButtonNames, ControllerHatNames
+from tests.controller_helpers import FakeJoystick
+
+
+class input_sampler_test(unittest.TestCase):
+
+    def setUp(self):
+        self._controller = ctrl.Controller(
+            0,
+            {ControllerButtonNames.A: ctrl.Button(index=0), ControllerButtonNames.B: ctrl.Button(index=1, negated=True)},
+            {ControllerAxisNames.LEFT_X: ctrl.Axis(index=0, deadzone=0.0)},
+            {ControllerHatNames.DPAD: ctrl.Hat(index=0)},
+        )
+        self._joystick = FakeJoystick()
+        self._controller.initialize(self._joystick)
+        self._sampler = InputSampler({ControllerNames.PRIMARY_DRIVER: self._controller}, pump=lambda: None)
+
+        # Settle the negated button, which starts out pressed.
+        self._sampler.sample()
+        self._sampler.update()
+
+    def tap(self, button: int) -> None:
+        self._joystick.buttons[button] = not self._joystick.buttons[button]
+        self._sampler.sample()
+        self._joystick.buttons[button] = not self._joystick.buttons[button]
+        self._sampler.sample()
+
+    def test_tap_within_a_frame(self):
+        button = self._controller.buttons[ControllerButtonNames.A]
+
+        self.tap(0)
+        self._sampler.update()
+
+        self.assertTrue(button.just_pressed)
+        self.assertTrue(button.just_released)
+        self.assertFalse(button.pressed)
+        self.assertEqual(button.press_count, 1)
+        self.assertTrue(button.toggled)
+
+        self._sampler.update()
+
+        self.assertFalse(button.just_pressed)
+        self.assertFalse(button.just_released)
+        self.assertEqual(button.press_count, 0)
+
+    def test_press_counts(self):
+        button = self._controller.buttons[ControllerButtonNames.A]
+        negated = self._controller.buttons[ControllerButtonNames.B]
+
+        self.tap(0)
+        self.tap(0)
+        self.tap(1)
+        self._sampler.update()
+
+        self.assertEqual(button.press_count, 2)
+        self.assertEqual(button.release_count, 2)
+        self.assertFalse(button.toggled)
+        # Pressing a negated button releases it.
+        self.assertEqual(negated.release_count, 1)
+        self.assertTrue(negated.pressed)
+
+    def test_hat_tap(self):
+        up = self._controller.hats[ControllerHatNames.DPAD].buttons[ctrl.HAT_DIRECTIONS[2]]
+
+        self._joystick.hat = (0, 1)
+        self._sampler.sample()
+        self._joystick.hat = (0, 0)
+        self._sampler.sample()
+        self._sampler.update()
+
+        self.assertTrue(up.just_pressed)
+        self.assertTrue(up.just_released)
+        self.assertFalse(up.pressed)
+
+    def test_axis_mean(self):
+        for value in (0.2, 0.4, 0.9):
+            self._joystick.axes[0] = value
+            self._sampler.sample()
+        self._sampler.update()
+
+        self.assertAlmostEqual(self._controller.axes[ControllerAxisNames.LEFT_X].value, 0.5)
+
+    def test_thread(self):
+        sampler = InputSampler({ControllerNames.PRIMARY_DRIVER: self._controller}, rate=1000, pump=lambda: None)
+
+        sampler.start()
+        self._joystick.buttons[0] = True
+        time.sleep(0.05)
+        sampler.stop()
+        sampler.update()
+
+        self.assertFalse(sampler.running)
+        self.assertTrue(self._controller.buttons[ControllerButtonNames.A].pressed)
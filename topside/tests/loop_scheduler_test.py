@@ -0,0 +1,80 @@
+import unittest
+
+from utilities.loop_scheduler import LoopScheduler
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps or does work."""
+
+    def __init__(self) -> None:
+        self.now = 0
+
+    def __call__(self) -> int:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += round(seconds * 1_000_000_000)
+
+    def work(self, nanoseconds: int):
+        def callback() -> None:
+            self.now += nanoseconds
+        return callback
+
+
+class loop_scheduler_test(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = FakeClock()
+        self._scheduler = LoopScheduler(spin_threshold_ns=0, clock=self._clock, sleep=self._clock.sleep)
+
+    def run_for(self, seconds: float) -> None:
+        while self._clock.now < seconds * 1_000_000_000:
+            self._scheduler.run_once()
+
+    def test_stage_rates(self):
+        self._scheduler.add_stage("control", 100, self._clock.work(2_000_000))
+        self._scheduler.add_stage("dashboard", 30, self._clock.work(5_000_000))
+        self._scheduler.add_stage("telemetry", 10, self._clock.work(1_000_000))
+
+        self.run_for(1)
+
+        runs = {stats.name: stats.runs for stats in self._scheduler.stats()}
+        self.assertAlmostEqual(runs["control"], 100, delta=1)
+        self.assertAlmostEqual(runs["dashboard"], 30, delta=1)
+        self.assertAlmostEqual(runs["telemetry"], 10, delta=1)
+
+    def test_no_drift(self):
+        # Work that takes most of the period should not push later runs back.
+        self._scheduler.add_stage("control", 100, self._clock.work(9_000_000))
+
+        self.run_for(1)
+
+        stats = self._scheduler.stats()[0]
+        self.assertAlmostEqual(stats.runs, 100, delta=1)
+        self.assertEqual(stats.overruns, 0)
+        self.assertEqual(stats.max_lateness_ns, 0)
+
+    def test_overruns_skip_missed_deadlines(self):
+        # Every run takes two and a half periods, so each one overruns. The stage should run back to back without
+        # trying to catch up, and every deadline should be either run or skipped.
+        self._scheduler.add_stage("control", 100, self._clock.work(25_000_000))
+
+        self.run_for(1)
+
+        stats = self._scheduler.stats()[0]
+        self.assertEqual(stats.overruns, stats.runs)
+        self.assertAlmostEqual(stats.runs, 40, delta=1)
+        self.assertAlmostEqual(stats.runs + stats.skipped, 100, delta=2)
+
+    def test_jitter_histogram(self):
+        # The slow stage makes the fast one start late whenever they are due together.
+        self._scheduler.add_stage("slow", 10, self._clock.work(3_000_000))
+        self._scheduler.add_stage("fast", 100, self._clock.work(0))
+
+        self.run_for(1)
+
+        fast = self._scheduler.stats()[1]
+        buckets = self._scheduler.jitter_buckets_us
+        self.assertEqual(fast.max_lateness_ns, 3_000_000)
+        self.assertEqual(fast.jitter_histogram[buckets.index(5_000)], self._scheduler.stats()[0].runs)
+        self.assertEqual(sum(fast.jitter_histogram), fast.runs)
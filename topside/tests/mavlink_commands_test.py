@@ -0,0 +1,85 @@
+import unittest
+
+from io_systems.mavlink_commands import (
+    MAV_RESULT_ACCEPTED, MAV_RESULT_IN_PROGRESS, MAV_RESULT_TEMPORARILY_REJECTED, MavlinkCommandQueue,
+)
+from io_systems.mavlink_handler import JsonMessage
+from io_systems.mavlink_history import MessageHistory
+
+SECOND = 1_000_000_000
+
+
+class mavlink_commands_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.sent = []
+        self.acks = MessageHistory("COMMAND_ACK")
+        self.queue = MavlinkCommandQueue(
+            lambda command, params: self.sent.append((command, params)), self.acks, timeout=1.0, retries=2,
+            backoff=2.0, clock=lambda: self.now,
+        )
+
+    def ack(self, command: int, result: int = MAV_RESULT_ACCEPTED) -> None:
+        self.acks.append(JsonMessage("COMMAND_ACK", {"command": command, "result": result}), self.now)
+
+    def test_same_id_waits_for_ack(self):
+        first = self.queue.submit(241, (1, 0, 0, 0, 0, 0, 0))
+        second = self.queue.submit(241, (0, 1, 0, 0, 0, 0, 0))
+        other = self.queue.submit(176, (0,) * 7)
+        self.assertEqual((first.sequence, second.sequence, other.sequence), (0, 1, 2))
+
+        self.queue.update()
+        self.assertEqual([command for command, _ in self.sent], [241, 176])
+
+        self.ack(241)
+        self.queue.update()
+        self.assertTrue(first.accepted)
+        self.assertFalse(second.done())
+        self.assertEqual(self.sent[-1], (241, (0, 1, 0, 0, 0, 0, 0)))
+
+    def test_retries_with_backoff_then_times_out(self):
+        future = self.queue.submit(241, (1,) * 7)
+        sends = []
+        for _ in range(80):
+            self.queue.update()
+            sends.append(len(self.sent))
+            self.now += SECOND // 10
+
+        # Sent at 0 s, then after waits of 1 s and 2 s, then given up on 4 s later.
+        self.assertEqual([sends.index(count) for count in (1, 2, 3)], [0, 10, 30])
+        self.assertIsInstance(future.exception(), TimeoutError)
+        self.assertEqual(future.attempts, 3)
+        self.assertEqual(self.queue.in_flight, 0)
+
+    def test_in_progress_and_rejected(self):
+        future = self.queue.submit(241, (1,) * 7, timeout=2.0, retries=1)
+        self.queue.update()
+
+        self.now = 3 * SECOND // 2
+        self.ack(241, MAV_RESULT_IN_PROGRESS)
+        self.queue.update()
+        # Still in progress, so its wait starts over instead of it being sent again.
+        self.now = 3 * SECOND
+        self.queue.update()
+        self.assertEqual(len(self.sent), 1)
+
+        self.ack(241, MAV_RESULT_TEMPORARILY_REJECTED)
+        self.now = 4 * SECOND
+        self.queue.update()
+        self.assertEqual(len(self.sent), 2)
+
+        self.ack(241, 4)
+        self.queue.update()
+        self.assertEqual(future.result(), 4)
+        self.assertFalse(future.accepted)
+
+    def test_cancelled_commands_are_dropped(self):
+        future = self.queue.submit(241, (1,) * 7)
+        future.cancel()
+        self.queue.update()
+        self.assertEqual((self.sent, self.queue.queued), ([], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
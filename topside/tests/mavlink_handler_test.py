@@ -0,0 +1,74 @@
+import socket
+import time
+import unittest
+
+from pymavlink.dialects.v20 import ardupilotmega
+
+from config.mavlink import MavlinkConfig
+from io_systems.mavlink_handler import MavlinkHandler
+
+
+class mavlink_handler_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.sender = ardupilotmega.MAVLink(None, srcSystem=1, srcComponent=1)
+
+    def attitude(self, roll: float) -> bytes:
+        return self.sender.attitude_encode(1000, roll, 0.2, 0.3, 0.0, 0.0, 0.0).pack(self.sender)
+
+    def imu(self, xacc: int) -> bytes:
+        return self.sender.scaled_imu_encode(1000, xacc, 0, -1000, 0, 0, 0, 10, 20, 30).pack(self.sender)
+
+    def test_json_messages_read_as_attributes(self):
+        handler = MavlinkHandler(clock=lambda: self.now)
+        self.now = 7
+        handler.handle_message(("ATTITUDE",), {"roll": 0.5, "pitch": 0.1})
+
+        attitude = handler.mavlink_messages["ATTITUDE"]
+        self.assertEqual((attitude.roll, attitude.pitch, attitude.get_type()), (0.5, 0.1, "ATTITUDE"))
+        self.assertEqual(handler.message_times["ATTITUDE"], 7)
+        with self.assertRaises(AttributeError):
+            attitude.yaw
+
+    def test_raw_frames_split_anywhere(self):
+        handler = MavlinkHandler(MavlinkConfig(transport="mqtt"), clock=lambda: self.now)
+        data = self.attitude(0.1) + self.imu(5) + self.attitude(0.4)
+        for start in range(0, len(data), 7):
+            self.now += 1
+            handler.feed(data[start:start + 7])
+
+        messages = handler.mavlink_messages
+        self.assertAlmostEqual(messages["ATTITUDE"].roll, 0.4, places=6)
+        self.assertEqual(messages["SCALED_IMU"].xacc, 5)
+        self.assertEqual(handler.messages_received, 3)
+        self.assertEqual(handler.message_times["ATTITUDE"], self.now)
+
+    def test_bad_checksum_is_skipped(self):
+        handler = MavlinkHandler(MavlinkConfig(transport="mqtt"))
+        corrupt = bytearray(self.attitude(0.1))
+        corrupt[-3] ^= 0xFF
+        handler.feed(bytes(corrupt) + self.imu(9))
+
+        self.assertNotIn("ATTITUDE", handler.mavlink_messages)
+        self.assertEqual(handler.mavlink_messages["SCALED_IMU"].xacc, 9)
+        self.assertEqual(handler.bad_frames, 1)
+
+    def test_udp_transport(self):
+        handler = MavlinkHandler(MavlinkConfig(transport="udp", ip_address="127.0.0.1", port=14651, timeout=0.01))
+        handler.start()
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(self.attitude(0.3), ("127.0.0.1", 14651))
+            deadline = time.monotonic() + 2
+            while "ATTITUDE" not in handler.mavlink_messages and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            handler.stop()
+
+        self.assertAlmostEqual(handler.mavlink_messages["ATTITUDE"].roll, 0.3, places=6)
+        self.assertFalse(handler.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
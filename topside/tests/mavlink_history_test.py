@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from io_systems.mavlink_handler import JsonMessage, MavlinkHandler
+from io_systems.mavlink_history import MessageHistory
+
+
+def attitude(time_boot_ms: int, roll: float) -> JsonMessage:
+    return JsonMessage("ATTITUDE", {"time_boot_ms": time_boot_ms, "roll": roll, "pitch": 0.0, "note": "text"})
+
+
+class mavlink_history_test(unittest.TestCase):
+
+    def setUp(self):
+        self.history = MessageHistory("ATTITUDE", capacity=4)
+        for i in range(6):
+            self.history.append(attitude(100 + 10 * i, i / 10), 1_000 * i)
+
+    def test_keeps_numeric_fields_and_timestamps(self):
+        self.assertEqual(self.history.fields, ("roll", "pitch"))
+        self.assertEqual(self.history.count, 6)
+
+        latest = self.history.latest()
+        self.assertEqual((latest["arrival_ns"][0], latest["time_boot_ms"][0], latest["roll"][0]), (5_000, 150, 0.5))
+
+        # The oldest sample kept may be being overwritten, so one fewer than the capacity is read.
+        np.testing.assert_array_equal(self.history.latest(10)["time_boot_ms"], [130, 140, 150])
+
+    def test_since_time_and_new_samples(self):
+        np.testing.assert_array_equal(self.history.since(4_000)["roll"], [0.4, 0.5])
+
+        count, samples = self.history.new_samples(4)
+        self.assertEqual((count, list(samples["roll"])), (6, [0.4, 0.5]))
+        self.history.append(attitude(160, 0.6), 6_000)
+        count, samples = self.history.new_samples(count)
+        self.assertEqual((count, list(samples["roll"])), (7, [0.6]))
+
+    def test_resample(self):
+        np.testing.assert_allclose(self.history.resample("roll", np.array([3_500, 4_250, 9_000])), [0.35, 0.425, 0.5])
+        self.assertTrue(np.isnan(MessageHistory("SCALED_IMU").resample("xacc", np.array([0]))).all())
+
+    def test_handler_keeps_histories_of_subscribed_types(self):
+        now = [0]
+        handler = MavlinkHandler(history_types=["ATTITUDE"], clock=lambda: now[0])
+        for i in range(3):
+            now[0] = i
+            handler.handle_message(("ATTITUDE",), {"time_boot_ms": i, "roll": float(i)})
+            handler.handle_message(("HEARTBEAT",), {"type": 12})
+
+        self.assertEqual(list(handler.histories), ["ATTITUDE", "COMMAND_ACK"])
+        np.testing.assert_array_equal(handler.history("ATTITUDE").latest(3)["roll"], [0.0, 1.0, 2.0])
+        self.assertEqual(handler.mavlink_messages["ATTITUDE"].roll, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
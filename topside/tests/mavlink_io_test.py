@@ -0,0 +1,72 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from io_systems.gpio_handler import GPIOHandler
+from io_systems.i2c_handler import I2CHandler
+from io_systems.io_handler import IO
+from io_systems.mavlink_commands import MAV_RESULT_ACCEPTED
+from io_systems.mavlink_handler import MavlinkHandler
+from io_systems.mqtt_handler import ROVConnection
+
+
+class mavlink_io_test(unittest.TestCase):
+    """MAVLink messages arriving as JSON through the ROV connection, several between two frames of the main loop."""
+
+    def setUp(self):
+        self.now = 0
+        self.connection = ROVConnection()
+        self.handler = MavlinkHandler(history_types=["ATTITUDE"], clock=lambda: self.now)
+        self.handler.listen(self.connection.add_listener)
+        self.io = IO(GPIOHandler({}), I2CHandler({}), self.handler,
+                     SimpleNamespace(controllers={}, update=lambda: None), self.connection)
+
+        # What would have been published to the ROV, as there's no broker.
+        self.published = []
+        self.connection._client.publish = lambda topic, payload=None, *args, **kwargs: self.published.append(topic)
+
+    def receive(self, name: str, fields: dict) -> None:
+        payload = json.dumps(fields).encode()
+        self.connection._on_message(None, None, SimpleNamespace(topic=f"ROV/mavlink/{name}", payload=payload))
+
+    def test_every_sample_between_frames_is_kept(self):
+        for frame in range(10):
+            for i in range(3):
+                self.now = 30 * frame + i
+                self.receive("ATTITUDE", {"time_boot_ms": self.now, "roll": float(self.now)})
+            self.receive("HEARTBEAT", {"type": 12})
+            self.io.update()
+
+        history = self.handler.history("ATTITUDE")
+        self.assertEqual(history.count, 30)
+        np.testing.assert_array_equal(history.latest(3)["arrival_ns"], [270, 271, 272])
+        self.assertEqual(self.handler.mavlink_messages["ATTITUDE"].roll, 272.0)
+        self.assertEqual(self.handler.mavlink_messages["HEARTBEAT"].type, 12)
+        self.assertEqual(self.handler.messages_received, 40)
+
+    def test_acks_in_the_same_frame_settle_every_command(self):
+        # The pair calibrate_gyro sends.
+        set_mode = self.handler.add_command(176, (0,) * 7)
+        calibration = self.handler.add_command(241, (1, 0, 0, 0, 0, 0, 0), timeout=30.0, retries=0)
+        self.io.update()
+        self.assertEqual(self.published, ["PC/mavlink/send_msg/176", "PC/mavlink/send_msg/241"])
+
+        self.receive("COMMAND_ACK", {"command": 176, "result": MAV_RESULT_ACCEPTED})
+        self.receive("COMMAND_ACK", {"command": 241, "result": MAV_RESULT_ACCEPTED})
+        self.now += 1_000_000
+        self.io.update()
+
+        self.assertTrue(set_mode.accepted)
+        self.assertTrue(calibration.accepted)
+
+        # Nothing is left to send again once the timeout has passed.
+        self.now += 5_000_000_000
+        self.io.update()
+        self.assertEqual(len(self.published), 2)
+        self.assertEqual(self.handler.commands.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
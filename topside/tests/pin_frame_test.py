@@ -0,0 +1,39 @@
+import unittest
+
+from config.pin import PinConfig
+from hardware.pin import Pin
+from io_systems.pin_frame import encode_pin_frame, decode_pin_frame, SEQUENCE_MODULUS
+
+
+class pin_frame_test(unittest.TestCase):
+
+    def setUp(self):
+        self._pins = {
+            "FRONT_LEFT": Pin(PinConfig(id=21, mode="PWMus", val=1500, freq=50)),
+            "FRONT_RIGHT": Pin(PinConfig(id=20, mode="PWMus", val=1900, freq=50)),
+            "LIGHTS": Pin(PinConfig(id=4, mode="OUTPUT", val=1)),
+        }
+
+    def test_round_trip(self):
+        payload = encode_pin_frame(self._pins.items(), sequence=7, timestamp_ns=123456789)
+
+        sequence, timestamp_ns, pins = decode_pin_frame(payload)
+
+        self.assertEqual(sequence, 7)
+        self.assertEqual(timestamp_ns, 123456789)
+        self.assertEqual(set(pins), set(self._pins))
+        for name, pin in self._pins.items():
+            self.assertEqual(pins[name], PinConfig(id=pin.id, mode=pin.mode, val=pin.val, freq=pin.freq))
+
+    def test_sequence_wraps(self):
+        payload = encode_pin_frame(self._pins.items(), sequence=SEQUENCE_MODULUS + 3, timestamp_ns=0)
+
+        sequence, _, _ = decode_pin_frame(payload)
+
+        self.assertEqual(sequence, 3)
+
+    def test_empty_frame(self):
+        sequence, _, pins = decode_pin_frame(encode_pin_frame([], sequence=1, timestamp_ns=0))
+
+        self.assertEqual(sequence, 1)
+        self.assertEqual(pins, {})
@@ -0,0 +1,38 @@
+import unittest
+
+from utilities.profiler import LoopProfiler
+
+
+class profiler_test(unittest.TestCase):
+
+    def test_percentiles(self):
+        profiler = LoopProfiler(window=100)
+        for duration in range(1, 201):
+            profiler.record("stage", duration * 1000)
+
+        stats = profiler.stats("stage")
+
+        # Only the most recent 100 durations are in the window.
+        self.assertEqual(stats.count, 200)
+        self.assertEqual(stats.max_ns, 200_000)
+        self.assertAlmostEqual(stats.p50_ns, 150_500)
+        self.assertAlmostEqual(stats.mean_ns, 150_500)
+
+    def test_span(self):
+        profiler = LoopProfiler()
+        span = profiler.span("stage")
+
+        for _ in range(3):
+            with span:
+                pass
+
+        self.assertIs(profiler.span("stage"), span)
+        self.assertEqual(profiler.stats("stage").count, 3)
+        self.assertIn("stage", profiler.report())
+
+    def test_empty_report(self):
+        profiler = LoopProfiler()
+
+        # Just the header, with nothing recorded yet.
+        self.assertEqual(profiler.summary(), [])
+        self.assertEqual(profiler.report().split(), ["stage", "mean", "p50", "p90", "p99", "max", "(us)"])
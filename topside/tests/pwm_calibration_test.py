@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from config.thruster import ThrusterConfig
+from config.typed_range import IntRange
+from hardware.pwm_calibration import PWMCalibration, t200_curve
+from hardware.thruster_pwm import ThrusterPWM, FrameThrusters
+from rovs.spike.enums import ThrusterPositions, Directions
+
+
+class pwm_calibration_test(unittest.TestCase):
+
+    def setUp(self):
+        self._configs = [
+            ThrusterConfig(name=ThrusterPositions.FRONT_LEFT, pwm_pulse_range=IntRange(1100, 1900)),
+            ThrusterConfig(name=ThrusterPositions.FRONT_RIGHT, pwm_pulse_range=IntRange(1100, 1900),
+                           reversed_thrust=True, thrust=0.7),
+            ThrusterConfig(name=ThrusterPositions.REAR_LEFT, pwm_pulse_range=IntRange(1000, 2000)),
+        ]
+
+    def test_linear_matches_thruster(self):
+        calibration = PWMCalibration(self._configs)
+        thrusters = [ThrusterPWM(config) for config in self._configs]
+        thrusts = np.array([thruster.thrust for thruster in thrusters])
+
+        for power in np.linspace(-1, 1, 401):
+            powers = np.array([power, -power, power / 3])
+            expected = []
+            for thruster, thruster_power in zip(thrusters, powers):
+                thruster.requested_power = float(thruster_power)
+                expected.append(thruster.pwm_output)
+
+            self.assertEqual(calibration.evaluate(powers * thrusts).tolist(), expected)
+
+    def test_t200_curve(self):
+        config = self._configs[0]._replace(pwm_curve=t200_curve())
+        calibration = PWMCalibration([config])
+
+        def pulse(power: float) -> int:
+            return int(calibration.evaluate(np.array([power]))[0])
+
+        self.assertEqual(pulse(0.0), 1500)
+        self.assertEqual(pulse(1.0), 1900)
+        self.assertEqual(pulse(-1.0), 1100)
+        # The smallest requests should already be out of the deadband.
+        self.assertGreaterEqual(pulse(0.002), 1525)
+        self.assertLessEqual(pulse(-0.002), 1475)
+
+        powers = np.linspace(-1, 1, 1001)
+        self.assertTrue(np.all(np.diff([pulse(p) for p in powers]) >= 0))
+
+    def test_frame_uses_curves(self):
+        configs = [config._replace(pwm_curve=t200_curve()) if i == 0 else config
+                   for i, config in enumerate(self._configs)]
+        frame = FrameThrusters({config.name: ThrusterPWM(config) for config in configs})
+        standalone = {config.name: ThrusterPWM(config) for config in configs}
+
+        motions = {direction: 0.0 for direction in Directions}
+        motions[Directions.FORWARDS] = 0.4
+        motions[Directions.YAW] = -0.2
+        pwm = frame.update_thruster_output(motions)
+
+        self.assertIs(pwm, frame.pwm)
+        for i, (position, thruster) in enumerate(standalone.items()):
+            thruster.requested_power = frame.normalized_output[position]
+            self.assertEqual(pwm[position], thruster.pwm_output)
+            self.assertEqual(frame.pwm_array[i], thruster.pwm_output)
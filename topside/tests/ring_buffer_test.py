@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from utilities.ring_buffer import RingBuffer
+
+
+class ring_buffer_test(unittest.TestCase):
+
+    def test_wraps_oldest_first(self):
+        buffer = RingBuffer(4)
+        for value in range(6):
+            buffer.append(value)
+
+        self.assertEqual(buffer.values().tolist(), [2, 3, 4, 5])
+        self.assertEqual(buffer.latest, 5)
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.count, 6)
+        self.assertTrue(buffer.full)
+
+    def test_partial_and_clear(self):
+        buffer = RingBuffer(4, shape=(2,), dtype=np.int64)
+        buffer.append((1, 2))
+
+        self.assertEqual(buffer.values().tolist(), [[1, 2]])
+
+        buffer.clear()
+        self.assertEqual(len(buffer), 0)
+        with self.assertRaises(IndexError):
+            _ = buffer.latest
+
+    def test_since(self):
+        buffer = RingBuffer(4)
+        for value in range(3):
+            buffer.append(value)
+        read = buffer.count
+
+        for value in range(3, 6):
+            buffer.append(value)
+
+        self.assertEqual(buffer.since(read).tolist(), [3, 4, 5])
+        self.assertEqual(buffer.since(0).tolist(), [2, 3, 4, 5])
+        self.assertEqual(buffer.since(read, end=5).tolist(), [3, 4])
+        self.assertEqual(buffer.since(buffer.count).tolist(), [])
+
+        buffer.clear()
+        buffer.append(6)
+        self.assertEqual(buffer.since(read).tolist(), [6])
+        self.assertEqual(buffer.values().tolist(), [6])
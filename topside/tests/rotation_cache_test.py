@@ -0,0 +1,53 @@
+import unittest
+
+from utilities.rotation_cache import RotationCache
+
+
+class rotation_cache_test(unittest.TestCase):
+
+    def setUp(self):
+        self.rendered = []
+
+    def render(self, angle):
+        self.rendered.append(angle)
+        return f"image at {angle}"
+
+    def test_snaps_to_resolution(self):
+        cache = RotationCache(self.render, resolution=2)
+
+        self.assertEqual(cache.get(10.9), "image at 10.0")
+        self.assertEqual(cache.get(11.1), "image at 12.0")
+        self.assertEqual(cache.get(-0.5), "image at 0.0")
+        self.assertEqual(cache.step(361), cache.step(1))
+        self.assertEqual(cache.step(-2), cache.steps - 1)
+
+    def test_renders_each_step_once(self):
+        cache = RotationCache(self.render)
+
+        for _ in range(3):
+            cache.get(45.2)
+            cache.get(44.8)
+
+        self.assertEqual(self.rendered, [45.0])
+        self.assertEqual((cache.hits, cache.misses), (5, 1))
+
+    def test_drops_least_recently_used(self):
+        cache = RotationCache(self.render, capacity=2)
+
+        cache.get(0)
+        cache.get(1)
+        cache.get(0)
+        cache.get(2)
+        self.assertEqual(len(cache), 2)
+
+        cache.get(0)
+        cache.get(1)
+        self.assertEqual(self.rendered, [0, 1, 2, 1])
+
+    def test_prerender(self):
+        cache = RotationCache(self.render, resolution=45)
+        cache.prerender()
+
+        self.assertEqual(len(cache), 8)
+        cache.get(90)
+        self.assertEqual(cache.misses, 8)
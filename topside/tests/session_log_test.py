@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+import controller as ctrl
+from io_systems.session_log import SessionRecorder, SessionReplay
+from rovs.spike.enums import ControllerNames
+from tests.controller_helpers import FakeJoystick, make_controller, snapshot
+
+
+def make_controllers() -> dict[ControllerNames, ctrl.Controller]:
+    return {ControllerNames.PRIMARY_DRIVER: make_controller(axis_count=4, button_count=4, deadzone=0.1)}
+
+
+class session_log_test(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "session")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_record_and_replay(self):
+        controllers = make_controllers()
+        controller = controllers[ControllerNames.PRIMARY_DRIVER]
+        joystick = FakeJoystick()
+        controller.initialize(joystick)
+        recorder = SessionRecorder(self._path, controllers, batch_size=16)
+
+        rng = random.Random(0)
+        expected_states = []
+        expected_changes = []
+        for frame in range(100):
+            joystick.axes[rng.randrange(4)] = rng.uniform(-1, 1)
+            if rng.random() < 0.2:
+                index = rng.randrange(4)
+                joystick.buttons[index] = not joystick.buttons[index]
+            if rng.random() < 0.1:
+                joystick.hat = (rng.choice((-1, 0, 1)), rng.choice((-1, 0, 1)))
+            changes = {}
+            if frame % 7 == 0:
+                changes = {"ROV/custom/depth_sensor/depth": frame / 10, "ROV/status": {"frame": frame}}
+
+            controller.update()
+            recorder.record(changes)
+            expected_states.append(snapshot(controller))
+            expected_changes.append(changes)
+        recorder.close()
+
+        replay = SessionReplay(self._path)
+        replayed = make_controllers()
+        handler = replay.input_handler(replayed)
+        generation = 0
+
+        self.assertEqual(replay.frame_count, 100)
+        for frame in range(100):
+            handler.update()
+            generation, changes = replay.connection.get_subscription_changes(generation)
+
+            self.assertEqual(snapshot(replayed[ControllerNames.PRIMARY_DRIVER]), expected_states[frame])
+            self.assertEqual(changes, expected_changes[frame])
+        self.assertTrue(replay.finished)
+        self.assertEqual(replay.connection.get_subscriptions()["ROV/status"], {"frame": 98})
+
+    def test_readable_while_recording(self):
+        controllers = make_controllers()
+        controllers[ControllerNames.PRIMARY_DRIVER].initialize(FakeJoystick())
+        recorder = SessionRecorder(self._path, controllers, batch_size=8)
+
+        for _ in range(20):
+            recorder.record({})
+
+        # Only whole batches have been written.
+        frames = np.load(os.path.join(self._path, "controllers.npy"), mmap_mode="r")
+        self.assertEqual(len(frames), 16)
+        self.assertEqual(SessionReplay(self._path).frame_count, 16)
+
+        recorder.close()
+        self.assertEqual(SessionReplay(self._path).frame_count, 20)
@@ -0,0 +1,109 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+from config.mavlink import StreamRateConfig
+from io_systems.mavlink_handler import JsonMessage, MavlinkHandler
+from io_systems.mavlink_history import MessageHistory
+from io_systems.mqtt_handler import ROVConnection
+from io_systems.stream_rates import DISABLED_INTERVAL, StreamRateManager
+
+SECOND = 1_000_000_000
+
+
+class stream_rates_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.requests = []
+        self.histories = {"HEARTBEAT": MessageHistory("HEARTBEAT"), "ATTITUDE": MessageHistory("ATTITUDE")}
+        self.manager = StreamRateManager(
+            {"heartbeat": 0, "attitude": 30}, self.requests.append, self.histories,
+            StreamRateConfig(idle_rate=1.0, check_interval=1.0, under_delivery=0.8), clock=lambda: self.now,
+        )
+
+    def arrive(self, name: str, count: int) -> None:
+        for _ in range(count):
+            self.histories[name].append(JsonMessage(name, {"time_boot_ms": 0}), self.now)
+
+    def test_merges_active_consumers(self):
+        self.manager.declare("control_mode", {"ATTITUDE": 50})
+        self.manager.declare("logger", {"ATTITUDE": 100})
+        self.manager.activate("control_mode")
+        self.manager.update()
+        self.assertEqual(self.requests, [{0: 1_000_000, 30: 20_000}])
+
+        self.manager.activate("logger")
+        self.manager.update()
+        self.assertEqual(self.requests[-1], {30: 10_000})
+
+        # Nothing reads it any more, so it drops to the idle rate.
+        self.manager.activate("logger", False)
+        self.manager.activate("control_mode", False)
+        self.manager.update()
+        self.assertEqual(self.requests[-1], {30: 1_000_000})
+        self.assertEqual(self.manager.requested, {"HEARTBEAT": 1.0, "ATTITUDE": 1.0})
+
+    def test_only_under_delivering_streams_are_requested_again(self):
+        self.manager.declare("control_mode", {"ATTITUDE": 100})
+        self.manager.activate("control_mode")
+        self.manager.update()
+
+        self.now += SECOND
+        self.arrive("HEARTBEAT", 1)
+        self.arrive("ATTITUDE", 50)
+        self.manager.update()
+        self.assertEqual(self.requests[-1], {30: 10_000})
+        self.assertEqual(self.manager.measured, {"HEARTBEAT": 1.0, "ATTITUDE": 50.0})
+
+        self.now += SECOND
+        self.arrive("HEARTBEAT", 1)
+        self.arrive("ATTITUDE", 95)
+        self.manager.update()
+        self.assertEqual(len(self.requests), 2)
+
+    def test_waits_a_whole_check_before_judging(self):
+        self.manager.update()
+        self.now += SECOND // 2
+        self.manager.update()
+        self.assertEqual(len(self.requests), 1)
+
+    def test_zero_idle_rate_disables(self):
+        self.assertEqual(StreamRateManager.interval(0), DISABLED_INTERVAL)
+
+    def test_unsubscribed_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.manager.declare("control_mode", {"SCALED_IMU": 100})
+        with self.assertRaises(KeyError):
+            self.manager.activate("unknown")
+
+    def test_rates_above_the_control_rate_arrive_through_the_connection(self):
+        connection = ROVConnection()
+        handler = MavlinkHandler(history_types=["HEARTBEAT", "ATTITUDE"], clock=lambda: self.now)
+        handler.listen(connection.add_listener)
+        manager = StreamRateManager(
+            {"heartbeat": 0, "attitude": 30}, self.requests.append, handler.histories,
+            StreamRateConfig(idle_rate=1.0, check_interval=1.0, under_delivery=0.8), clock=lambda: self.now,
+        )
+        manager.declare("control_mode", {"ATTITUDE": 200})
+        manager.activate("control_mode")
+        manager.update()
+
+        # 200 Hz arrives on the network thread while the main loop only runs the telemetry stage at 10 Hz.
+        for frame in range(10):
+            for i in range(20):
+                self.now = frame * SECOND // 10 + i * SECOND // 200
+                connection._on_message(None, None, SimpleNamespace(
+                    topic="ROV/mavlink/ATTITUDE", payload=json.dumps({"roll": 0.0}).encode()
+                ))
+            self.now = (frame + 1) * SECOND // 10
+            if frame == 9:
+                connection._on_message(None, None, SimpleNamespace(topic="ROV/mavlink/HEARTBEAT", payload=b"{}"))
+            manager.update()
+
+        self.assertEqual(manager.measured["ATTITUDE"], 200.0)
+        self.assertEqual(len(self.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from types import SimpleNamespace
+
+from io_systems.mqtt_handler import ROVConnection
+
+
+class subscription_store_test(unittest.TestCase):
+
+    def setUp(self):
+        self._connection = ROVConnection()
+
+    def receive(self, topic, payload):
+        self._connection._on_message(None, None, SimpleNamespace(topic=topic, payload=payload.encode()))
+
+    def test_payloads_are_decoded(self):
+        self.receive("ROV/mavlink/ATTITUDE", '{"roll": 0.5}')
+        self.receive("ROV/custom/depth_sensor/depth", "1.25")
+        self.receive("ROV/status", "armed")
+
+        subscriptions = self._connection.get_subscriptions()
+
+        self.assertEqual(subscriptions["ROV/mavlink/ATTITUDE"], {"roll": 0.5})
+        self.assertEqual(subscriptions["ROV/custom/depth_sensor/depth"], 1.25)
+        self.assertEqual(subscriptions["ROV/status"], "armed")
+
+    def test_snapshot_is_read_only_and_reused(self):
+        self.receive("ROV/status", "armed")
+
+        first = self._connection.get_subscriptions()
+        self.assertIs(first, self._connection.get_subscriptions())
+        with self.assertRaises(TypeError):
+            first["ROV/status"] = "disarmed"
+
+        self.receive("ROV/status", "disarmed")
+        second = self._connection.get_subscriptions()
+        self.assertEqual(first["ROV/status"], "armed")
+        self.assertEqual(second["ROV/status"], "disarmed")
+
+    def test_changes_since_generation(self):
+        self.receive("ROV/a", "1")
+        self.receive("ROV/b", "2")
+        generation, changes = self._connection.get_subscription_changes(0)
+        self.assertEqual(changes, {"ROV/a": 1, "ROV/b": 2})
+
+        self.receive("ROV/a", "3")
+        self.receive("ROV/a", "4")
+        generation, changes = self._connection.get_subscription_changes(generation)
+        self.assertEqual(changes, {"ROV/a": 4})
+
+        generation, changes = self._connection.get_subscription_changes(generation)
+        self.assertEqual(changes, {})
+        self.assertEqual(generation, self._connection.generation)
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from config.thrust_allocation import ThrustAllocationConfig
+from hardware import thruster_pwm
+from hardware.thrust_allocation import ThrustAllocator
+from rovs.spike import rov_config
+from rovs.spike.enums import Directions
+
+
+class thrust_allocation_test(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self._motor_matrix = rng.uniform(-1, 1, (8, 6))
+        self._allocator = ThrustAllocator(ThrustAllocationConfig(mode="optimal"))
+        self._allocator.set_motor_matrix(self._motor_matrix)
+
+    def cost(self, powers: np.ndarray, wrench: np.ndarray) -> float:
+        error = self._motor_matrix.T @ powers - wrench
+        return error @ error + ThrustAllocationConfig().regularization * powers @ powers
+
+    def test_feasible_wrench(self):
+        wrench = self._motor_matrix.T @ np.linspace(-0.5, 0.5, 8)
+
+        powers = self._allocator.solve(wrench)
+
+        self.assertTrue(np.all(np.abs(powers) <= 1))
+        self.assertTrue(np.allclose(self._motor_matrix.T @ powers, wrench, atol=1e-3))
+
+    def test_saturated_wrench(self):
+        wrench = self._motor_matrix.T @ np.full(8, 3.0)
+
+        powers = self._allocator.solve(wrench)
+
+        self.assertTrue(np.all(np.abs(powers) <= 1))
+        self.assertTrue(np.any(np.abs(powers) == 1))
+
+        # The solution should beat clipping the unconstrained answer and every nearby point inside the limits.
+        clipped = np.clip(np.linalg.pinv(self._motor_matrix.T) @ wrench, -1, 1)
+        self.assertLessEqual(self.cost(powers, wrench), self.cost(clipped, wrench))
+
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            nearby = np.clip(powers + rng.normal(0, 0.05, 8), -1, 1)
+            self.assertLessEqual(self.cost(powers, wrench), self.cost(nearby, wrench) + 1e-12)
+
+    def test_warm_start(self):
+        wrench = self._motor_matrix.T @ np.full(8, 3.0)
+
+        self._allocator.solve(wrench)
+        self._allocator.solve(wrench)
+
+        self.assertEqual(self._allocator.iterations, 1)
+
+    def test_frame_optimal_mode(self):
+        config = rov_config.ROVConfig()
+        thrusters = {position: thruster_pwm.ThrusterPWM(c) for position, c in config.thruster_configs.items()}
+        frame = thruster_pwm.FrameThrusters(thrusters, ThrustAllocationConfig(mode="optimal"))
+
+        motions = {direction: 0.0 for direction in Directions}
+        motions[Directions.FORWARDS] = 0.5
+        frame.update_thruster_output(motions)
+
+        allocation = frame.motor_matrix.T
+        expected = np.zeros(6)
+        expected[0] = 0.5 * np.abs(allocation[0]).sum()
+        self.assertTrue(np.allclose(allocation @ frame.power_array, expected, atol=1e-3))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            thruster_pwm.FrameThrusters({}, ThrustAllocationConfig(mode="fastest"))
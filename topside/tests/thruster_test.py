@@ -182,6 +182,36 @@ class thruster_test(unittest.TestCase):
 
         self.compare_motor_states(expected=expected, actual=actual)
 
+    def test_allocation_matrix_cache(self):
+        matrix = self._frame.motor_matrix.copy()
+        pinv = self._frame.allocation_pinv
+
+        # The pseudo-inverse should reproduce any wrench the thrusters can produce.
+        wrench = matrix.T @ np.linspace(-1, 1, len(self._thrusters))
+        self.assertTrue(np.allclose(matrix.T @ (pinv @ wrench), wrench))
+
+        # Changing a thruster's geometry should rebuild the matrix.
+        row = list(self._thrusters).index(ThrusterPositions.FRONT_LEFT)
+        self._thrusters[ThrusterPositions.FRONT_LEFT].thrust = 0.5
+        self.assertTrue(np.allclose(self._frame.motor_matrix[row], matrix[row] * 0.5))
+        self.assertFalse(np.allclose(self._frame.allocation_pinv, pinv))
+
+    def test_power_and_pwm_arrays(self):
+        self._frame.update_thruster_output({
+            Directions.FORWARDS: 0.6, Directions.RIGHT: -0.3, Directions.UP: 0.4,
+            Directions.YAW: 0.2, Directions.PITCH: 0.0, Directions.ROLL: -0.1,
+        })
+
+        for i, position in enumerate(self._thrusters):
+            self.assertEqual(self._frame.power_array[i], self._frame.normalized_output[position])
+            self.assertEqual(self._frame.pwm_array[i], self._frame.pwm[position])
+
+        # Each group is scaled so its largest thruster matches the magnitude of the motions it handles.
+        vertical = ["_VERTICAL" in str(position) for position in self._thrusters]
+        powers = np.abs(self._frame.power_array)
+        self.assertAlmostEqual(max(p for p, v in zip(powers, vertical) if not v), math.sqrt(0.6**2 + 0.3**2 + 0.2**2))
+        self.assertAlmostEqual(max(p for p, v in zip(powers, vertical) if v), math.sqrt(0.4**2 + 0.1**2))
+
     def compare_motor_states(self, expected: dict[ThrusterPositions, float], actual : dict[ThrusterPositions, float]):
         pass_test = True
         for thruster_name in list(ThrusterPositions):
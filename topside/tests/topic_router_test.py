@@ -0,0 +1,44 @@
+import unittest
+
+from io_systems.topic_router import TopicRouter
+
+
+class topic_router_test(unittest.TestCase):
+
+    def setUp(self):
+        self._router = TopicRouter()
+        self._received = []
+
+    def recorder(self, name):
+        return lambda path, value: self._received.append((name, path, value))
+
+    def test_routes_to_prefix_owner(self):
+        self._router.register("ROV/pins", self.recorder("pins"))
+        self._router.register("ROV/mavlink", self.recorder("mavlink"))
+
+        self.assertTrue(self._router.route("ROV/pins/FRONT_LEFT", 1500))
+        self.assertTrue(self._router.route("ROV/mavlink/ATTITUDE", {"roll": 0.1}))
+
+        self.assertEqual(self._received, [
+            ("pins", ("FRONT_LEFT",), 1500),
+            ("mavlink", ("ATTITUDE",), {"roll": 0.1}),
+        ])
+
+    def test_unknown_topic(self):
+        self._router.register("ROV/pins", self.recorder("pins"))
+
+        self.assertFalse(self._router.route("ROV/custom/depth_sensor/depth", 1.0))
+        self.assertFalse(self._router.route("ROV/pinsx/FRONT_LEFT", 1.0))
+        self.assertEqual(self._received, [])
+
+    def test_longest_prefix_wins(self):
+        self._router.register("ROV", self.recorder("rov"))
+        self._router.route("ROV/i2c/imu/gyro", 1)
+
+        self._router.register("ROV/i2c", self.recorder("i2c"))
+        self._router.route("ROV/i2c/imu/gyro", 2)
+
+        self.assertEqual(self._received, [
+            ("rov", ("i2c", "imu", "gyro"), 1),
+            ("i2c", ("imu", "gyro"), 2),
+        ])
@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from io_systems.video_packets import FrameAssembler, FrameBufferPool, LatestFrameQueue, packetize_frame
+
+CHUNK_SIZE = 108
+
+
+def make_frame(frame_id: int, size: int = 1000) -> bytes:
+    return bytes((frame_id * 7 + i) % 256 for i in range(size))
+
+
+class video_packets_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.pool = FrameBufferPool(6, 4096)
+        self.assembler = FrameAssembler(self.pool, CHUNK_SIZE, max_pending=4, timeout=0.1, clock=lambda: self.now)
+
+    def add_all(self, datagrams):
+        frames = []
+        for datagram in datagrams:
+            frame = self.assembler.add(memoryview(datagram))
+            if frame is not None:
+                frames.append((frame.frame_id, bytes(frame.data)))
+                self.pool.release(frame.buffer)
+        return frames
+
+    def test_reorders_chunks(self):
+        datagrams = packetize_frame(3, make_frame(3), CHUNK_SIZE)
+        random.Random(0).shuffle(datagrams)
+
+        self.assertEqual(self.add_all(datagrams), [(3, make_frame(3))])
+        self.assertEqual(self.pool.available, 6)
+
+    def test_carries_capture_time(self):
+        self.now = 42
+        frame = None
+        for datagram in packetize_frame(5, make_frame(5), CHUNK_SIZE, capture_ns=(1 << 60) + 7):
+            frame = self.assembler.add(memoryview(datagram)) or frame
+
+        self.assertEqual((frame.capture_ns, frame.first_chunk_ns), ((1 << 60) + 7, 42))
+
+    def test_interleaved_frames_and_duplicates(self):
+        first = packetize_frame(1, make_frame(1), CHUNK_SIZE)
+        second = packetize_frame(2, make_frame(2, 333), CHUNK_SIZE)
+        datagrams = [datagram for pair in zip(first, second) for datagram in pair] + first[len(second):]
+        datagrams.insert(3, first[0])
+
+        self.assertEqual(self.add_all(datagrams), [(2, make_frame(2, 333))])
+        # The first frame completed after the second, so it's dropped rather than shown out of order.
+        self.assertEqual(self.assembler.frames_lost, 1)
+        self.assertEqual(self.assembler.chunks_ignored, len(first) - len(second) + 1)
+
+    def test_lost_chunk_drops_frame(self):
+        datagrams = packetize_frame(1, make_frame(1), CHUNK_SIZE)
+        del datagrams[4]
+        self.assertEqual(self.add_all(datagrams), [])
+
+        self.now += 200_000_000
+        self.assertEqual(self.add_all(packetize_frame(2, make_frame(2), CHUNK_SIZE)), [(2, make_frame(2))])
+        self.assertEqual((self.assembler.frames_lost, self.assembler.chunks_lost), (1, 1))
+        self.assertEqual(self.pool.available, 6)
+
+    def test_skipped_frames_counted_lost(self):
+        self.add_all(packetize_frame(1, make_frame(1), CHUNK_SIZE))
+        self.add_all(packetize_frame(5, make_frame(5), CHUNK_SIZE))
+
+        self.assertEqual((self.assembler.frames_completed, self.assembler.frames_lost), (2, 3))
+
+    def test_frame_ids_wrap(self):
+        frames = self.add_all(packetize_frame(2 ** 32 - 1, make_frame(1), CHUNK_SIZE)
+                              + packetize_frame(2 ** 32, make_frame(2), CHUNK_SIZE))
+
+        self.assertEqual([frame_id for frame_id, _ in frames], [2 ** 32 - 1, 0])
+        self.assertEqual(self.assembler.frames_lost, 0)
+
+    def test_latest_frame_queue_replaces(self):
+        queue = LatestFrameQueue()
+        self.assertIsNone(queue.put("first"))
+        self.assertEqual(queue.put("second"), "first")
+
+        self.assertEqual(queue.get(0), "second")
+        self.assertIsNone(queue.get(0))
+        self.assertEqual(queue.replaced, 1)
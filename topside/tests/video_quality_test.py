@@ -0,0 +1,62 @@
+import unittest
+
+from config.video import VideoQualityConfig
+from io_systems.video_packets import VideoStats
+from io_systems.video_quality import VideoQualityController, VideoTargets
+
+
+def make_stats(received: int, lost: int = 0, decode_ms: float = 5.0) -> VideoStats:
+    return VideoStats(30.0, received, lost, 0, 0.0, 0.0, 10.0, 12.0, 2000.0, decode_ms, decode_ms)
+
+
+class video_quality_test(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.stats = {"frame0": make_stats(0)}
+        self.limits = VideoTargets(240, 30, 80)
+        self.published = {}
+        self.controller = VideoQualityController(
+            lambda: self.stats, lambda: self.limits, self.published.update,
+            VideoQualityConfig(increase=0.1, backoff=0.5, hold=1.0), clock=lambda: self.now,
+        )
+
+    def step(self, received: int, lost: int = 0, decode_ms: float = 5.0) -> VideoTargets:
+        previous = self.stats["frame0"]
+        self.stats = {"frame0": make_stats(previous.frames_received + received, previous.frames_lost + lost, decode_ms)}
+        self.now += 100_000_000
+        self.controller.update()
+        return self.controller.targets["frame0"]
+
+    def test_clear_link_uses_limits(self):
+        self.assertEqual(self.step(3), VideoTargets(240, 30, 80))
+        self.assertEqual(
+            self.published, {"video/frame0/height": 240, "video/frame0/fps": 30, "video/frame0/quality": 80}
+        )
+
+    def test_backs_off_once_per_hold_and_recovers(self):
+        self.assertEqual(self.step(2, lost=1).quality, 40)
+        # Still congested, but the stats still cover the same loss.
+        self.assertEqual(self.step(2, lost=1).quality, 40)
+
+        for _ in range(5):
+            targets = self.step(3)
+        self.assertEqual(targets, VideoTargets(240, 30, 80))
+
+    def test_frame_rate_drops_below_knee(self):
+        for _ in range(2):
+            targets = self.step(2, lost=1)
+            self.now += 1_000_000_000
+
+        self.assertEqual(targets.quality, 20)
+        self.assertEqual(targets.fps, 15)
+
+    def test_slow_decode_lowers_resolution(self):
+        targets = self.step(3, decode_ms=40)
+
+        self.assertEqual(targets, VideoTargets(120, 30, 80))
+
+    def test_never_exceeds_lowered_limits(self):
+        self.limits = VideoTargets(100, 5, 5)
+
+        self.assertEqual(self.step(3), VideoTargets(100, 5, 5))
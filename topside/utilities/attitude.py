@@ -0,0 +1,139 @@
+"""Converts the flight controller's attitude quaternions to yaw, pitch, and roll, one at a time or whole histories at
+once.
+
+MAVLink's ATTITUDE_QUATERNION gives the quaternion as q1 to q4, which are w, x, y, and z, and rotates from the ROV's
+body frame to north-east-down. The angles are the aerospace yaw, pitch, roll sequence, the same as the ATTITUDE
+message's, in radians. Pitch is between -pi/2 and pi/2, and yaw and roll are between -pi and pi.
+"""
+import math
+
+import numpy as np
+
+from utilities.vector import Vector3
+
+# The fields of an ATTITUDE_QUATERNION history sample that hold w, x, y, and z.
+QUATERNION_FIELDS = ("q1", "q2", "q3", "q4")
+
+
+def quaternion_to_euler(w: float, x: float, y: float, z: float) -> Vector3:
+    """Convert a quaternion to yaw, pitch, and roll. It doesn't need to be normalized.
+
+    Args:
+        w (float):
+            The scalar part of the quaternion.
+        x (float):
+            The x part of the quaternion.
+        y (float):
+            The y part of the quaternion.
+        z (float):
+            The z part of the quaternion.
+
+    Returns:
+        Vector3: The yaw, pitch, and roll, in radians, or all 0 for a quaternion of 0.
+    """
+    norm = w * w + x * x + y * y + z * z
+    if norm == 0:
+        return Vector3(yaw=0, pitch=0, roll=0)
+
+    # Scaling by the squared norm here normalizes the products below, without any square roots.
+    scale = 2 / norm
+    return Vector3(
+        yaw=math.atan2(scale * (w * z + x * y), 1 - scale * (y * y + z * z)),
+        pitch=math.asin(max(-1.0, min(1.0, scale * (w * y - z * x)))),
+        roll=math.atan2(scale * (w * x + y * z), 1 - scale * (x * x + y * y)),
+    )
+
+
+def quaternions_to_euler(quaternions: np.ndarray) -> np.ndarray:
+    """Convert any number of quaternions to yaw, pitch, and roll at once. They don't need to be normalized.
+
+    Args:
+        quaternions (np.ndarray):
+            The quaternions as w, x, y, and z along the last axis.
+
+    Returns:
+        np.ndarray: The yaw, pitch, and roll along the last axis, in radians, or all 0 for quaternions of 0.
+    """
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    w, x, y, z = np.moveaxis(quaternions, -1, 0)
+
+    norm = np.asarray(np.einsum("...i,...i->...", quaternions, quaternions))
+    scale = np.divide(2.0, norm, out=np.zeros_like(norm, dtype=float), where=norm != 0)
+
+    euler = np.empty(quaternions.shape[:-1] + (3,))
+    euler[..., 0] = np.arctan2(scale * (w * z + x * y), 1 - scale * (y * y + z * z))
+    euler[..., 1] = np.arcsin(np.clip(scale * (w * y - z * x), -1.0, 1.0))
+    euler[..., 2] = np.arctan2(scale * (w * x + y * z), 1 - scale * (x * x + y * y))
+    return euler
+
+
+def history_to_euler(samples: np.ndarray) -> np.ndarray:
+    """Convert samples of an ATTITUDE_QUATERNION history to yaw, pitch, and roll.
+
+    Args:
+        samples (np.ndarray):
+            The samples, such as from MessageHistory.new_samples.
+
+    Returns:
+        np.ndarray: The yaw, pitch, and roll of each sample, in radians, with shape (samples, 3).
+    """
+    return quaternions_to_euler(np.stack([samples[field] for field in QUATERNION_FIELDS], axis=-1))
+
+
+class Attitude:
+    """The attitude from the newest quaternion. Its yaw, pitch, and roll are only worked out once per quaternion, however
+    often they're read.
+
+    Properties:
+        quaternion (tuple[float, float, float, float]):
+            The newest quaternion, as w, x, y, and z.
+        generation (int):
+            How many quaternions have been set.
+        euler (Vector3):
+            The yaw, pitch, and roll of the newest quaternion, in radians. Shared between reads, so copy it to change it.
+
+    Methods:
+        set_quaternion(w: float, x: float, y: float, z: float) -> None:
+            Set the newest quaternion.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the Attitude object, level and facing north."""
+        self._quaternion = (1.0, 0.0, 0.0, 0.0)
+        self._generation = 0
+        self._euler = Vector3(yaw=0, pitch=0, roll=0)
+        self._euler_generation = 0
+
+    @property
+    def quaternion(self) -> tuple[float, float, float, float]:
+        """The newest quaternion, as w, x, y, and z."""
+        return self._quaternion
+
+    @property
+    def generation(self) -> int:
+        """How many quaternions have been set."""
+        return self._generation
+
+    @property
+    def euler(self) -> Vector3:
+        """The yaw, pitch, and roll of the newest quaternion, in radians."""
+        if self._euler_generation != self._generation:
+            self._euler = quaternion_to_euler(*self._quaternion)
+            self._euler_generation = self._generation
+        return self._euler
+
+    def set_quaternion(self, w: float, x: float, y: float, z: float) -> None:
+        """Set the newest quaternion. Its angles are worked out the next time they're read.
+
+        Args:
+            w (float):
+                The scalar part of the quaternion.
+            x (float):
+                The x part of the quaternion.
+            y (float):
+                The y part of the quaternion.
+            z (float):
+                The z part of the quaternion.
+        """
+        self._quaternion = (w, x, y, z)
+        self._generation += 1
@@ -0,0 +1,212 @@
+"""Fixed-rate scheduling of the main loop's stages against absolute deadlines.
+
+Each stage has its own rate. Its deadlines are a fixed grid of times (start, start + period, start + 2 * period, ...)
+rather than "period after the last run finished", so time spent running never shows up as drift. A stage that runs
+late is run as soon as possible, and a stage that falls more than a whole period behind skips the runs it missed
+instead of running them back to back. Both are counted, along with a histogram of how late each run started.
+"""
+import bisect
+import time
+from typing import Callable, NamedTuple
+
+
+class LoopStageStats(NamedTuple):
+    """Timing statistics for a scheduled stage.
+
+    Attributes:
+        name (str):
+            The name of the stage.
+        rate (float):
+            The rate the stage was asked to run at, in Hz.
+        runs (int):
+            How many times the stage has run.
+        overruns (int):
+            How many runs finished after the stage's next deadline.
+        skipped (int):
+            How many runs were skipped because the stage fell more than a period behind.
+        max_lateness_ns (int):
+            The latest a run has started after its deadline, in nanoseconds.
+        jitter_histogram (tuple[int, ...]):
+            How many runs started within each jitter bucket of their deadline. The last count is for runs later than
+            the last bucket edge.
+    """
+    name: str
+    rate: float
+    runs: int
+    overruns: int
+    skipped: int
+    max_lateness_ns: int
+    jitter_histogram: tuple[int, ...]
+
+
+class _LoopStage:
+    """A callback run at a fixed rate, and its timing statistics."""
+
+    def __init__(self, name: str, rate: float, callback: Callable[[], None], bucket_count: int) -> None:
+        self.name = name
+        self.rate = rate
+        self.period_ns = round(1_000_000_000 / rate)
+        self.callback = callback
+        self.next_deadline = 0
+
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness_ns = 0
+        self.histogram = [0] * bucket_count
+
+
+class LoopScheduler:
+    """Runs stages at their own fixed rates from a single thread.
+
+    Methods:
+        add_stage(name: str, rate: float, callback: Callable[[], None]) -> None:
+            Add a stage to run at a fixed rate.
+        run_once() -> None:
+            Wait for the next deadline and run every stage that is due.
+        stats() -> list[LoopStageStats]:
+            Get the timing statistics of every stage.
+        report() -> str:
+            Get a readable summary of the timing statistics.
+    """
+
+    def __init__(self, spin_threshold_ns: int = 500_000,
+                 jitter_buckets_us: tuple[int, ...] = (50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000),
+                 clock: Callable[[], int] = time.monotonic_ns, sleep: Callable[[float], None] = time.sleep) -> None:
+        """Initialize the LoopScheduler object.
+
+        Args:
+            spin_threshold_ns (int, optional):
+                How long before a deadline to stop sleeping and busy wait instead, in nanoseconds.
+                Defaults to 500_000.
+            jitter_buckets_us (tuple[int, ...], optional):
+                The upper edges of the lateness histogram buckets, in microseconds.
+                Defaults to (50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000).
+            clock (Callable[[], int], optional):
+                Returns the current time in nanoseconds. Must be monotonic.
+                Defaults to time.monotonic_ns.
+            sleep (Callable[[float], None], optional):
+                Sleeps for a number of seconds.
+                Defaults to time.sleep.
+        """
+        self._spin_threshold_ns = spin_threshold_ns
+        self._bucket_edges_ns = [edge * 1_000 for edge in jitter_buckets_us]
+        self._clock = clock
+        self._sleep = sleep
+
+        self._stages: list[_LoopStage] = []
+        self._start_time: int | None = None
+
+    @property
+    def jitter_buckets_us(self) -> tuple[int, ...]:
+        """The upper edges of the lateness histogram buckets, in microseconds."""
+        return tuple(edge // 1_000 for edge in self._bucket_edges_ns)
+
+    def add_stage(self, name: str, rate: float, callback: Callable[[], None]) -> None:
+        """Add a stage to run at a fixed rate. Stages that are due at the same time run in the order they were added.
+
+        Args:
+            name (str):
+                The name of the stage, used in the statistics.
+            rate (float):
+                How many times a second to run the stage, in Hz.
+            callback (Callable[[], None]):
+                The function to run.
+        """
+        if rate <= 0:
+            raise ValueError(f"The rate of stage {name} must be positive, got {rate}")
+
+        stage = _LoopStage(name, rate, callback, len(self._bucket_edges_ns) + 1)
+        if self._start_time is not None:
+            stage.next_deadline = self._clock()
+        self._stages.append(stage)
+
+    def run_once(self) -> None:
+        """Wait for the next deadline and run every stage that is due."""
+        if not self._stages:
+            return
+
+        if self._start_time is None:
+            self._start_time = self._clock()
+            for stage in self._stages:
+                stage.next_deadline = self._start_time
+
+        self._wait_until(min(stage.next_deadline for stage in self._stages))
+
+        for stage in self._stages:
+            start = self._clock()
+            if start < stage.next_deadline:
+                continue
+
+            lateness = start - stage.next_deadline
+            stage.histogram[bisect.bisect_left(self._bucket_edges_ns, lateness)] += 1
+            if lateness > stage.max_lateness_ns:
+                stage.max_lateness_ns = lateness
+
+            stage.callback()
+            stage.runs += 1
+
+            stage.next_deadline += stage.period_ns
+            end = self._clock()
+            if end > stage.next_deadline:
+                stage.overruns += 1
+
+                # Rather than running the missed deadlines back to back to catch up, skip them and carry on from the
+                # most recent one.
+                missed = (end - stage.next_deadline) // stage.period_ns
+                stage.skipped += missed
+                stage.next_deadline += missed * stage.period_ns
+
+    def _wait_until(self, deadline: int) -> None:
+        """Sleep until shortly before a deadline, then spin until it passes.
+
+        Args:
+            deadline (int):
+                The time to wait until, in nanoseconds on the scheduler's clock.
+        """
+        remaining = deadline - self._clock()
+        if remaining > self._spin_threshold_ns:
+            self._sleep((remaining - self._spin_threshold_ns) / 1_000_000_000)
+
+        while self._clock() < deadline:
+            pass
+
+    def stats(self) -> list[LoopStageStats]:
+        """Get the timing statistics of every stage.
+
+        Returns:
+            list[LoopStageStats]: The statistics of each stage, in the order they were added.
+        """
+        return [
+            LoopStageStats(
+                name=stage.name,
+                rate=stage.rate,
+                runs=stage.runs,
+                overruns=stage.overruns,
+                skipped=stage.skipped,
+                max_lateness_ns=stage.max_lateness_ns,
+                jitter_histogram=tuple(stage.histogram),
+            ) for stage in self._stages
+        ]
+
+    def report(self) -> str:
+        """Get a readable summary of the timing statistics.
+
+        Returns:
+            str: One line per stage with its requested and achieved rate, overruns, skipped runs and lateness.
+        """
+        elapsed = (self._clock() - self._start_time) / 1_000_000_000 if self._start_time is not None else 0
+        bucket_names = [f"<={edge}us" for edge in self.jitter_buckets_us] + [f">{self.jitter_buckets_us[-1]}us"] \
+            if self._bucket_edges_ns else ["all"]
+
+        lines = []
+        for stats in self.stats():
+            achieved = stats.runs / elapsed if elapsed > 0 else 0
+            histogram = " ".join(
+                f"{name}:{count}" for name, count in zip(bucket_names, stats.jitter_histogram) if count
+            )
+            lines.append(
+                f"{stats.name}: {achieved:.1f}/{stats.rate:g} Hz, {stats.runs} runs, {stats.overruns} overruns, "
+                f"{stats.skipped} skipped, max late {stats.max_lateness_ns / 1_000:.0f}us [{histogram}]"
+            )
+        return "\n".join(lines)
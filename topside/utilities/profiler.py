@@ -0,0 +1,184 @@
+"""Low overhead timing of the stages of the main loop.
+
+Each named stage gets a reusable span that times itself with perf_counter_ns and stores the duration in a ring buffer,
+so timing a stage costs two clock reads and an array write. Percentiles are only worked out when somebody asks for
+them, such as the dashboard a couple of times a second or the summary printed on shutdown.
+
+Usage:
+    with profiler.span("io.update"):
+        io.update()
+"""
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from utilities.ring_buffer import RingBuffer
+
+
+class ProfileStats(NamedTuple):
+    """Timing statistics for a profiled stage over the profiler's window.
+
+    Attributes:
+        name (str):
+            The name of the stage.
+        count (int):
+            How many times the stage has been timed in total.
+        mean_ns (float):
+            The mean duration, in nanoseconds.
+        p50_ns (float):
+            The median duration, in nanoseconds.
+        p90_ns (float):
+            The 90th percentile duration, in nanoseconds.
+        p99_ns (float):
+            The 99th percentile duration, in nanoseconds.
+        max_ns (int):
+            The longest duration, in nanoseconds.
+    """
+    name: str
+    count: int
+    mean_ns: float
+    p50_ns: float
+    p90_ns: float
+    p99_ns: float
+    max_ns: int
+
+
+class Span:
+    """Times a block of code and records the duration under its stage's name. A span is reused every time its stage
+    is timed, so the same stage must not be timed inside itself."""
+
+    __slots__ = ("_buffer", "_start")
+
+    def __init__(self, buffer: RingBuffer) -> None:
+        self._buffer = buffer
+        self._start = 0
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._buffer.append(time.perf_counter_ns() - self._start)
+
+
+class LoopProfiler:
+    """Collects the durations of named stages and summarizes them as rolling percentiles.
+
+    Methods:
+        span(name: str) -> Span:
+            Get the span that times a stage.
+        record(name: str, duration_ns: int) -> None:
+            Record a duration measured elsewhere.
+        stats(name: str) -> ProfileStats:
+            Get the timing statistics of a stage.
+        summary() -> list[ProfileStats]:
+            Get the timing statistics of every stage.
+        report() -> str:
+            Get a readable table of the timing statistics.
+        reset() -> None:
+            Forget every recorded duration.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        """Initialize the LoopProfiler object.
+
+        Args:
+            window (int, optional):
+                How many of the most recent durations of each stage the statistics are worked out from.
+                Defaults to 1000.
+        """
+        self._window = window
+        self._buffers: dict[str, RingBuffer] = {}
+        self._spans: dict[str, Span] = {}
+
+    @property
+    def names(self) -> list[str]:
+        """The names of the stages that have been timed, in the order they were first seen."""
+        return list(self._buffers)
+
+    def _buffer(self, name: str) -> RingBuffer:
+        buffer = self._buffers.get(name)
+        if buffer is None:
+            buffer = self._buffers[name] = RingBuffer(self._window, dtype=np.int64)
+        return buffer
+
+    def span(self, name: str) -> Span:
+        """Get the span that times a stage. Keep hold of it in hot code to skip the dictionary lookup.
+
+        Args:
+            name (str):
+                The name of the stage.
+
+        Returns:
+            Span: A context manager that records how long its block takes.
+        """
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans[name] = Span(self._buffer(name))
+        return span
+
+    def record(self, name: str, duration_ns: int) -> None:
+        """Record a duration measured elsewhere.
+
+        Args:
+            name (str):
+                The name of the stage.
+            duration_ns (int):
+                How long the stage took, in nanoseconds.
+        """
+        self._buffer(name).append(duration_ns)
+
+    def stats(self, name: str) -> ProfileStats:
+        """Get the timing statistics of a stage.
+
+        Args:
+            name (str):
+                The name of the stage.
+
+        Returns:
+            ProfileStats: The statistics over the most recent window of durations.
+        """
+        buffer = self._buffers[name]
+        durations = buffer.values()
+        if len(durations) == 0:
+            return ProfileStats(name, 0, 0.0, 0.0, 0.0, 0.0, 0)
+
+        p50, p90, p99 = np.percentile(durations, (50, 90, 99))
+        return ProfileStats(
+            name=name,
+            count=buffer.count,
+            mean_ns=float(durations.mean()),
+            p50_ns=float(p50),
+            p90_ns=float(p90),
+            p99_ns=float(p99),
+            max_ns=int(durations.max()),
+        )
+
+    def summary(self) -> list[ProfileStats]:
+        """Get the timing statistics of every stage.
+
+        Returns:
+            list[ProfileStats]: The statistics of each stage, in the order they were first seen.
+        """
+        return [self.stats(name) for name in self._buffers]
+
+    def report(self) -> str:
+        """Get a readable table of the timing statistics, in microseconds.
+
+        Returns:
+            str: One line per stage with its mean, median, 90th and 99th percentile, and maximum durations.
+        """
+        width = max(len("stage"), max((len(name) for name in self._buffers), default=0))
+        lines = [f"{'stage':<{width}} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (us)"]
+        for stats in self.summary():
+            lines.append(
+                f"{stats.name:<{width}} {stats.mean_ns / 1000:8.1f} {stats.p50_ns / 1000:8.1f} "
+                f"{stats.p90_ns / 1000:8.1f} {stats.p99_ns / 1000:8.1f} {stats.max_ns / 1000:8.1f}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Forget every recorded duration."""
+        for buffer in self._buffers.values():
+            buffer.clear()
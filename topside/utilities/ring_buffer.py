@@ -0,0 +1,123 @@
+"""A fixed size, numpy backed ring buffer that keeps the most recent values appended to it.
+
+One thread can append while another reads with since() without a lock. A value is written before the count of
+appended values goes up, so a reader that goes by the count only ever sees values that have been written in full.
+"""
+import numpy as np
+
+
+class RingBuffer:
+    """Keeps the most recent values appended to it in a preallocated numpy array. Appending never allocates, and once
+    the buffer is full each new value overwrites the oldest one.
+
+    Methods:
+        append(value) -> None:
+            Add a value, overwriting the oldest one if the buffer is full.
+        values() -> np.ndarray:
+            Get a copy of the stored values, oldest first.
+        since(start: int, end: int | None = None) -> np.ndarray:
+            Get a copy of the values appended after a given count, oldest first.
+        clear() -> None:
+            Remove every value.
+    """
+
+    def __init__(self, capacity: int, shape: tuple[int, ...] = (), dtype: np.dtype | type = float) -> None:
+        """Initialize the RingBuffer object.
+
+        Args:
+            capacity (int):
+                The most values the buffer can hold.
+            shape (tuple[int, ...], optional):
+                The shape of each value. Defaults to (), a scalar.
+            dtype (np.dtype | type, optional):
+                The type of the values, which can be a structured dtype. Defaults to float.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+
+        self._data = np.zeros((capacity, *shape), dtype=dtype)
+        self._capacity = capacity
+        self._index = 0
+        self._size = 0
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        """The most values the buffer can hold."""
+        return self._capacity
+
+    @property
+    def count(self) -> int:
+        """How many values have been appended in total, including ones that have since been overwritten."""
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        """Whether the buffer holds as many values as it can."""
+        return self._size == self._capacity
+
+    @property
+    def latest(self):
+        """The most recently appended value."""
+        if self._size == 0:
+            raise IndexError("The ring buffer is empty")
+        return self._data[self._index - 1]
+
+    def append(self, value) -> None:
+        """Add a value, overwriting the oldest one if the buffer is full.
+
+        Args:
+            value:
+                The value to add. It must fit the shape and type of the buffer.
+        """
+        self._data[self._index] = value
+        self._index += 1
+        if self._index == self._capacity:
+            self._index = 0
+
+        if self._size < self._capacity:
+            self._size += 1
+        # Counted last so that readers going by the count never see a half written value.
+        self._count += 1
+
+    def values(self) -> np.ndarray:
+        """Get a copy of the stored values, oldest first.
+
+        Returns:
+            np.ndarray: The values, with the number of values as the first dimension.
+        """
+        return self.since(self._count - self._size)
+
+    def since(self, start: int, end: int | None = None) -> np.ndarray:
+        """Get a copy of the values appended after the total count reached start, oldest first. Values that have
+        already been overwritten are left out.
+
+        Args:
+            start (int):
+                The total count to read from, usually the end of the previous read.
+            end (int | None, optional):
+                The total count to read up to. Read the count once and pass it here so that values appended during
+                the read are left for the next one.
+                Defaults to None, the current count.
+
+        Returns:
+            np.ndarray: The values, with the number of values as the first dimension.
+        """
+        if end is None:
+            end = self._count
+        start = max(start, end - self._capacity, self._count - self._size)
+        if start >= end:
+            return self._data[:0].copy()
+
+        first = start % self._capacity
+        last = end % self._capacity
+        if first < last:
+            return self._data[first:last].copy()
+        return np.concatenate((self._data[first:], self._data[:last]))
+
+    def clear(self) -> None:
+        """Remove every value."""
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
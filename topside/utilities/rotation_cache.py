@@ -0,0 +1,152 @@
+"""A cache of an image rendered at evenly spaced angles, so that turning it only costs a lookup.
+
+Angles are snapped to the nearest step of the cache's resolution, so angles that would look the same on screen share one
+rendering. The renderings are made the first time they're asked for and the least recently used ones are dropped once
+the cache is full, or they can all be made up front.
+"""
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class RotationCache(Generic[T]):
+    """Keeps renderings of an image at evenly spaced angles, dropping the least recently used ones when full.
+
+    Properties:
+        resolution (float):
+            The angle between renderings, in degrees.
+        steps (int):
+            How many renderings make a full turn.
+        capacity (int | None):
+            The most renderings kept at once, or None for no limit.
+        hits (int):
+            How many lookups found their rendering already made.
+        misses (int):
+            How many lookups had to make their rendering.
+
+    Methods:
+        step(angle: float) -> int:
+            Get the step an angle snaps to.
+        get(angle: float) -> T:
+            Get the rendering nearest an angle.
+        get_step(step: int) -> T:
+            Get the rendering at a step.
+        prerender() -> None:
+            Make every rendering now.
+        clear() -> None:
+            Drop every rendering.
+    """
+
+    def __init__(self, render: Callable[[float], T], resolution: float = 1, capacity: int | None = None) -> None:
+        """Initialize the RotationCache object.
+
+        Args:
+            render (Callable[[float], T]):
+                Renders the image turned by an angle, in degrees.
+            resolution (float, optional):
+                The angle between renderings, in degrees. Rounded so that a whole number of steps makes a full turn.
+                Defaults to 1.
+            capacity (int | None, optional):
+                The most renderings to keep at once. None keeps every one that has been made.
+                Defaults to None.
+        """
+        if resolution <= 0:
+            raise ValueError(f"Resolution must be positive, got {resolution}")
+        if capacity is not None and capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+
+        self._render = render
+        self._steps = max(1, round(360 / resolution))
+        self._resolution = 360 / self._steps
+        self._capacity = capacity
+
+        self._renderings: OrderedDict[int, T] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def resolution(self) -> float:
+        """The angle between renderings, in degrees."""
+        return self._resolution
+
+    @property
+    def steps(self) -> int:
+        """How many renderings make a full turn."""
+        return self._steps
+
+    @property
+    def capacity(self) -> int | None:
+        """The most renderings kept at once, or None for no limit."""
+        return self._capacity
+
+    @property
+    def hits(self) -> int:
+        """How many lookups found their rendering already made."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """How many lookups had to make their rendering."""
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._renderings)
+
+    def step(self, angle: float) -> int:
+        """Get the step an angle snaps to. Angles a full turn apart snap to the same step.
+
+        Args:
+            angle (float):
+                The angle, in degrees.
+
+        Returns:
+            int: The step, from 0 up to but not including steps.
+        """
+        return round(angle / self._resolution) % self._steps
+
+    def get(self, angle: float) -> T:
+        """Get the rendering nearest an angle, making it if it isn't cached.
+
+        Args:
+            angle (float):
+                The angle, in degrees.
+
+        Returns:
+            T: The rendering.
+        """
+        return self.get_step(self.step(angle))
+
+    def get_step(self, step: int) -> T:
+        """Get the rendering at a step, making it if it isn't cached.
+
+        Args:
+            step (int):
+                The step, as returned by step().
+
+        Returns:
+            T: The rendering.
+        """
+        rendering = self._renderings.get(step)
+        if rendering is not None:
+            self._hits += 1
+            self._renderings.move_to_end(step)
+            return rendering
+
+        self._misses += 1
+        rendering = self._render(step * self._resolution)
+        self._renderings[step] = rendering
+        if self._capacity is not None and len(self._renderings) > self._capacity:
+            self._renderings.popitem(last=False)
+        return rendering
+
+    def prerender(self) -> None:
+        """Make every rendering now, so none has to be made later. Only the last ones made are kept if there are more
+        steps than the cache can hold."""
+        for step in range(self._steps):
+            if step not in self._renderings:
+                self.get_step(step)
+
+    def clear(self) -> None:
+        """Drop every rendering."""
+        self._renderings.clear()